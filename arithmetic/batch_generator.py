@@ -0,0 +1,209 @@
+import numpy as np
+from fingerprint_store import create_store
+from fraction_array import FractionArray
+from generator import COMMUTATIVE_CODES, OPERATOR_CODES
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+# 运算符下标（'+', '-', '×', '÷' 的顺序）对应的规范形式编号
+_CODES = np.array([OPERATOR_CODES[operator] for operator in ('+', '-', '×', '÷')], dtype=np.int64)
+_COMMUTATIVE = np.array(sorted(COMMUTATIVE_CODES), dtype=np.int64)
+
+
+def shape_distribution(max_op_count):
+    """与 ExerciseGenerator.build_expression 相同的树形分布，返回 {树形: 概率}
+
+    树形中 None 表示叶子，(左, 右) 表示运算节点。
+    """
+    if max_op_count == 0:
+        return {None: 1.0}
+    distribution = {}
+    for op_count in range(1, max_op_count + 1):
+        for left_op_count in range(op_count):
+            weight = 1.0 / max_op_count / op_count
+            right_op_count = op_count - 1 - left_op_count
+            lefts = shape_distribution(left_op_count) if left_op_count else {None: 1.0}
+            rights = shape_distribution(right_op_count) if right_op_count else {None: 1.0}
+            for left, p_left in lefts.items():
+                for right, p_right in rights.items():
+                    shape = (left, right)
+                    distribution[shape] = distribution.get(shape, 0.0) + weight * p_left * p_right
+    return distribution
+
+
+class BatchGenerator:
+    """向量化批量生成题目
+
+    按树形分批：整列抽取叶子数值，每层运算用 FractionArray 整列精确计算，
+    用掩码过滤无效的行（除以零），再整列计算规范形式的指纹去重，只有被接受的行才渲染成字符串。
+    默认使用集合保存指纹，整批比较只需一次交集；'exact'、'bloom' 更省内存，但逐个加入。
+    """
+
+    def __init__(self, range_val, seed=None, store='set', batch_size=4096):
+        self.range = range_val  # 数字范围
+        self.operators = ['+', '-', '×', '÷']  # 支持的运算符
+        self.rng = np.random.default_rng(seed)
+        self.store = create_store(store) if isinstance(store, str) else store
+        self.batch_size = batch_size
+        distribution = shape_distribution(3)
+        self.shapes = list(distribution)
+        self.probabilities = np.array([distribution[shape] for shape in self.shapes])
+        self.probabilities /= self.probabilities.sum()
+        # 生成统计：抽取的行数、无效行数、重复行数、接受数
+        self.stats = {'attempts': 0, 'invalid': 0, 'duplicate': 0, 'accepted': 0}
+
+    def generate_exercise(self, num):
+        """生成指定数量的练习题及答案，返回值与 ExerciseGenerator.generate_exercise 相同"""
+        exercises = []
+        answers = []
+        for exercise, answer in self.iter_exercises(num):
+            exercises.append(exercise)
+            answers.append(answer)
+        return exercises, answers
+
+    def iter_exercises(self, num):
+        """逐道产出 (题目行, 答案行)"""
+        if self.range < 2:
+            return  # 没有可用的数字
+        count = 0
+        # 与单题生成相同，最多尝试10*num次
+        max_attempts = num * 10
+        while count < num and self.stats['attempts'] < max_attempts:
+            for exercise, answer in self.generate_batch():
+                count += 1
+                yield f"{count}. {exercise} = ", f"{count}. {answer}"
+                if count == num:
+                    return
+
+    def generate_batch(self):
+        """生成一批题目，返回不重复的 (题目, 答案) 列表，各树形的题目随机交错"""
+        counts = self.rng.multinomial(self.batch_size, self.probabilities)
+        results = []
+        for shape, count in zip(self.shapes, counts.tolist()):
+            if count:
+                results.extend(self._generate_shape(shape, count))
+        order = self.rng.permutation(len(results))
+        return [results[i] for i in order.tolist()]
+
+    def _generate_shape(self, shape, count):
+        self.stats['attempts'] += count
+        values, record = self._evaluate(shape, count)
+        survivors = np.flatnonzero(values.valid())
+        self.stats['invalid'] += count - len(survivors)
+        if not len(survivors):
+            return []
+
+        # 整列计算规范形式的指纹，先批内去重、再与已出过的题目比较，只渲染被接受的行
+        fps = self._fingerprint(record)[2][survivors]
+        _, first = np.unique(fps, return_index=True)
+        first.sort()
+        new = np.array(self.store.add_many(fps[first].tolist()), dtype=bool)
+        accepted = survivors[first[new]]
+        self.stats['duplicate'] += len(survivors) - len(accepted)
+        self.stats['accepted'] += len(accepted)
+        if not len(accepted):
+            return []
+        texts = self._render(self._subset(record, accepted))
+        return [(text[1:-1], answer) for text, answer in zip(texts, values[accepted].to_strings())]
+
+    def _draw_leaves(self, count):
+        """整列抽取自然数或真分数"""
+        rng = self.rng
+        integers = rng.integers(1, self.range, count)
+        if self.range <= 2:
+            return FractionArray(integers)
+        is_integer = rng.random(count) < 0.5
+        denominators = rng.integers(2, self.range, count)
+        numerators = (rng.random(count) * (denominators - 1)).astype(np.int64) + 1
+        return FractionArray(np.where(is_integer, integers, numerators),
+                             np.where(is_integer, 1, denominators))
+
+    def _evaluate(self, shape, count):
+        """整列计算一个树形，返回 (结果, 渲染记录)；无效的行分母为 0"""
+        if shape is None:
+            leaves = self._draw_leaves(count)
+            return leaves, ('leaf', leaves)
+
+        left, left_record = self._evaluate(shape[0], count)
+        right, right_record = self._evaluate(shape[1], count)
+        operators = self.rng.integers(0, len(self.operators), count)
+
+        # 减法时较大的数放在左边，保证结果非负；其余运算按原顺序
+        swap = (operators == self.operators.index('-')) & (left < right)
+        first = FractionArray.where(swap, right, left)
+        second = FractionArray.where(swap, left, right)
+
+        result = None
+        for code, operator in enumerate(self.operators):
+            match operator:
+                case '+':
+                    value = first + second
+                case '-':
+                    value = first - second
+                case '×':
+                    value = first * second
+                case '÷':
+                    value = first / second  # 除数为 0 的行被标记为无效
+                case _:
+                    raise ValueError(f"不支持的运算符 '{operator}'")
+            result = value if result is None else FractionArray.where(operators == code, value, result)
+        return result, ('node', operators, swap, left_record, right_record)
+
+    def _fingerprint(self, record):
+        """整列计算规范形式的 64 位指纹，返回 (运算符编号, 交换律分组和, 指纹)
+
+        与 canonical_node 相同的等价关系：加法、乘法把同一运算符下连续的操作数展平，
+        以各操作数指纹打散后的和（与顺序无关）代表排序后的操作数组；其余运算按左右顺序组合。
+        """
+        if record[0] == 'leaf':
+            leaves = record[1]
+            numerators = leaves.numerators.astype(np.uint64)
+            denominators = leaves.denominators.astype(np.uint64)
+            hashes = _mix_array(_mix_array(numerators) + denominators * _GOLDEN)
+            return np.zeros(len(hashes), dtype=np.int64), hashes, hashes
+        _, operators, swap, left, right = record
+        codes = _CODES[operators]
+        left_codes, left_sums, left_hashes = self._fingerprint(left)
+        right_codes, right_sums, right_hashes = self._fingerprint(right)
+        # 减法交换了左右操作数的行按交换后的顺序计算
+        first_codes = np.where(swap, right_codes, left_codes)
+        second_codes = np.where(swap, left_codes, right_codes)
+        first_sums = np.where(swap, right_sums, left_sums)
+        second_sums = np.where(swap, left_sums, right_sums)
+        first_hashes = np.where(swap, right_hashes, left_hashes)
+        second_hashes = np.where(swap, left_hashes, right_hashes)
+
+        code_salts = _mix_array(codes.astype(np.uint64))
+        # 交换律分组：子节点运算符相同时并入其分组和，否则作为一个操作数
+        sums = (np.where(first_codes == codes, first_sums, _mix_array(first_hashes))
+                + np.where(second_codes == codes, second_sums, _mix_array(second_hashes)))
+        commutative = np.isin(codes, _COMMUTATIVE)
+        ordered = _mix_array(_mix_array(first_hashes + code_salts) * _GOLDEN + second_hashes)
+        hashes = np.where(commutative, _mix_array(sums + code_salts), ordered)
+        return codes, np.where(commutative, sums, hashes), hashes
+
+    def _subset(self, record, rows):
+        """取出被接受的行的渲染记录，并转换为 Python 列表"""
+        if record[0] == 'leaf':
+            # 叶子数值只有少数几种，每种只渲染一次
+            leaves = record[1][rows]
+            unique, inverse = np.unique(leaves.numerators * self.range + leaves.denominators, return_inverse=True)
+            texts = FractionArray._from_reduced(unique // self.range, unique % self.range).to_strings()
+            return ('leaf', [texts[i] for i in inverse.ravel().tolist()])
+        _, operators, swap, left, right = record
+        return ('node', [self.operators[code] for code in operators[rows].tolist()], swap[rows].tolist(),
+                self._subset(left, rows), self._subset(right, rows))
+
+    def _render(self, record):
+        """整列渲染表达式，运算节点带括号"""
+        if record[0] == 'leaf':
+            return record[1]
+        _, operators, swap, left, right = record
+        return [f"({b} {operator} {a})" if swapped else f"({a} {operator} {b})"
+                for a, b, operator, swapped in zip(self._render(left), self._render(right), operators, swap)]
+
+
+def _mix_array(values):
+    """SplitMix64 终结函数的向量化版本（uint64 乘法按 2**64 取模）"""
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
@@ -0,0 +1,118 @@
+import csv
+import glob
+import os
+from multiprocessing import Pool
+from fileio import COMPRESSIONS, compression_of, open_text
+from fraction import Fraction
+from generator import ExerciseChecker, GradeResult, iter_items
+
+# 汇总文件名（写在输出目录中）
+SUMMARY_FILE = 'summary.csv'
+SUMMARY_FIELDS = ['student', 'answer_file', 'correct', 'wrong', 'total', 'error']
+# 每名学生评分文件名的后缀
+GRADE_SUFFIX = '.grade.txt'
+
+# 工作进程中的正确结果文本（无法计算时为 None），由 _init_worker 设置
+_keyTexts = None
+
+
+def find_submissions(pattern):
+    """目录时取其中所有 .txt 文件（包括压缩的 .txt.gz 等），否则按通配符匹配，按文件名排序"""
+    if os.path.isdir(pattern):
+        paths = [path for suffix in ('', *COMPRESSIONS)
+                 for path in glob.glob(os.path.join(pattern, '*.txt' + suffix))]
+    else:
+        paths = glob.glob(pattern)
+    return sorted(path for path in paths if os.path.isfile(path))
+
+
+def student_name(answer_file):
+    """答案文件名去掉压缩扩展名与 .txt 等扩展名后作为学生名"""
+    name = os.path.basename(answer_file)
+    if compression_of(name) is not None:
+        name = os.path.splitext(name)[0]
+    return os.path.splitext(name)[0]
+
+
+def _init_worker(key_texts):
+    global _keyTexts
+    _keyTexts = key_texts
+
+
+def grade_against_key(key_texts, answers):
+    """用正确结果文本流式批改一份答案：文本完全相同时直接判对，其余交给 ExerciseChecker.grade_pairs 解析比较
+
+    答案逐行读取、逐行比较，不整份载入内存；答案多于题目时立即报错，少于题目时在读完后报错。
+    """
+    count = len(key_texts)
+    verdicts = bytearray()
+    for i, answer in enumerate(answers):
+        if i >= count:
+            raise Exception("错误：题目与答案数量不匹配。")
+        key_text = key_texts[i]
+        if key_text is not None and answer == key_text:
+            verdicts.append(1)
+        else:
+            key = None if key_text is None else Fraction.from_string(key_text)
+            verdicts += ExerciseChecker.grade_pairs([key], [answer])
+    if len(verdicts) != count:
+        raise Exception("错误：题目与答案数量不匹配。")
+    return verdicts
+
+
+def _grade_submission(task):
+    """工作进程：批改一名学生的答案文件并写出其评分文件，返回汇总行"""
+    answer_file, grade_file = task
+    student = student_name(answer_file)
+    row = {'student': student, 'answer_file': answer_file, 'correct': '', 'wrong': '', 'total': '', 'error': ''}
+    try:
+        with open_text(answer_file) as f:
+            result = GradeResult(grade_against_key(_keyTexts, iter_items(f)))
+        result.write(grade_file)
+    except Exception as e:
+        row['error'] = str(e)
+        return row
+    row.update(correct=result.correct_count, wrong=result.wrong_count, total=len(result))
+    return row
+
+
+def grade_students(exercise_file, submissions, out_dir, workers=1):
+    """只计算一次正确结果，批改多名学生的答案
+
+    每名学生的评分文件写到 out_dir/<学生>.grade.txt，汇总写到 out_dir/summary.csv。
+    返回汇总行列表；单个答案文件出错只记录在汇总中，不影响其他学生。
+    两个答案文件对应同一名学生（如 alice.txt 与 alice.txt.gz）时直接报错，避免评分文件互相覆盖。
+    """
+    # 题目文件本身与输出目录中上次写出的评分文件不是学生答案（输出目录可以就是答案目录）
+    exercise_path = os.path.realpath(exercise_file)
+    out_path = os.path.realpath(out_dir)
+    answer_files = [path for path in find_submissions(submissions)
+                    if os.path.realpath(path) != exercise_path
+                    and not (os.path.dirname(os.path.realpath(path)) == out_path and path.endswith(GRADE_SUFFIX))]
+    if not answer_files:
+        raise Exception(f"没有找到答案文件: {submissions}")
+    names = {}
+    for path in answer_files:
+        names.setdefault(student_name(path), []).append(path)
+    for name, paths in names.items():
+        if len(paths) > 1:
+            raise Exception(f"多个答案文件对应同一名学生 {name}: {', '.join(paths)}")
+    key_texts = [None if value is None else str(value)
+                 for value in ExerciseChecker.iter_key(exercise_file, ExerciseChecker())]
+
+    os.makedirs(out_dir, exist_ok=True)
+    tasks = [(path, os.path.join(out_dir, student_name(path) + GRADE_SUFFIX))
+             for path in answer_files]
+    if workers > 1:
+        with Pool(workers, initializer=_init_worker, initargs=(key_texts,)) as pool:
+            rows = pool.map(_grade_submission, tasks)
+    else:
+        _init_worker(key_texts)
+        rows = [_grade_submission(task) for task in tasks]
+
+    with open(os.path.join(out_dir, SUMMARY_FILE), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
+
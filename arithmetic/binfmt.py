@@ -0,0 +1,208 @@
+import mmap
+import os
+import struct
+from array import array
+from fraction import Fraction
+from generator import OPERATOR_CODES, PRECEDENCE, _apply_operator, _scan
+
+# 文件头：魔数、版本、保留字段、题目数量、偏移索引的位置
+MAGIC = b'AREX'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQQ')
+# 记录开头的答案：分子、分母；分母为 0 表示答案超出 64 位、未预先计算
+ANSWER = struct.Struct('<qq')
+# 后缀式中的一个记号：编号（0 为数字，其余为运算符编号）、分子、分母
+TOKEN = struct.Struct('<Bqq')
+
+OPERATORS = {code: operator for operator, code in OPERATOR_CODES.items()}
+
+
+def is_binary(path):
+    """判断文件是否为二进制题目文件"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def to_postfix(exercise):
+    """将题目文本转换为后缀式记号列表 [(编号, 分子, 分母), ...]"""
+    tokens = _scan(exercise)
+    if tokens is None:
+        raise ValueError(f"题目中有非法符号: {exercise}")
+    output = []
+    stack = []
+    for token in tokens:
+        if token == '(':
+            stack.append(token)
+        elif token == ')':
+            while stack and stack[-1] != '(':
+                output.append((OPERATOR_CODES[stack.pop()], 0, 0))
+            if not stack:
+                raise ValueError(f"括号不匹配: {exercise}")
+            stack.pop()
+        elif token in PRECEDENCE:
+            while stack and stack[-1] != '(' and PRECEDENCE[stack[-1]] >= PRECEDENCE[token]:
+                output.append((OPERATOR_CODES[stack.pop()], 0, 0))
+            stack.append(token)
+        else:
+            value = Fraction.from_string(token)
+            output.append((0, value.numerator, value.denominator))
+    while stack:
+        operator = stack.pop()
+        if operator == '(':
+            raise ValueError(f"括号不匹配: {exercise}")
+        output.append((OPERATOR_CODES[operator], 0, 0))
+    return output
+
+
+def evaluate_postfix(tokens):
+    """计算后缀式，出现负数或除以零时返回 None"""
+    stack = []
+    for code, numerator, denominator in tokens:
+        if not code:
+            stack.append(Fraction(numerator, denominator))
+        elif not _apply_operator(stack, OPERATORS[code]):
+            return None
+    return stack[0] if len(stack) == 1 else None
+
+
+def render_postfix(tokens):
+    """将后缀式还原为题目文本（与生成时相同，每个运算都带括号，最外层除外）"""
+    stack = []
+    for code, numerator, denominator in tokens:
+        if not code:
+            stack.append(str(Fraction(numerator, denominator)))
+        else:
+            right = stack.pop()
+            left = stack.pop()
+            stack.append(f"({left} {OPERATORS[code]} {right})")
+    text = stack[0]
+    return text[1:-1] if len(tokens) > 1 else text
+
+
+class BinaryExerciseWriter:
+    """流式写入二进制题目文件
+
+    记录依次写在文件头之后，偏移索引在关闭时追加到文件末尾并回填文件头，
+    因此写入时不需要事先知道题目数量。中途出错时删除文件，不留下看似有效的半个文件。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, VERSION, 0, 0, 0))
+        self.offsets = array('Q', [HEADER.size])
+        self.closed = False
+
+    def add(self, exercise, answer):
+        """写入一道题（不带题号与等号的题目文本、答案文本）"""
+        value = Fraction.from_string(answer)
+        try:
+            head = ANSWER.pack(value.numerator, value.denominator)
+        except struct.error:
+            head = ANSWER.pack(0, 0)  # 超出 64 位，读取时由后缀式计算
+        tokens = to_postfix(exercise)
+        record = head + b''.join(TOKEN.pack(*token) for token in tokens)
+        self.file.write(record)
+        self.offsets.append(self.offsets[-1] + len(record))
+
+    def tee(self, items):
+        """透传 (题目行, 答案行)，同时写入每道题"""
+        for item in items:
+            exercise, answer = item
+            self.add(exercise.split('.', 1)[1].strip().replace(' =', ''), answer.split('.', 1)[1].strip())
+            yield item
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            index_offset = self.offsets[-1]
+            self.file.write(self.offsets.tobytes())
+            self.file.seek(0)
+            self.file.write(HEADER.pack(MAGIC, VERSION, 0, len(self.offsets) - 1, index_offset))
+        finally:
+            self.file.close()
+
+    def abort(self):
+        """放弃写入：关闭并删除文件"""
+        if self.closed:
+            return
+        self.closed = True
+        self.file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class BinaryExerciseFile:
+    """通过 mmap 读取二进制题目文件，按题号随机访问，切片不复制数据"""
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, version, _, count, index_offset = HEADER.unpack_from(self.mmap)
+        except struct.error:
+            self.mmap.close()
+            raise ValueError(f"不是二进制题目文件: {path}")
+        if magic != MAGIC or version != VERSION:
+            self.mmap.close()
+            raise ValueError(f"不是二进制题目文件或版本不支持: {path}")
+        self.count = count
+        self.view = memoryview(self.mmap)
+        self.offsets = self.view[index_offset:index_offset + (count + 1) * 8].cast('Q')
+
+    def __len__(self):
+        return self.count
+
+    def record(self, index):
+        """第 index 道题（从 0 开始）的原始字节，不复制"""
+        return self.view[self.offsets[index]:self.offsets[index + 1]]
+
+    def tokens(self, index):
+        """第 index 道题的后缀式"""
+        return list(TOKEN.iter_unpack(self.record(index)[ANSWER.size:]))
+
+    def answer(self, index):
+        """第 index 道题的答案，未预先计算时由后缀式计算"""
+        numerator, denominator = ANSWER.unpack_from(self.record(index))
+        if denominator:
+            return Fraction._from_reduced(numerator, denominator)
+        return evaluate_postfix(self.tokens(index))
+
+    def exercise(self, index):
+        """第 index 道题的题目文本"""
+        return render_postfix(self.tokens(index))
+
+    def answers(self, start=0, stop=None):
+        """依次产出 [start, stop) 范围内各题的答案"""
+        stop = self.count if stop is None else min(stop, self.count)
+        for index in range(start, stop):
+            yield self.answer(index)
+
+    def close(self):
+        self.offsets.release()
+        self.view.release()
+        self.mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
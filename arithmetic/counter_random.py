@@ -0,0 +1,65 @@
+import random
+from fingerprint_store import _mix
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+
+
+class CounterRandom(random.Random):
+    """基于计数器的随机数生成器
+
+    第 k 个输出只由 (种子, 流编号, k) 经 SplitMix64 混合得到，不依赖之前的输出，
+    因此 seek(i) 后可以直接得到第 i 条流，无需先生成前面的内容。
+    randint、choice 等方法沿用 random.Random 的实现。
+    """
+
+    def __init__(self, seed=0):
+        super().__init__(seed)
+
+    def seed(self, a=0, version=2):
+        a = int(a)
+        negative = a < 0
+        a = abs(a)
+        key = 0
+        # 任意大小的整数种子按 64 位分段折叠（负数右移不会变为 0，先取绝对值，符号另外混入）
+        while True:
+            key = _mix((key ^ (a & _MASK64)) + _GOLDEN & _MASK64)
+            a >>= 64
+            if not a:
+                break
+        if negative:
+            key = _mix(key ^ _MASK64)
+        self.key = key
+        self.seek(0)
+
+    def seek(self, stream):
+        """切换到第 stream 条流的开头"""
+        self.stream_key = _mix(self.key ^ _mix(stream * _GOLDEN & _MASK64))
+        self.counter = 0
+
+    def _next64(self):
+        self.counter += 1
+        return _mix(self.stream_key + self.counter * _GOLDEN & _MASK64)
+
+    def _randbelow(self, n):
+        # 乘法移位映射到 [0, n)，偏差不超过 n / 2**64
+        return (self._next64() * n) >> 64
+
+    def random(self):
+        return (self._next64() >> 11) * (1.0 / (1 << 53))
+
+    def getrandbits(self, k):
+        if k < 0:
+            raise ValueError("比特数不能为负")
+        result = 0
+        bits = 0
+        while bits < k:
+            result |= self._next64() << bits
+            bits += 64
+        return result & ((1 << k) - 1)
+
+    def getstate(self):
+        return self.key, self.stream_key, self.counter
+
+    def setstate(self, state):
+        self.key, self.stream_key, self.counter = state
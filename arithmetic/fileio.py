@@ -0,0 +1,136 @@
+import os
+import queue
+import threading
+
+# 每块包含的行数：按块拼接后一次写入，而不是每行调用一次 write
+CHUNK_LINES = 4096
+
+# 按扩展名透明压缩：扩展名 -> 模块名（用到时才导入）
+COMPRESSIONS = {'.gz': 'gzip', '.bz2': 'bz2', '.xz': 'lzma', '.lzma': 'lzma'}
+# 写压缩文件时的参数（gzip 默认级别 9 太慢，取 6）
+COMPRESS_OPTIONS = {'gzip': {'compresslevel': 6}, 'bz2': {}, 'lzma': {}}
+# 压缩文件读写缓冲区的字节数
+BUFFER_SIZE = 1 << 20
+
+
+def compression_of(path):
+    """按扩展名返回压缩模块名，未压缩时返回 None"""
+    return COMPRESSIONS.get(os.path.splitext(str(path))[1].lower())
+
+
+def is_compressed(path):
+    return compression_of(path) is not None
+
+
+def open_binary(path, mode='rb'):
+    """以二进制方式打开文件，压缩文件透明地解压或压缩"""
+    module = compression_of(path)
+    if module is None:
+        return open(path, mode)
+    options = COMPRESS_OPTIONS[module] if 'w' in mode else {}
+    return __import__(module).open(path, mode, **options)
+
+
+def open_text(path, mode='r', encoding='utf-8'):
+    """以文本方式打开文件，压缩文件透明地解压或压缩，并使用大块缓冲"""
+    if compression_of(path) is None:
+        return open(path, mode, encoding=encoding)
+    import io
+    raw = open_binary(path, mode + 'b')
+    try:
+        return io.TextIOWrapper(io.BufferedWriter(raw, BUFFER_SIZE) if 'w' in mode else
+                                io.BufferedReader(raw, BUFFER_SIZE), encoding=encoding)
+    except Exception:
+        raw.close()
+        raise
+
+
+class BackgroundWriter:
+    """后台写盘线程：主线程按块提交文本，写盘（及压缩）与生成重叠进行
+
+    队列有界，生成速度超过写盘速度时主线程会等待，内存占用保持恒定。
+    每次提交的若干块文本按顺序分别写入构造时给出的各个文件。
+    """
+
+    def __init__(self, paths, queue_size=8, encoding='utf-8'):
+        self.files = []
+        try:
+            for path in paths:
+                self.files.append(open_text(path, 'w', encoding=encoding))
+        except OSError:
+            self._close_files()
+            raise
+        self.queue = queue.Queue(queue_size)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            chunks = self.queue.get()
+            if chunks is None:
+                break
+            if self.error is not None:
+                continue  # 出错后只消费队列，避免主线程阻塞
+            try:
+                for f, chunk in zip(self.files, chunks):
+                    f.write(chunk)
+            except Exception as e:
+                # 任何异常都记录下来并继续消费队列，线程退出会让主线程在满队列上永久阻塞
+                self.error = e
+
+    def write(self, *chunks):
+        """提交一组文本块（与文件一一对应）"""
+        if self.error is not None:
+            raise self.error
+        self.queue.put(chunks)
+
+    def _close_files(self):
+        for f in self.files:
+            try:
+                f.close()
+            except OSError as e:
+                self.error = self.error or e
+
+    def close(self):
+        """等待队列写完并关闭文件，写盘出错时抛出异常"""
+        self.queue.put(None)
+        self.thread.join()
+        self._close_files()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            # 主线程已出错：仍然收尾，但保留原始异常
+            try:
+                self.close()
+            except Exception:
+                pass
+        return False
+
+
+def count_items(items, counter):
+    """透传 items，同时把已产出的数量累加到 counter[0]"""
+    for item in items:
+        counter[0] += 1
+        yield item
+
+
+def write_lines(items, paths, chunk_lines=CHUNK_LINES):
+    """流式写入多个文本文件：items 中每一项给出各文件对应的一行"""
+    buffers = [[] for _ in paths]
+    with BackgroundWriter(paths) as writer:
+        for item in items:
+            for buffer, line in zip(buffers, item):
+                buffer.append(line)
+            if len(buffers[0]) >= chunk_lines:
+                writer.write(*('\n'.join(buffer) + '\n' for buffer in buffers))
+                buffers = [[] for _ in paths]
+        if buffers[0]:
+            writer.write(*('\n'.join(buffer) + '\n' for buffer in buffers))
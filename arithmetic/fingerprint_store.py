@@ -0,0 +1,221 @@
+import math
+import sys
+from array import array
+
+_MASK64 = (1 << 64) - 1
+
+
+def _mix(value):
+    """SplitMix64 终结函数：打散指纹的比特，供开放寻址和布隆过滤器定位"""
+    value = (value ^ (value >> 30)) * 0xBF58476D1CE4E5B9 & _MASK64
+    value = (value ^ (value >> 27)) * 0x94D049BB133111EB & _MASK64
+    return value ^ (value >> 31)
+
+
+class SetStore:
+    """兼容模式：Python 集合保存指纹"""
+
+    def __init__(self):
+        self.items = set()
+
+    def add(self, fp):
+        """加入指纹，已存在时返回 False"""
+        if fp in self.items:
+            return False
+        self.items.add(fp)
+        return True
+
+    def add_many(self, fps):
+        """批量加入指纹，返回各指纹是否为新加入；没有重复时只做一次交集与合并（C 实现）"""
+        items = self.items
+        before = len(items)
+        duplicates = items.intersection(fps)
+        items.update(fps)
+        added = len(items) - before
+        if added == len(fps):
+            return [True] * len(fps)
+        if added == len(fps) - len(duplicates):
+            return [fp not in duplicates for fp in fps]  # 批内没有重复
+        # 批内也有重复时逐个判断，同一批中只有第一次出现算新加入
+        seen = set(duplicates)
+        flags = []
+        for fp in fps:
+            flags.append(fp not in seen)
+            seen.add(fp)
+        return flags
+
+    def __contains__(self, fp):
+        return fp in self.items
+
+    def __len__(self):
+        return len(self.items)
+
+    def memory_usage(self):
+        """估算占用字节数（集合本身加每个整数对象）"""
+        return sys.getsizeof(self.items) + len(self.items) * sys.getsizeof(_MASK64)
+
+
+class ExactStore:
+    """精确模式：array('Q') 缓冲区上的开放寻址表，每个指纹只占 8 字节槽位"""
+
+    MAX_LOAD = 0.7
+
+    def __init__(self, capacity=1024):
+        bits = max(4, math.ceil(math.log2(max(capacity, 1) / self.MAX_LOAD)))
+        self._allocate(bits)
+        self.count = 0
+
+    def _allocate(self, bits):
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        self.table = array('Q', bytes(8 << bits))  # 0 表示空槽
+        self.limit = int((1 << bits) * self.MAX_LOAD)
+
+    @staticmethod
+    def _slot_value(fp):
+        # 0 被用作空槽标记，指纹 0 与 1 视为同一个值
+        return fp & _MASK64 or 1
+
+    def add(self, fp):
+        """加入指纹，已存在时返回 False"""
+        value = self._slot_value(fp)
+        table, mask = self.table, self.mask
+        index = _mix(value) & mask
+        while True:
+            current = table[index]
+            if current == 0:
+                break
+            if current == value:
+                return False
+            index = (index + 1) & mask
+        table[index] = value
+        self.count += 1
+        if self.count > self.limit:
+            self._grow()
+        return True
+
+    def add_many(self, fps):
+        """批量加入指纹，返回各指纹是否为新加入
+
+        先按整批数量扩容，循环中不再检查负载；探测与混合函数内联，省去逐个调用 add 的开销。
+        """
+        while self.count + len(fps) > self.limit:
+            self._grow()
+        table, mask = self.table, self.mask
+        flags = []
+        append = flags.append
+        added = 0
+        for fp in fps:
+            value = fp & _MASK64 or 1
+            index = (value ^ (value >> 30)) * 0xBF58476D1CE4E5B9 & _MASK64
+            index = (index ^ (index >> 27)) * 0x94D049BB133111EB & _MASK64
+            index = (index ^ (index >> 31)) & mask
+            while True:
+                current = table[index]
+                if current == 0:
+                    table[index] = value
+                    added += 1
+                    append(True)
+                    break
+                if current == value:
+                    append(False)
+                    break
+                index = (index + 1) & mask
+        self.count += added
+        return flags
+
+    def _grow(self):
+        old = self.table
+        self._allocate(self.bits + 1)
+        table, mask = self.table, self.mask
+        for value in old:
+            if value:
+                index = _mix(value) & mask
+                while table[index]:
+                    index = (index + 1) & mask
+                table[index] = value
+
+    def __contains__(self, fp):
+        value = self._slot_value(fp)
+        table, mask = self.table, self.mask
+        index = _mix(value) & mask
+        while True:
+            current = table[index]
+            if current == 0:
+                return False
+            if current == value:
+                return True
+            index = (index + 1) & mask
+
+    def __len__(self):
+        return self.count
+
+    def memory_usage(self):
+        """缓冲区占用字节数"""
+        return self.table.itemsize * len(self.table)
+
+
+class BloomStore:
+    """近似模式：布隆过滤器，可能把新题误判为重复（概率不超过 error_rate），不会漏判重复"""
+
+    def __init__(self, capacity=1 << 20, error_rate=0.001):
+        if not 0 < error_rate < 1:
+            raise ValueError("误判率必须在 0 与 1 之间")
+        capacity = max(capacity, 1)
+        size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.size = max(size, 8)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, fp):
+        # 双重哈希：由一个 64 位值派生 k 个位置
+        mixed = _mix(fp & _MASK64)
+        h1 = mixed & 0xFFFFFFFF
+        h2 = (mixed >> 32) | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hash_count)]
+
+    def add(self, fp):
+        """加入指纹，（可能）已存在时返回 False"""
+        bits = self.bits
+        new = False
+        for position in self._positions(fp):
+            byte, bit = position >> 3, 1 << (position & 7)
+            if not bits[byte] & bit:
+                bits[byte] |= bit
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def add_many(self, fps):
+        """批量加入指纹，返回各指纹是否（可能）为新加入"""
+        return [self.add(fp) for fp in fps]
+
+    def __contains__(self, fp):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(fp))
+
+    def __len__(self):
+        return self.count
+
+    def memory_usage(self):
+        """位数组占用字节数"""
+        return len(self.bits)
+
+
+STORES = {
+    'exact': ExactStore,
+    'bloom': BloomStore,
+    'set': SetStore,
+}
+
+
+def create_store(kind='exact', **options):
+    """按名称创建指纹存储后端"""
+    try:
+        store_class = STORES[kind]
+    except KeyError:
+        raise ValueError(f"不支持的指纹存储类型 '{kind}'")
+    return store_class(**options)
@@ -1,7 +1,29 @@
-from fractions import Fraction as PyFraction
+import numbers
+import sys
+from math import gcd, isfinite
+
+# 与 fractions.Fraction 相同的哈希规则，保证相等的 int / Fraction 哈希一致
+_PyHASH_MODULUS = sys.hash_info.modulus
+_PyHASH_INF = sys.hash_info.inf
+
+# 享元缓存上限：叶子数值的取值空间很小，表满后不再新增条目
+INTERN_LIMIT = 1 << 16
+
+_internTable = {}  # (分子, 分母) -> 规范实例
+_parseTable = {}  # 字符串 -> 规范实例
+
+
+def clear_intern_cache():
+    """清空享元缓存"""
+    _internTable.clear()
+    _parseTable.clear()
 
 
 class Fraction:
+    """约分后的有理数：只保存分子、分母两个整数（分母恒为正）"""
+
+    __slots__ = ('numerator', 'denominator', '_text')
+
     def __init__(self, numerator, denominator=1, integerPart=0):
         """初始化分数（支持整数、真分数、带分数）"""
         if denominator == 0:
@@ -10,11 +32,59 @@ class Fraction:
         if integerPart < 0:
             numerator = -abs(numerator)  # 分数部分取负
         total_numerator = integerPart * denominator + numerator
-        self.frac = PyFraction(total_numerator, denominator)
+        if not (isinstance(total_numerator, int) and isinstance(denominator, int)):
+            # 标准库分数等其他有理数：交叉相乘化为整数分子、分母
+            if not (isinstance(total_numerator, numbers.Rational) and isinstance(denominator, numbers.Rational)):
+                raise TypeError("分子与分母必须是有理数")
+            total_numerator, denominator = (total_numerator.numerator * denominator.denominator,
+                                            total_numerator.denominator * denominator.numerator)
+        if denominator < 0:
+            total_numerator, denominator = -total_numerator, -denominator
+        g = gcd(total_numerator, denominator)
+        if g != 1:
+            total_numerator //= g
+            denominator //= g
+        self.numerator = total_numerator
+        self.denominator = denominator
+
+    @classmethod
+    def _from_reduced(cls, numerator, denominator):
+        """内部构造：调用方保证已约分且分母为正，跳过规范化"""
+        obj = object.__new__(cls)
+        obj.numerator = numerator
+        obj.denominator = denominator
+        return obj
+
+    @classmethod
+    def intern(cls, numerator, denominator=1):
+        """返回数值相同的规范实例：表以约分后的 (分子, 分母) 为键，2/4 与 1/2 得到同一个实例"""
+        obj = _internTable.get((numerator, denominator))
+        if obj is not None:
+            return obj  # 已是最简形式的输入直接命中，不再约分
+        obj = cls(numerator, denominator)
+        key = (obj.numerator, obj.denominator)
+        canonical = _internTable.get(key)
+        if canonical is not None:
+            return canonical
+        if len(_internTable) < INTERN_LIMIT:
+            _internTable[key] = obj
+        return obj
 
     @classmethod
     def from_string(cls, s):
-        """从字符串解析分数（支持负带分数、负纯分数）"""
+        """从字符串解析分数（支持负带分数、负纯分数），结果经享元缓存复用"""
+        obj = _parseTable.get(s)
+        if obj is not None:
+            return obj
+        obj = cls._parse(s)
+        if len(_parseTable) < INTERN_LIMIT:
+            obj = cls.intern(obj.numerator, obj.denominator)
+            _parseTable[s] = obj
+        return obj
+
+    @classmethod
+    def _parse(cls, s):
+        """逐字段解析字符串，不经过缓存"""
         if "'" in s:
             integer_part_str, fraction_part = s.split("'")
             integer_part = int(integer_part_str)
@@ -32,101 +102,183 @@ class Fraction:
 
         return cls(numerator, denominator, integer_part)
 
+    @property
+    def frac(self):
+        """兼容旧接口：此前内部包装的标准库分数，现在就是对象本身"""
+        return self
+
     def to_improper(self):
-        return self.frac
+        return self
+
+    def canonical_key(self):
+        """规范键：约分后的 (分子, 分母)，可直接用作查找表的键"""
+        return self.numerator, self.denominator
 
     def is_zero(self):
-        return self.frac == 0
+        return self.numerator == 0
 
     # ---------------------- 四则运算 ----------------------
+    @staticmethod
+    def _coerce(other):
+        if isinstance(other, Fraction):
+            return other
+        if isinstance(other, int):
+            return Fraction._from_reduced(other, 1)
+        if isinstance(other, numbers.Rational):
+            return Fraction(other.numerator, other.denominator)
+        return Fraction(other)
+
     def __add__(self, other):
-        if not isinstance(other, Fraction):
-            other = Fraction(other)
-        result = self.frac + other.frac
-        return Fraction(result.numerator, result.denominator)
+        other = self._coerce(other)
+        na, da = self.numerator, self.denominator
+        nb, db = other.numerator, other.denominator
+        g = gcd(da, db)
+        if g == 1:
+            # 分母互素时结果天然是最简分数
+            return Fraction._from_reduced(na * db + da * nb, da * db)
+        s = da // g
+        t = na * (db // g) + nb * s
+        g2 = gcd(t, g)
+        if g2 == 1:
+            return Fraction._from_reduced(t, s * db)
+        return Fraction._from_reduced(t // g2, s * (db // g2))
 
     def __sub__(self, other):
-        if not isinstance(other, Fraction):
-            other = Fraction(other)
-        if self.frac < other.frac:
+        other = self._coerce(other)
+        na, da = self.numerator, self.denominator
+        nb, db = other.numerator, other.denominator
+        if na * db < nb * da:
             return None  # 禁止负数结果
-        result = self.frac - other.frac
-        return Fraction(result.numerator, result.denominator)
+        g = gcd(da, db)
+        if g == 1:
+            return Fraction._from_reduced(na * db - da * nb, da * db)
+        s = da // g
+        t = na * (db // g) - nb * s
+        g2 = gcd(t, g)
+        if g2 == 1:
+            return Fraction._from_reduced(t, s * db)
+        return Fraction._from_reduced(t // g2, s * (db // g2))
 
     def __mul__(self, other):
-        if not isinstance(other, Fraction):
-            other = Fraction(other)
-        result = self.frac * other.frac
-        return Fraction(result.numerator, result.denominator)
+        other = self._coerce(other)
+        na, da = self.numerator, self.denominator
+        nb, db = other.numerator, other.denominator
+        # 先交叉约分，乘积即为最简分数
+        g1 = gcd(na, db)
+        if g1 > 1:
+            na //= g1
+            db //= g1
+        g2 = gcd(nb, da)
+        if g2 > 1:
+            nb //= g2
+            da //= g2
+        return Fraction._from_reduced(na * nb, da * db)
 
     def __truediv__(self, other):
-        if not isinstance(other, Fraction):
-            other = Fraction(other)
-        if other.is_zero():
+        other = self._coerce(other)
+        if other.numerator == 0:
             return None  # 禁止除以零
-        result = self.frac / other.frac
-        return Fraction(result.numerator, result.denominator)
+        na, da = self.numerator, self.denominator
+        nb, db = other.numerator, other.denominator
+        g1 = gcd(na, nb)
+        if g1 > 1:
+            na //= g1
+            nb //= g1
+        g2 = gcd(db, da)
+        if g2 > 1:
+            db //= g2
+            da //= g2
+        numerator, denominator = na * db, da * nb
+        if denominator < 0:
+            return Fraction._from_reduced(-numerator, -denominator)
+        return Fraction._from_reduced(numerator, denominator)
 
     # ---------------------- 比较运算符 ----------------------
     def _convert_other(self, other):
-        if not isinstance(other, Fraction):
-            try:
-                other = Fraction(other)
-            except (ValueError, TypeError):
-                raise TypeError(f"无法比较 Fraction 与 {type(other).__name__} 类型")
-        return other
+        if isinstance(other, Fraction):
+            return other
+        try:
+            return self._coerce(other)
+        except (ValueError, TypeError):
+            raise TypeError(f"无法比较 Fraction 与 {type(other).__name__} 类型")
 
+    # 分母恒为正，交叉相乘即可比较大小
     def __lt__(self, other):
         other = self._convert_other(other)
-        return self.frac < other.frac
+        return self.numerator * other.denominator < other.numerator * self.denominator
 
     def __gt__(self, other):
         other = self._convert_other(other)
-        return self.frac > other.frac
+        return self.numerator * other.denominator > other.numerator * self.denominator
 
     def __eq__(self, other):
-        other = self._convert_other(other)
-        return self.frac == other.frac
+        """与 int、标准库分数等有理数按数值比较，与浮点数按精确值比较；其他类型交给对方处理"""
+        if isinstance(other, (Fraction, numbers.Rational)):
+            return self.numerator == other.numerator and self.denominator == other.denominator
+        if isinstance(other, float):
+            return isfinite(other) and (self.numerator, self.denominator) == other.as_integer_ratio()
+        return NotImplemented
+
+    def __hash__(self):
+        denominator = self.denominator
+        if denominator == 1:
+            return hash(self.numerator)
+        try:
+            dinv = pow(denominator, -1, _PyHASH_MODULUS)
+        except ValueError:
+            # 分母是模数的倍数时没有逆元
+            hash_ = _PyHASH_INF
+        else:
+            hash_ = hash(hash(abs(self.numerator)) * dinv)
+        result = hash_ if self.numerator >= 0 else -hash_
+        return -2 if result == -1 else result
 
     def __le__(self, other):
         other = self._convert_other(other)
-        return self.frac <= other.frac
+        return self.numerator * other.denominator <= other.numerator * self.denominator
 
     def __ge__(self, other):
         other = self._convert_other(other)
-        return self.frac >= other.frac
+        return self.numerator * other.denominator >= other.numerator * self.denominator
 
     # ---------------------- 字符串格式化 ----------------------
     def __str__(self):
-        if self.is_zero():
-            return "0"
-
-        numerator = self.frac.numerator
-        denominator = self.frac.denominator
-
-        # 处理负数：区分负纯分数和负带分数
-        if numerator < 0:
-            abs_num = abs(numerator)
-            abs_integer = abs_num // denominator  # 绝对值的整数部分
-            abs_remainder = abs_num % denominator  # 绝对值的分数部分分子
-
-            # 情况1：负纯分数（整数部分为0）→ 格式：-分子/分母
-            if abs_integer == 0:
-                return f"-{abs_remainder}/{denominator}"
-            # 情况2：负带分数（整数部分非0）→ 格式：-整数'分数
-            else:
-                return f"-{abs_integer}'{abs_remainder}/{denominator}"
-
-        # 处理正数：区分正纯分数和正带分数
-        integer_part = numerator // denominator
-        remainder = numerator % denominator
-
-        # 情况1：正整数
-        if remainder == 0:
-            return str(integer_part)
-        # 情况2：正纯分数
-        elif integer_part == 0:
-            return f"{remainder}/{denominator}"
-        # 情况3：正带分数
+        # 渲染结果缓存在实例上，享元实例的字符串只格式化一次
+        try:
+            return self._text
+        except AttributeError:
+            text = self._text = _format(self.numerator, self.denominator)
+            return text
+
+
+def _format(numerator, denominator):
+    """按题目格式渲染约分后的分数（整数、真分数、带分数）"""
+    if numerator == 0:
+        return "0"
+
+    # 处理负数：区分负纯分数和负带分数
+    if numerator < 0:
+        abs_num = -numerator
+        abs_integer = abs_num // denominator  # 绝对值的整数部分
+        abs_remainder = abs_num % denominator  # 绝对值的分数部分分子
+
+        # 情况1：负纯分数（整数部分为0）→ 格式：-分子/分母
+        if abs_integer == 0:
+            return f"-{abs_remainder}/{denominator}"
+        # 情况2：负带分数（整数部分非0）→ 格式：-整数'分数
         else:
-            return f"{integer_part}'{remainder}/{denominator}"
\ No newline at end of file
+            return f"-{abs_integer}'{abs_remainder}/{denominator}"
+
+    # 处理正数：区分正纯分数和正带分数
+    integer_part = numerator // denominator
+    remainder = numerator % denominator
+
+    # 情况1：正整数
+    if remainder == 0:
+        return str(integer_part)
+    # 情况2：正纯分数
+    elif integer_part == 0:
+        return f"{remainder}/{denominator}"
+    # 情况3：正带分数
+    else:
+        return f"{integer_part}'{remainder}/{denominator}"
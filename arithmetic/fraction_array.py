@@ -0,0 +1,215 @@
+import numpy as np
+from fraction import Fraction, _format
+
+# 操作数绝对值低于该界时，两两乘积之和不会超出 int64
+_SAFE_BOUND = 1 << 31
+_INT64_MAX = np.iinfo(np.int64).max
+
+
+def _as_array(values):
+    """转换为 int64 数组，超出 int64 的整数保留为 Python 整数（object 数组）"""
+    if isinstance(values, np.ndarray) and values.dtype == object:
+        return values
+    try:
+        return np.asarray(values, dtype=np.int64)
+    except OverflowError:
+        return np.asarray(values, dtype=object)
+
+
+def _reduce(numerators, denominators):
+    """向量化约分并把符号移到分子；分母为 0 的元素统一记为 0/0（无效）"""
+    g = np.gcd(numerators, denominators)
+    g[g == 0] = 1
+    numerators = numerators // g
+    denominators = denominators // g
+    negative = denominators < 0
+    if negative.any():
+        numerators = np.where(negative, -numerators, numerators)
+        denominators = np.where(negative, -denominators, denominators)
+    invalid = denominators == 0
+    if invalid.any():
+        numerators = np.where(invalid, 0, numerators)
+    return numerators, denominators
+
+
+def _shrink(values):
+    """object 数组中的值全部落在 int64 范围内时转回 int64"""
+    if values.dtype == object and (len(values) == 0 or np.abs(values).max() <= _INT64_MAX):
+        return values.astype(np.int64)
+    return values
+
+
+# ---------------------- 未约分的运算核（数组与 Python 整数通用） ----------------------
+def _add(an, ad, bn, bd):
+    return an * bd + bn * ad, ad * bd
+
+
+def _sub(an, ad, bn, bd):
+    return an * bd - bn * ad, ad * bd
+
+
+def _mul(an, ad, bn, bd):
+    return an * bn, ad * bd
+
+
+def _div(an, ad, bn, bd):
+    return an * bd, ad * bn
+
+
+class FractionArray:
+    """一列分数：分子、分母分别存放在两个并行数组中
+
+    与 Fraction 不同，减法允许出现负数、除以零不会抛错，
+    结果中分母为 0 的元素表示无效，可用 valid() 过滤。
+    """
+
+    __slots__ = ('numerators', 'denominators')
+
+    def __init__(self, numerators, denominators=None):
+        numerators = _as_array(numerators)
+        if denominators is None:
+            denominators = np.ones(numerators.shape, dtype=np.int64)
+        else:
+            denominators = _as_array(denominators)
+        if numerators.shape != denominators.shape:
+            raise ValueError("分子与分母的长度不一致")
+        if (denominators == 0).any():
+            raise ValueError("分母不能为0")
+        self.numerators, self.denominators = _reduce(numerators, denominators)
+
+    @classmethod
+    def _from_reduced(cls, numerators, denominators):
+        """内部构造：调用方保证已约分，跳过规范化"""
+        obj = object.__new__(cls)
+        obj.numerators = numerators
+        obj.denominators = denominators
+        return obj
+
+    @classmethod
+    def from_fractions(cls, fractions):
+        """由 Fraction 序列构造"""
+        fractions = list(fractions)
+        return cls._from_reduced(_as_array([f.numerator for f in fractions]),
+                                 _as_array([f.denominator for f in fractions]))
+
+    @classmethod
+    def from_strings(cls, strings):
+        """批量解析题目格式的数字字符串（如 2'3/8）"""
+        return cls.from_fractions(Fraction.from_string(s) for s in strings)
+
+    def to_fractions(self):
+        """转换为 Fraction 列表，无效元素为 None"""
+        return [Fraction._from_reduced(n, d) if d else None
+                for n, d in zip(self.numerators.tolist(), self.denominators.tolist())]
+
+    def to_strings(self):
+        """批量渲染为题目格式的字符串，无效元素为 None"""
+        return [_format(n, d) if d else None
+                for n, d in zip(self.numerators.tolist(), self.denominators.tolist())]
+
+    def valid(self):
+        """有效元素掩码"""
+        return self.denominators != 0
+
+    def is_zero(self):
+        """零值掩码（无效元素不计为零）"""
+        return (self.numerators == 0) & self.valid()
+
+    @staticmethod
+    def where(mask, a, b):
+        """按掩码逐元素选取：mask 为真取 a，否则取 b"""
+        return FractionArray._from_reduced(_shrink(np.where(mask, a.numerators, b.numerators)),
+                                           _shrink(np.where(mask, a.denominators, b.denominators)))
+
+    def __len__(self):
+        return len(self.numerators)
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            numerator, denominator = int(self.numerators[index]), int(self.denominators[index])
+            return Fraction._from_reduced(numerator, denominator) if denominator else None
+        return FractionArray._from_reduced(self.numerators[index], self.denominators[index])
+
+    # ---------------------- 四则运算 ----------------------
+    def _coerce(self, other):
+        if isinstance(other, FractionArray):
+            if len(other) != len(self):
+                raise ValueError("参与运算的分数数组长度不一致")
+            return other
+        if isinstance(other, int):
+            other = Fraction._from_reduced(other, 1)
+        if isinstance(other, Fraction):
+            shape = self.numerators.shape
+            return FractionArray._from_reduced(_shrink(np.full(shape, other.numerator, dtype=object)),
+                                               _shrink(np.full(shape, other.denominator, dtype=object)))
+        return NotImplemented
+
+    def _binary(self, other, kernel):
+        other = self._coerce(other)
+        if other is NotImplemented:
+            return NotImplemented
+        operands = (self.numerators, self.denominators, other.numerators, other.denominators)
+        risky = np.zeros(len(self), dtype=bool)
+        for values in operands:
+            risky |= (np.abs(values) >= _SAFE_BOUND).astype(bool)
+
+        if not risky.any():
+            safe_operands = [values.astype(np.int64, copy=False) for values in operands]
+            return FractionArray._from_reduced(*_reduce(*kernel(*safe_operands)))
+
+        # 逐元素回退：安全元素仍走 int64 向量运算，有溢出风险的元素用 Python 整数计算
+        numerators = np.empty(len(self), dtype=object)
+        denominators = np.empty(len(self), dtype=object)
+        safe = ~risky
+        if safe.any():
+            n, d = kernel(*[values[safe].astype(np.int64) for values in operands])
+            numerators[safe] = n.astype(object)
+            denominators[safe] = d.astype(object)
+        for i in np.flatnonzero(risky).tolist():
+            numerators[i], denominators[i] = kernel(*[int(values[i]) for values in operands])
+        numerators, denominators = _reduce(numerators, denominators)
+        return FractionArray._from_reduced(_shrink(numerators), _shrink(denominators))
+
+    def _cross(self, other):
+        """交叉相乘得到可直接比较的两列（分母恒为正）"""
+        other = self._coerce(other)
+        risky = np.zeros(len(self), dtype=bool)
+        for values in (self.numerators, self.denominators, other.numerators, other.denominators):
+            risky |= (np.abs(values) >= _SAFE_BOUND).astype(bool)
+        if risky.any():
+            return (self.numerators.astype(object) * other.denominators.astype(object),
+                    other.numerators.astype(object) * self.denominators.astype(object))
+        return self.numerators * other.denominators, other.numerators * self.denominators
+
+    def __lt__(self, other):
+        left, right = self._cross(other)
+        return (left < right).astype(bool)
+
+    def __le__(self, other):
+        left, right = self._cross(other)
+        return (left <= right).astype(bool)
+
+    def __gt__(self, other):
+        left, right = self._cross(other)
+        return (left > right).astype(bool)
+
+    def __ge__(self, other):
+        left, right = self._cross(other)
+        return (left >= right).astype(bool)
+
+    def add(self, other):
+        return self._binary(other, _add)
+
+    def sub(self, other):
+        return self._binary(other, _sub)
+
+    def mul(self, other):
+        return self._binary(other, _mul)
+
+    def div(self, other):
+        return self._binary(other, _div)
+
+    __add__ = add
+    __sub__ = sub
+    __mul__ = mul
+    __truediv__ = div
@@ -1,45 +1,453 @@
+# re、hashlib 只在批改扫描与旧的字符串查重中用到，在函数内导入以加快启动
 import random
-import hashlib
-import re
+from collections import OrderedDict
+from itertools import islice, zip_longest
+from fileio import open_text
 from fraction import Fraction
+from fingerprint_store import create_store
+from counter_random import CounterRandom
+
+# 规范形式中各运算符的编号，叶子节点编号为 0
+OPERATOR_CODES = {'+': 1, '-': 2, '×': 3, '÷': 4}
+# 满足交换律和结合律的运算符编号
+COMMUTATIVE_CODES = {1, 3}
+FINGERPRINT_MASK = (1 << 64) - 1
+# 每道题的最大运算符数量
+MAX_OP_COUNT = 3
+# 种子模式下单道题的最大尝试次数（无效或重复时在同一条随机流上继续抽取）
+MAX_ATTEMPTS_PER_INDEX = 100
+# 题目空间（或其中一层）上界不超过该值时才允许完整枚举
+ENUMERATION_LIMIT = 1 << 19
+# 请求数量（或落在某一层的抽取次数）达到不重复题目数量的该比例时，改为枚举后无放回抽样
+DENSE_RATIO = 0.25
+# 可枚举的层（及 r <= 4 时的整个空间）中不重复题目数量都不少于上界的 1/5（最少的是 r=4 时
+# 三个运算符的一层，约 0.248），请求数量低于上界的该比例时必然不稠密，不必为精确计数而枚举
+SPARSE_RATIO = DENSE_RATIO / 5
+# 各运算符数量对应的二叉树形状数（卡特兰数）
+SHAPE_COUNTS = [1, 1, 2, 5, 14, 42]
+# 批改时的记号扫描：数字（自然数、真分数、带分数）或运算符、括号；首次扫描时编译
+TOKEN_PATTERN = r"\s*(?:(\d+(?:'\d+/\d+|/\d+)?)|([-+×÷()]))"
+_tokenMatch = None
+# 运算符优先级
+PRECEDENCE = {'+': 1, '-': 1, '×': 2, '÷': 2}
+# 批改时子表达式缓存的默认容量
+CHECKER_CACHE_SIZE = 1 << 16
+# 求值器版本：求值规则变化时递增，使磁盘上的答案缓存失效
+EVALUATOR_VERSION = 2
+# 写评分文件时每块的题号数量
+CHUNK_NUMBERS = 4096
+# 评分文件格式：逐个列出题号，或把连续的题号写成区间
+GRADE_FORMATS = ('list', 'ranges')
+# 流式批改时标记文件已读完
+_MISSING = object()
+
+
+def canonical_leaf(value):
+    """叶子节点的规范形式"""
+    return (0,) + value.canonical_key()
+
+
+def canonical_node(operator, left_key, right_key):
+    """由左右子树的规范形式合成当前节点的规范形式
+
+    加法、乘法把同一运算符下的连续分组展平并排序，
+    因此交换律和结合律下等价的题目得到相同的规范形式。
+    """
+    code = OPERATOR_CODES[operator]
+    if code in COMMUTATIVE_CODES:
+        operands = []
+        for key in (left_key, right_key):
+            if key[0] == code:
+                operands.extend(key[1])
+            else:
+                operands.append(key)
+        operands.sort()
+        return code, tuple(operands)
+    return code, left_key, right_key
+
+
+def fingerprint(key):
+    """规范形式的 64 位整数指纹（整数元组的哈希与进程无关）"""
+    return hash(key) & FINGERPRINT_MASK
+
+
+def render(node):
+    """把表达式树渲染为字符串，运算节点带括号"""
+    if isinstance(node, Fraction):
+        return str(node)
+    operator, left, right = node
+    return f"({render(left)} {operator} {render(right)})"
+
+
+def op_count_distribution(max_op_count=MAX_OP_COUNT):
+    """随机生成的题目中运算符数量的分布 {运算符数量: 概率}
+
+    根节点在 1 到 max_op_count 之间等概率选择数量并随机拆分给左右子树，子树在拆分出的数量内再次选择，
+    因此三个运算符时分布为 1/3、4/9、2/9，而不是各占 1/3。
+    """
+    distributions = [{0: 1.0}]
+    for budget in range(1, max_op_count + 1):
+        distribution = {}
+        for op_count in range(1, budget + 1):
+            for left_op_count in range(op_count):
+                weight = 1 / (budget * op_count)
+                for left, p in distributions[left_op_count].items():
+                    for right, q in distributions[op_count - 1 - left_op_count].items():
+                        total = left + right + 1
+                        distribution[total] = distribution.get(total, 0) + weight * p * q
+        distributions.append(distribution)
+    return distributions[max_op_count]
+
+
+def leaf_count(range_val):
+    """leaf_values(range_val) 的长度：r-1 个自然数加上分母为 2 到 r-1 的最简真分数（欧拉函数之和），不生成各个数值"""
+    if range_val < 2:
+        return 0
+    phi = list(range(range_val))
+    for i in range(2, range_val):
+        if phi[i] == i:
+            for j in range(i, range_val, i):
+                phi[j] -= phi[j] // i
+    return range_val - 1 + sum(phi[2:])
+
+
+def leaf_values(range_val):
+    """generate_number 可能产生的全部数值：自然数 [1, r) 与分母小于 r 的真分数（按数值去重）"""
+    values = {Fraction.intern(i) for i in range(1, range_val)}
+    for denominator in range(2, range_val):
+        for numerator in range(1, denominator):
+            values.add(Fraction.intern(numerator, denominator))
+    return sorted(values)
 
 
 class ExerciseGenerator:
     """生成算术练习题及答案"""
 
-    def __init__(self, range_val):
+    def __init__(self, range_val, store='exact', seed=None, constrained=True):
         self.range = range_val  # 数字范围
         self.operators = ['+', '-', '×', '÷']  # 支持的运算符
-        self.hashList = set()  # 用于存储题目哈希值，确保唯一性
+        self.hashList = set()  # 用于存储题目哈希值，确保唯一性（字符串接口）
+        # 已生成题目的规范形式指纹：'exact' / 'bloom' / 'set' 或现成的存储对象
+        self.store = create_store(store) if isinstance(store, str) else store
+        # 种子模式：第 i 道题只由 (种子, i, 范围) 决定；否则使用全局 random
+        self.seed = seed
+        self.rng = random if seed is None else CounterRandom(seed)
+        # 约束构造：按运算符挑选操作数，使结果天然有效；关闭时沿用先生成后修正/重试的方式
+        self.constrained = constrained
+        # 生成统计：尝试次数、接受数、无效次数、重复次数、子树重新生成次数
+        self.stats = {'attempts': 0, 'accepted': 0, 'invalid': 0, 'duplicate': 0, 'regenerated': 0}
+        # 枚举得到的全部题目（默认运算符数量），首次需要时计算
+        self._space = None
+        # 种子模式下稠密请求使用的题目空间排列，首次需要时计算
+        self._order = None
+        # 按运算符数量分层枚举的结果：_trees[k] 为恰好含 k 个运算符的全部有效树（未去重），
+        # _strata[k] 为其中不重复的题目
+        self._trees = []
+        self._strata = {}
+        self._leafCount = None
 
     def generate_exercise(self, num):
         """生成指定数量的练习题及答案"""
         exercises = []
         answers = []
+        for exercise, answer in self.iter_exercises(num):
+            exercises.append(exercise)
+            answers.append(answer)
+        return exercises, answers
+
+    def iter_exercises(self, num):
+        """逐道产出 (题目行, 答案行)，调用方可边生成边写出，内存占用与题目数量无关"""
+        if self.seed is not None:
+            yield from self.iter_range(1, num, num)
+            return
+
+        strata = self.dense_strata(num)
+        if strata:
+            # 请求覆盖了某些层的很大一部分：随机生成会不断撞上重复，这些层改为枚举后无放回抽样
+            yield from self.iter_stratified(num, strata)
+            return
+
         count = 0
         i = 0
 
         # 最多尝试10*num次生成，防止无限循环
         max_attempts = num * 10
         while count < num and i < max_attempts:
-            try:
-                exercise, answer = self.generate_expression(3)
-                # 去除外层括号
-                if exercise.startswith('(') and exercise.endswith(')'):
-                    exercise = exercise[1:-1]
-                # 检查唯一性
-                if self.is_Unique(exercise):
-                    count += 1
-                    exercises.append(f"{count}. {exercise} = ")
-                    answers.append(f"{count}. {answer}")
-            except (ValueError, ZeroDivisionError):
-                # 忽略生成过程中的异常，继续尝试
-                pass
+            candidate = self.generate_candidate()
+            if candidate is not None:
+                exercise, answer = candidate
+                count += 1
+                yield f"{count}. {exercise} = ", f"{count}. {answer}"
             i += 1
 
-        return exercises, answers
+    def is_dense(self, num):
+        """请求数量是否达到不重复题目数量的 DENSE_RATIO（上界超过 ENUMERATION_LIMIT 时视为不稠密）"""
+        if not self.is_enumerable(MAX_OP_COUNT):
+            return False  # 最大的一层已超过枚举限制，整个空间更是如此
+        bound = self.space_upper_bound()
+        if bound > ENUMERATION_LIMIT or num < bound * SPARSE_RATIO:
+            return False
+        return num >= len(self.enumerated_space()) * DENSE_RATIO
+
+    def dense_strata(self, num):
+        """按运算符数量分层判断稠密：返回 {运算符数量: 该层全部不重复题目}，只含稠密的层
+
+        随机生成时约 1/3 的抽取落在只有一个运算符的层，这一层很小，远早于整个空间饱和；
+        因此按 op_count_distribution 估计落在各层的题目数量，与该层不重复题目的精确数量比较。
+        某层的估计超过其全部题目时该层会被抽完，多出的部分按比例分给其余的层，再重新比较。
+        上界超过 ENUMERATION_LIMIT 的层不枚举，照常随机生成。
+        """
+        active = op_count_distribution()
+        sizes = {}  # 已枚举的层的不重复题目数量
+        demand = num
+        while active:
+            total = sum(active.values())
+            shares = {k: demand * weight / total for k, weight in active.items()}
+            for op_count, share in shares.items():
+                if op_count in sizes or not self.is_enumerable(op_count):
+                    continue
+                if share >= self.stratum_upper_bound(op_count) * SPARSE_RATIO:
+                    sizes[op_count] = len(self.stratum(op_count))
+            full = [k for k in active if k in sizes and shares[k] >= sizes[k]]
+            if not full:
+                break
+            for op_count in full:
+                demand -= sizes[op_count]
+                del active[op_count]
+        return {k: self.stratum(k) for k, size in sizes.items()
+                if k not in active or shares[k] >= size * DENSE_RATIO}
+
+    def enumerated_space(self):
+        """默认运算符数量下的全部不重复题目，枚举一次后缓存在生成器上"""
+        if self._space is None:
+            self._space = self.enumerate_exercises()
+        return self._space
+
+    def stratum_upper_bound(self, op_count, leaves=None):
+        """恰好含 op_count 个运算符的题目数量上界（未去掉无效与等价的题目）；leaves 默认为叶子取值的数量"""
+        if leaves is None:
+            if self._leafCount is None:
+                self._leafCount = leaf_count(self.range)
+            leaves = self._leafCount
+        return SHAPE_COUNTS[op_count] * len(self.operators) ** op_count * leaves ** (op_count + 1)
+
+    def is_enumerable(self, op_count):
+        """该层的上界是否不超过 ENUMERATION_LIMIT；只按自然数估计已超过时不再计数真分数"""
+        if self.stratum_upper_bound(op_count, max(self.range - 1, 0)) > ENUMERATION_LIMIT:
+            return False
+        return self.stratum_upper_bound(op_count) <= ENUMERATION_LIMIT
+
+    def space_upper_bound(self, max_op_count=MAX_OP_COUNT):
+        """题目空间大小的上界：所有树形、运算符、叶子组合的数量（未去掉无效与等价的题目）"""
+        return sum(self.stratum_upper_bound(k) for k in range(1, max_op_count + 1))
+
+    def space_size(self, max_op_count=MAX_OP_COUNT):
+        """不重复题目的数量：上界不超过 ENUMERATION_LIMIT 的层精确枚举，其余的层按上界估计
+
+        返回 (数量, 是否精确)。
+        """
+        if self.space_upper_bound(max_op_count) <= ENUMERATION_LIMIT:
+            if max_op_count == MAX_OP_COUNT:
+                return len(self.enumerated_space()), True
+            return len(self.enumerate_exercises(max_op_count)), True
+        size = 0
+        for op_count in range(1, max_op_count + 1):
+            if self.is_enumerable(op_count):
+                size += len(self.stratum(op_count))
+            else:
+                size += self.stratum_upper_bound(op_count)
+        return size, False
+
+    def stratum(self, op_count):
+        """恰好含 op_count 个运算符的全部不重复题目 {指纹: (树, 数值)}，枚举一次后缓存在生成器上"""
+        exercises = self._strata.get(op_count)
+        if exercises is None:
+            exercises = {}
+            for node, value, key in self._tree_level(op_count):
+                exercises.setdefault(fingerprint(key), (node, value))
+            self._strata[op_count] = exercises
+        return exercises
+
+    def _tree_level(self, op_count):
+        """恰好含 op_count 个运算符的全部有效表达式树（未去重），各层依次计算并缓存"""
+        trees = self._trees
+        if not trees:
+            trees.append([(value, value, canonical_leaf(value)) for value in leaf_values(self.range)])
+        while len(trees) <= op_count:
+            level = []
+            count = len(trees)
+            for left_op_count in range(count):
+                for left in trees[left_op_count]:
+                    for right in trees[count - 1 - left_op_count]:
+                        for operator in self.operators:
+                            tree = self._combine(operator, left, right)
+                            if tree is not None:
+                                level.append(tree)
+            trees.append(level)
+        return trees[op_count]
+
+    def enumerate_exercises(self, max_op_count=MAX_OP_COUNT):
+        """枚举全部不重复的题目，返回 {指纹: (树, 数值)}"""
+        exercises = {}
+        for op_count in range(1, max_op_count + 1):
+            exercises.update(self.stratum(op_count))
+        return exercises
+
+    @staticmethod
+    def _combine(operator, left, right):
+        """按生成规则组合两棵子树，结果无效时返回 None"""
+        left_node, left_val, left_key = left
+        right_node, right_val, right_key = right
+        match operator:
+            case '+':
+                result = left_val + right_val
+            case '-':
+                if left_val < right_val:
+                    return None  # 交换后的组合会在另一次枚举中出现
+                result = left_val - right_val
+            case '×':
+                result = left_val * right_val
+            case '÷':
+                if right_val.is_zero():
+                    return None
+                result = left_val / right_val
+            case _:
+                raise ValueError(f"不支持的运算符 '{operator}'")
+        return (operator, left_node, right_node), result, canonical_node(operator, left_key, right_key)
+
+    def iter_stratified(self, num, strata):
+        """按运算符数量分层生成，逐道产出 (题目行, 答案行)
+
+        每道题先按随机生成时的分布（op_count_distribution）选择运算符数量：strata 中的稠密层
+        枚举后无放回抽样，抽完后不再选择该层；其余层随机生成恰好含该数量运算符的题目，重复时计入尝试次数。
+        所有层都抽完或达到 10*num 次尝试时结束。
+        """
+        rng, store, stats = self.rng, self.store, self.stats
+        pools = {}
+        for op_count, exercises in strata.items():
+            fresh = [fp for fp in exercises if fp not in store]
+            rng.shuffle(fresh)
+            pools[op_count] = fresh
+        weights = {k: w for k, w in op_count_distribution().items() if pools.get(k, True)}
+        choices, chances = list(weights), list(weights.values())
+        count = 0
+        attempts = 0
+        max_attempts = num * 10
+        while count < num and attempts < max_attempts and choices:
+            attempts += 1
+            op_count = rng.choices(choices, chances)[0]
+            pool = pools.get(op_count)
+            if pool is None:
+                candidate = self.generate_candidate(op_count)
+                if candidate is None:
+                    continue
+                exercise, answer = candidate
+            else:
+                fp = pool.pop()
+                if not pool:
+                    del weights[op_count]
+                    choices, chances = list(weights), list(weights.values())
+                store.add(fp)
+                stats['attempts'] += 1
+                stats['accepted'] += 1
+                node, value = strata[op_count][fp]
+                exercise, answer = render(node)[1:-1], str(value)
+            count += 1
+            yield f"{count}. {exercise} = ", f"{count}. {answer}"
+
+    def iter_range(self, start, stop, num=None):
+        """种子模式：按题号产出整份 num 道题（默认为 stop）中的第 start 至 stop 道，耗时只与范围大小有关
+
+        同一种子下任意一段都可以单独重新生成、分片生成或抽查。
+        题号范围内出现重复时在该题的随机流上继续抽取，
+        因此只有与范围外的题目恰好重复的题号才可能与整份生成的结果不同。
+        num 达到题目空间的 DENSE_RATIO 时（见 is_dense）逐题抽取会不断撞上重复，
+        改为取种子决定的题目空间排列（seeded_order）中的对应位置，各题号互不重复且不浪费尝试。
+        """
+        if self.seed is None:
+            raise ValueError("按题号生成需要指定随机种子")
+        if self.is_dense(stop if num is None else num):
+            yield from self._iter_ordered(start, stop)
+            return
+        for index in range(start, stop + 1):
+            candidate = self.exercise_at(index)
+            if candidate is None:
+                return  # 题目空间已耗尽
+            exercise, answer = candidate
+            yield f"{index}. {exercise} = ", f"{index}. {answer}"
+
+    def seeded_order(self):
+        """种子模式：整个题目空间的指纹按种子打乱后的排列，第 i 道题取第 i 个；计算一次后缓存
+
+        打乱使用第 0 条随机流（题号从 1 开始，不会与任何一道题的随机流重合）。
+        """
+        if self._order is None:
+            order = list(self.enumerated_space())
+            self.rng.seek(0)
+            self.rng.shuffle(order)
+            self._order = order
+        return self._order
+
+    def _iter_ordered(self, start, stop):
+        """按 seeded_order 产出第 start 至 stop 道题，超出题目空间的题号不再产出"""
+        exercises = self.enumerated_space()
+        order = self.seeded_order()
+        stats = self.stats
+        for index in range(start, min(stop, len(order)) + 1):
+            fp = order[index - 1]
+            self.store.add(fp)
+            stats['attempts'] += 1
+            stats['accepted'] += 1
+            node, value = exercises[fp]
+            yield f"{index}. {render(node)[1:-1]} = ", f"{index}. {value}"
+
+    def exercise_at(self, index):
+        """种子模式：生成第 index 道题，返回 (题目, 答案)；多次尝试仍失败时返回 None"""
+        self.rng.seek(index)
+        for _ in range(MAX_ATTEMPTS_PER_INDEX):
+            candidate = self.generate_candidate()
+            if candidate is not None:
+                return candidate
+        return None
+
+    def generate_candidate(self, op_count=None):
+        """尝试生成一道新题目，返回 (题目, 答案)；无效或重复时返回 None
+
+        唯一性在表达式树上判断，重复的候选题不会被渲染成字符串。
+        op_count 给定时只生成恰好含该数量运算符的题目。
+        """
+        stats = self.stats
+        stats['attempts'] += 1
+        candidate = self.draw_candidate(op_count)
+        if candidate is None:
+            stats['invalid'] += 1
+            return None
+        fp, node, value = candidate
+        if not self.store.add(fp):
+            stats['duplicate'] += 1
+            return None
+        stats['accepted'] += 1
+        # 去除外层括号
+        return render(node)[1:-1], str(value)
+
+    def attempts_per_exercise(self):
+        """每道被接受的题目平均消耗的尝试次数（含子树重新生成）"""
+        stats = self.stats
+        if not stats['accepted']:
+            return float('inf') if stats['attempts'] else 0.0
+        return (stats['attempts'] + stats['regenerated']) / stats['accepted']
+
+    def draw_candidate(self, op_count=None):
+        """生成一棵候选表达式树，返回 (指纹, 树, 数值)；生成失败时返回 None（不做唯一性检查）"""
+        try:
+            node, value, key = self.build_expression(MAX_OP_COUNT, op_count=op_count)
+        except (ValueError, ZeroDivisionError):
+            # 忽略生成过程中的异常，继续尝试
+            return None
+        return fingerprint(key), node, value
 
     def normalized_exercise(self, exercise):
+        import re
         # 校验表达式格式
         exercise = exercise.strip()
         # 检查基本格式：数字、运算符、括号的正确组合
@@ -86,6 +494,7 @@ class ExerciseGenerator:
             normalized = exercise  # 格式错误时使用原始字符串
 
         # 计算哈希值
+        import hashlib
         hash_val = hashlib.md5(normalized.encode()).hexdigest()
         if hash_val not in self.hashList:
             self.hashList.add(hash_val)
@@ -93,38 +502,63 @@ class ExerciseGenerator:
         return False
 
     def generate_number(self):
-        """生成自然数或真分数"""
-        is_integer = random.choice([True, False])
+        """生成自然数或真分数（取值空间很小，复用享元实例）"""
+        rng = self.rng
+        is_integer = rng.choice([True, False])
+        if self.constrained and self.range <= 2:
+            is_integer = True  # 分母小于 r 的真分数不存在，只能生成自然数
 
         if is_integer:
             # 生成自然数
-            integer_part = random.randint(1, self.range - 1)
-            return Fraction(numerator=0, denominator=1, integerPart=integer_part)
+            integer_part = rng.randint(1, self.range - 1)
+            return Fraction.intern(integer_part)
         else:
             # 生成真分数
-            denominator = random.randint(2, self.range - 1)
-            numerator = random.randint(1, denominator - 1)
-            return Fraction(numerator=numerator, denominator=denominator, integerPart=0)
+            denominator = rng.randint(2, self.range - 1)
+            numerator = rng.randint(1, denominator - 1)
+            return Fraction.intern(numerator, denominator)
 
     def generate_expression(self, max_op_count):
         """递归生成算术表达式"""
+        node, value, _ = self.build_expression(max_op_count)
+        return render(node), value
+
+    def build_expression(self, max_op_count, nonzero=False, op_count=None):
+        """递归生成表达式树，返回 (树, 数值, 规范形式)
+
+        叶子节点是 Fraction，运算节点是 (运算符, 左子树, 右子树)。
+        约束构造模式下先选运算符再按约束生成子树：除数子树要求非零，
+        nonzero 为 True 时整棵子树的值也保证非零，不需要任何重试。
+        op_count 给定时整棵树恰好含该数量的运算符；否则根节点在 1 到 max_op_count 之间随机选择，
+        子树在拆分出的数量内再次随机选择（实际数量的分布见 op_count_distribution）。
+        """
         if max_op_count == 0:
-            # 基础数字（无运算符）
+            # 基础数字（无运算符），自然数与真分数都大于零
             num = self.generate_number()
-            return (str(num), num)
+            return num, num, canonical_leaf(num)
 
-        # 随机生成运算符数量
-        op_count = random.randint(1, max_op_count)
+        # 随机生成运算符数量；指定数量时左右子树也按拆分出的数量精确生成
+        exact = op_count is not None
+        if not exact:
+            op_count = self.rng.randint(1, max_op_count)
         # 拆分左右表达式的运算符数量
-        left_op_count = random.randint(0, op_count - 1)
+        left_op_count = self.rng.randint(0, op_count - 1)
         right_op_count = op_count - 1 - left_op_count
-
-        # 递归生成左右表达式
-        left_expr, left_val = self.generate_expression(left_op_count)
-        right_expr, right_val = self.generate_expression(right_op_count)
-
-        # 随机选择运算符
-        operator = random.choice(self.operators)
+        left_exact = left_op_count if exact else None
+        right_exact = right_op_count if exact else None
+
+        if self.constrained:
+            # 随机选择运算符，再按运算符生成满足约束的左右表达式
+            operator = self.rng.choice(self.operators)
+            right_nonzero = operator == '÷' or (nonzero and operator == '×')
+            left_node, left_val, left_key = self.build_expression(left_op_count, nonzero, left_exact)
+            right_node, right_val, right_key = self.build_expression(right_op_count, right_nonzero, right_exact)
+        else:
+            # 递归生成左右表达式
+            left_node, left_val, left_key = self.build_expression(left_op_count, op_count=left_exact)
+            right_node, right_val, right_key = self.build_expression(right_op_count, op_count=right_exact)
+            # 随机选择运算符
+            operator = self.rng.choice(self.operators)
         result = None
 
         # 计算结果
@@ -132,27 +566,164 @@ class ExerciseGenerator:
             case '+':
                 result = left_val + right_val
             case '-':
-                # 确保减法结果非负
+                # 确保减法结果非负：右操作数取两者中较小的一个
                 if left_val < right_val:
-                    left_expr, right_expr = right_expr, left_expr
+                    left_node, right_node = right_node, left_node
                     left_val, right_val = right_val, left_val
-                result = left_val - right_val
+                    left_key, right_key = right_key, left_key
+                if nonzero and left_val == right_val:
+                    # 要求非零时相等的两数改为相加（左子树非零，和必然非零）
+                    operator = '+'
+                    result = left_val + right_val
+                else:
+                    result = left_val - right_val
             case '×':
                 result = left_val * right_val
             case '÷':
-                # 确保除数不为0
+                # 确保除数不为0（约束构造下除数子树已保证非零）
                 if right_val.is_zero():
-                    return self.generate_expression(max_op_count)
+                    self.stats['regenerated'] += 1
+                    return self.build_expression(max_op_count, op_count=op_count)
                 result = left_val / right_val
             case _:
                 raise ValueError(f"不支持的运算符 '{operator}'")
 
-        # 包装为带括号的表达式
-        return (f"({left_expr} {operator} {right_expr})", result)
+        return (operator, left_node, right_node), result, canonical_node(operator, left_key, right_key)
+
+
+def _apply_operator(values, operator):
+    """弹出两个操作数计算后压回，结果为负数或除数为零时返回 False"""
+    right = values.pop()
+    left = values.pop()
+    match operator:
+        case '+':
+            value = left + right
+        case '-':
+            value = left - right
+        case '×':
+            value = left * right
+        case '÷':
+            value = left / right
+    if value is None:
+        return False
+    values.append(value)
+    return True
+
+
+def _scan(exercise):
+    """用预编译的正则扫描为记号列表，出现非法符号时返回 None"""
+    global _tokenMatch
+    if _tokenMatch is None:
+        import re
+        _tokenMatch = re.compile(TOKEN_PATTERN).match
+    tokens = []
+    position = 0
+    end = len(exercise.rstrip())
+    scan = _tokenMatch
+    while position < end:
+        match = scan(exercise, position)
+        if match is None:
+            return None
+        position = match.end()
+        tokens.append(match.group(match.lastindex))
+    return tokens
+
+
+def _match_parentheses(tokens):
+    """返回 {左括号位置: 右括号位置}，括号不匹配时返回 None"""
+    closing = {}
+    opening = []
+    for i, token in enumerate(tokens):
+        if token == '(':
+            opening.append(i)
+        elif token == ')':
+            if not opening:
+                return None
+            closing[opening.pop()] = i
+    return None if opening else closing
+
+
+def _evaluate(tokens, checker=None):
+    """单遍计算记号列表，用显式栈按优先级计算；给出 checker 时缓存括号内子表达式"""
+    values = []
+    operators = []
+    groups = []  # 与栈中左括号一一对应的缓存键
+    closing = None
+    if checker is not None:
+        closing = _match_parentheses(tokens)
+        if closing is None:
+            return None
+    expect_operand = True
+    i = 0
+    count = len(tokens)
+    try:
+        while i < count:
+            token = tokens[i]
+            i += 1
+            if token == '(':
+                if not expect_operand:
+                    return None
+                key = None
+                if closing is not None:
+                    key = tuple(tokens[i:closing[i - 1]])
+                    value = checker._lookup(key)
+                    if value is not None:
+                        # 命中缓存：整个括号当作一个操作数
+                        values.append(value)
+                        expect_operand = False
+                        i = closing[i - 1] + 1
+                        continue
+                operators.append(token)
+                groups.append(key)
+            elif token == ')':
+                if expect_operand:
+                    return None
+                while operators and operators[-1] != '(':
+                    if not _apply_operator(values, operators.pop()):
+                        return None
+                if not operators:
+                    return None  # 缺少左括号
+                operators.pop()
+                key = groups.pop()
+                if key is not None:
+                    checker._store(key, values[-1])
+            elif token in PRECEDENCE:
+                if expect_operand:
+                    return None
+                precedence = PRECEDENCE[token]
+                while operators and operators[-1] != '(' and PRECEDENCE[operators[-1]] >= precedence:
+                    if not _apply_operator(values, operators.pop()):
+                        return None
+                operators.append(token)
+                expect_operand = True
+            else:
+                if not expect_operand:
+                    return None
+                values.append(Fraction.from_string(token))
+                expect_operand = False
+
+        if expect_operand:
+            return None
+        while operators:
+            operator = operators.pop()
+            if operator == '(' or not _apply_operator(values, operator):
+                return None  # 缺少右括号，或结果为负数、除数为零
+        return values[0]
+    except Exception:
+        return None
 
 
 class ExerciseChecker:
-    """批改练习题答案"""
+    """批改练习题答案
+
+    静态方法不使用缓存；实例的 evaluate 方法带有 LRU 缓存，
+    同一次批改中重复出现的子表达式只计算一次。
+    """
+
+    def __init__(self, cache_size=CHECKER_CACHE_SIZE):
+        self.cache_size = cache_size  # 缓存容量，为 0 时不缓存
+        self.cache = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0}
 
     @staticmethod
     def tokenize(exercise):
@@ -181,140 +752,189 @@ class ExerciseChecker:
 
     @staticmethod
     def parse_exercise(exercise):
-        """解析并计算表达式结果"""
-        try:
-            valid_ops = {'+', '-', '×', '÷', '(', ')'}
-            tokens = ExerciseChecker.tokenize(exercise)
-
-            # 检查非法符号
-            for token in tokens:
-                if token in valid_ops:
-                    continue
-                if not re.fullmatch(r'^\d+$|^\d+\'\d+/\d+$|^\d+/\d+$', token):
-                    return None
-
-            # 查找匹配的括号
-            def find_matching_parenthesis(tokens, start):
-                count = 1
-                for i in range(start + 1, len(tokens)):
-                    if tokens[i] == '(':
-                        count += 1
-                    elif tokens[i] == ')':
-                        count -= 1
-                        if count == 0:
-                            return i
-                return -1  # 缺少右括号
-
-            # 递归计算表达式
-            def evaluate(tokens):
-                if not tokens:
-                    return None
+        """解析并计算表达式结果（不使用缓存）"""
+        tokens = _scan(exercise)
+        return None if tokens is None else _evaluate(tokens)
+
+    def evaluate(self, exercise):
+        """解析并计算表达式结果，重复出现的题目和括号内子表达式从缓存中取得"""
+        tokens = _scan(exercise)
+        if tokens is None:
+            return None
+        if not self.cache_size:
+            return _evaluate(tokens)
+        key = tuple(tokens)
+        value = self._lookup(key)
+        if value is None:
+            value = _evaluate(tokens, self)
+            if value is not None:
+                self._store(key, value)
+        return value
+
+    def _lookup(self, key):
+        value = self.cache.get(key)
+        if value is None:
+            self.stats['misses'] += 1
+        else:
+            self.stats['hits'] += 1
+            self.cache.move_to_end(key)
+        return value
 
-                # 处理括号
-                i = 0
-                while i < len(tokens):
-                    if tokens[i] == '(':
-                        j = find_matching_parenthesis(tokens, i)
-                        if j == -1:
-                            return None
-                        inner_result = evaluate(tokens[i + 1:j])
-                        if inner_result is None:
-                            return None
-                        tokens = tokens[:i] + [str(inner_result)] + tokens[j + 1:]
-                    else:
-                        i += 1
-
-                # 单数字直接返回
-                if len(tokens) == 1:
-                    return ExerciseChecker.parse_fraction(tokens[0])
-
-                # 先处理乘除
-                for i in range(len(tokens) - 1, -1, -1):
-                    if tokens[i] in ['×', '÷']:
-                        left = evaluate(tokens[:i])
-                        right = evaluate(tokens[i + 1:])
-                        if left is None or right is None:
-                            return None
-                        if tokens[i] == '×':
-                            return left * right
-                        elif tokens[i] == '÷':
-                            if right.is_zero():
-                                return None
-                            return left / right
-
-                # 再处理加减
-                for i in range(len(tokens) - 1, -1, -1):
-                    if tokens[i] in ['+', '-']:
-                        left = evaluate(tokens[:i])
-                        right = evaluate(tokens[i + 1:])
-                        if left is None or right is None:
-                            return None
-                        if tokens[i] == '+':
-                            return left + right
-                        elif tokens[i] == '-':
-                            result = left - right
-                            if result is None or result.frac < 0:
-                                return None
-                            return result
+    def _store(self, key, value):
+        self.cache[key] = value
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)  # 淘汰最久未使用的子表达式
 
-                return None
-
-            return evaluate(tokens)
-        except:
-            return None
+    def cache_info(self):
+        """缓存统计：命中数、未命中数、当前条目数、容量"""
+        return {**self.stats, 'size': len(self.cache), 'capacity': self.cache_size}
 
     @staticmethod
-    def check_answers(exercise_file, answer_file):
-        """检查答案并生成评分结果"""
-        correct = []
-        wrong = []
+    def iter_key(exercise_file, checker=None, key_cache=False):
+        """依次产出各题的正确结果（无法计算时为 None）
+
+        key_cache 为 True 时使用题目文件旁的答案缓存（内容或求值器版本变化后自动重建）。
+        """
+        from binfmt import is_binary, BinaryExerciseFile
+        if is_binary(exercise_file):
+            # 二进制题目文件自带答案，无需解析表达式
+            with BinaryExerciseFile(exercise_file) as key_file:
+                yield from key_file.answers()
+            return
+        if key_cache:
+            from keycache import iter_cached_key
+            yield from iter_cached_key(exercise_file, checker)
+            return
+        evaluate = ExerciseChecker.parse_exercise if checker is None else checker.evaluate
+        with open_text(exercise_file) as f:
+            for expr in iter_items(f):
+                yield evaluate(expr.replace(' =', ''))
 
+    @staticmethod
+    def grade(exercise_file, answer_file, grade_file='Grade.txt', cache_size=CHECKER_CACHE_SIZE, key_cache=False,
+              grade_format='list'):
+        """流式批改：题目与答案逐行同步读取，结果记录为每题一个字节
+
+        内存占用与文件大小无关（除每题一个字节的结果外），
+        只有读到文件末尾发现数量不一致时才报错。
+        """
+        checker = ExerciseChecker(cache_size)
         try:
-            # 读取题目
-            with open(exercise_file, 'r', encoding='utf-8') as f:
-                exercises = []
-                for line in f:
-                    line = line.strip()
-                    if line:
-                        parts = line.split('.', 1)
-                        if len(parts) == 2:
-                            expr = parts[1].strip().replace(' =', '')
-                            exercises.append(expr)
-
-            # 读取答案
-            with open(answer_file, 'r', encoding='utf-8') as f:
-                answers = []
-                for line in f:
-                    line = line.strip()
-                    if line:
-                        parts = line.split('.', 1)
-                        if len(parts) == 2:
-                            ans = parts[1].strip()
-                            answers.append(ans)
-
-            # 校验数量匹配
-            if len(exercises) != len(answers):
-                raise Exception("错误：题目与答案数量不匹配。")
-
-            # 批改每道题
-            for i in range(len(exercises)):
-                calc_result = ExerciseChecker.parse_exercise(exercises[i])
-                user_ans = ExerciseChecker.parse_fraction(answers[i])
-
-                if (calc_result is not None and
-                        user_ans is not None and
-                        calc_result == user_ans):
-                    correct.append(str(i + 1))
-                else:
-                    wrong.append(str(i + 1))
+            keys = ExerciseChecker.iter_key(exercise_file, checker, key_cache)
+            with open_text(answer_file) as f:
+                result = GradeResult(ExerciseChecker.grade_pairs(keys, iter_items(f)))
 
             # 生成评分文件
-            with open('Grade.txt', 'w', encoding='utf-8') as f:
-                f.write(f"Correct: {len(correct)} ({', '.join(sorted(correct, key=int))})\n")
-                f.write(f"Wrong: {len(wrong)} ({', '.join(sorted(wrong, key=int))})\n")
-
-            return correct, wrong
+            if grade_file is not None:
+                result.write(grade_file, grade_format)
+            return result
 
         except Exception as e:
             print(f"批改错误: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    @staticmethod
+    def grade_pairs(keys, answers):
+        """逐对比较正确结果与答案文本，返回结果字节数组；数量不一致时报错"""
+        verdicts = bytearray()
+        parse_fraction = ExerciseChecker.parse_fraction
+        for calc_result, answer in zip_longest(keys, answers, fillvalue=_MISSING):
+            if calc_result is _MISSING or answer is _MISSING:
+                raise Exception("错误：题目与答案数量不匹配。")
+            user_ans = parse_fraction(answer)
+            verdicts.append(calc_result is not None and user_ans is not None and calc_result == user_ans)
+        return verdicts
+
+    @staticmethod
+    def check_answers(exercise_file, answer_file, cache_size=CHECKER_CACHE_SIZE):
+        """检查答案并生成评分结果，返回 (正确题号列表, 错误题号列表)"""
+        result = ExerciseChecker.grade(exercise_file, answer_file, cache_size=cache_size)
+        return result.correct(), result.wrong()
+
+
+class GradeResult:
+    """批改结果：每道题一个字节，1 表示正确、0 表示错误，题号从 1 开始"""
+
+    def __init__(self, verdicts=None):
+        self.verdicts = bytearray() if verdicts is None else verdicts
+
+    def __len__(self):
+        return len(self.verdicts)
+
+    @property
+    def correct_count(self):
+        return self.verdicts.count(1)
+
+    @property
+    def wrong_count(self):
+        return len(self.verdicts) - self.correct_count
+
+    def iter_numbers(self, verdict):
+        """按顺序产出结果为 verdict 的题号"""
+        find = self.verdicts.find
+        index = find(verdict)
+        while index != -1:
+            yield index + 1
+            index = find(verdict, index + 1)
+
+    def correct(self):
+        return [str(number) for number in self.iter_numbers(1)]
+
+    def wrong(self):
+        return [str(number) for number in self.iter_numbers(0)]
+
+    def iter_ranges(self, verdict):
+        """按顺序产出结果为 verdict 的连续题号区间 (起始, 结束)，两端都包含"""
+        verdicts = self.verdicts
+        find = verdicts.find
+        other = 1 - verdict
+        start = find(verdict)
+        while start != -1:
+            end = find(other, start + 1)
+            if end == -1:
+                end = len(verdicts)
+            yield start + 1, end
+            start = find(verdict, end)
+
+    def iter_text(self, verdict, grade_format='list'):
+        """按评分文件格式产出题号文本：list 为逐个题号，ranges 为连续区间（如 1-4999）"""
+        if grade_format == 'ranges':
+            return (str(start) if start == end else f"{start}-{end}" for start, end in self.iter_ranges(verdict))
+        return map(str, self.iter_numbers(verdict))
+
+    def format_line(self, label, verdict, grade_format='list'):
+        numbers = ', '.join(self.iter_text(verdict, grade_format))
+        count = self.correct_count if verdict else self.wrong_count
+        return f"{label}: {count} ({numbers})"
+
+    def lines(self, grade_format='list'):
+        """Grade.txt 的两行内容"""
+        return [self.format_line('Correct', 1, grade_format), self.format_line('Wrong', 0, grade_format)]
+
+    def write_to(self, f, grade_format='list', chunk_size=CHUNK_NUMBERS):
+        """分块写出评分内容，不在内存中拼接完整的题号列表"""
+        if grade_format not in GRADE_FORMATS:
+            raise ValueError(f"不支持的评分文件格式 '{grade_format}'")
+        for label, verdict, count in (('Correct', 1, self.correct_count), ('Wrong', 0, self.wrong_count)):
+            f.write(f"{label}: {count} (")
+            texts = self.iter_text(verdict, grade_format)
+            separator = ''
+            while chunk := list(islice(texts, chunk_size)):
+                f.write(separator + ', '.join(chunk))
+                separator = ', '
+            f.write(")\n")
+
+    def write(self, path, grade_format='list', chunk_size=CHUNK_NUMBERS):
+        """分块写出评分文件（扩展名为 .gz、.bz2、.xz 时压缩）"""
+        with open_text(path, 'w') as f:
+            self.write_to(f, grade_format, chunk_size)
+
+
+def iter_items(lines):
+    """从题目或答案文件的各行中取出题号之后的内容，跳过空行和没有题号的行"""
+    for line in lines:
+        line = line.strip()
+        if line:
+            parts = line.split('.', 1)
+            if len(parts) == 2:
+                yield parts[1].strip()
@@ -0,0 +1,130 @@
+import csv
+import json
+import os
+import time
+from multiprocessing import Pool
+from fileio import count_items, open_text, write_lines
+from generator import GRADE_FORMATS, ExerciseGenerator, ExerciseChecker, GradeResult, iter_items
+from keycache import KEY_CACHE_ENTRIES, AnswerKeyCache
+
+# 任务耗时汇总的默认文件名
+SUMMARY_FILE = 'jobs_summary.csv'
+SUMMARY_FIELDS = ['job', 'type', 'status', 'seconds', 'detail']
+
+# 进程内的答案键缓存，同一进程中的后续任务直接复用
+_keyCache = AnswerKeyCache(KEY_CACHE_ENTRIES)
+
+
+def load_manifest(path):
+    """读取任务清单（每行一个 JSON 对象），空行跳过，格式错误时报出行号"""
+    jobs = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                raise Exception(f"任务清单第 {line_number} 行格式错误: {e}")
+            if not isinstance(job, dict) or job.get('type') not in ('generate', 'check'):
+                raise Exception(f"任务清单第 {line_number} 行格式错误: type 必须是 generate 或 check")
+            jobs.append(job)
+    return jobs
+
+
+def answer_key(exercise_file):
+    """取得题目文件的正确结果，文件未变化时复用本进程中已计算的结果"""
+    return _keyCache.get(exercise_file)
+
+
+def job_files(job):
+    """任务读取与写入的文件（绝对路径集合）"""
+    if job['type'] == 'generate':
+        reads = ()
+        writes = (job.get('exercises', 'Exercises.txt'), job.get('answers', 'Answers.txt'))
+    else:
+        reads = (job.get('exercises'), job.get('answers'))
+        writes = (job.get('grade', 'Grade.txt'),)
+    return ({os.path.abspath(path) for path in reads if path is not None},
+            {os.path.abspath(path) for path in writes if path is not None})
+
+
+def job_waves(jobs):
+    """按文件依赖把任务分批：与前面任务读写同一文件（至少一方写）的任务排在其后一批
+
+    同一批内的任务互不依赖，可以并发执行；返回每个任务所在的批次号。
+    """
+    files = [job_files(job) for job in jobs]
+    waves = []
+    for j, (reads, writes) in enumerate(files):
+        wave = 0
+        for i in range(j):
+            earlier_reads, earlier_writes = files[i]
+            if earlier_writes & (reads | writes) or earlier_reads & writes:
+                wave = max(wave, waves[i] + 1)
+        waves.append(wave)
+    return waves
+
+
+def generate_job(job):
+    """生成任务：n、r 必填，seed、exercises、answers 可选"""
+    n, r = int(job['n']), int(job['r'])
+    if n < 1 or r < 1:
+        raise Exception("参数错误：n 与 r 必须是大于等于1的自然数")
+    generator = ExerciseGenerator(r, seed=job.get('seed'))
+    produced = [0]
+    write_lines(count_items(generator.iter_exercises(n), produced),
+                (job.get('exercises', 'Exercises.txt'), job.get('answers', 'Answers.txt')))
+    return f"生成 {produced[0]} 道题"
+
+
+def check_job(job):
+    """批改任务：exercises、answers 必填，grade、grade_format 可选"""
+    grade_format = job.get('grade_format', 'list')
+    if grade_format not in GRADE_FORMATS:
+        raise Exception(f"不支持的评分文件格式 '{grade_format}'")
+    key = answer_key(job['exercises'])
+    with open_text(job['answers']) as f:
+        result = GradeResult(ExerciseChecker.grade_pairs(key, iter_items(f)))
+    result.write(job.get('grade', 'Grade.txt'), grade_format)
+    return f"正确 {result.correct_count}，错误 {result.wrong_count}"
+
+
+def run_job(indexed_job):
+    """执行一个任务并计时，出错时记录错误信息而不中断其他任务"""
+    index, job = indexed_job
+    start = time.perf_counter()
+    try:
+        detail = generate_job(job) if job['type'] == 'generate' else check_job(job)
+        status = 'ok'
+    except KeyError as e:
+        status, detail = 'error', f"缺少字段 {e}"
+    except Exception as e:
+        status, detail = 'error', str(e)
+    return {'job': index, 'type': job['type'], 'status': status,
+            'seconds': f"{time.perf_counter() - start:.6f}", 'detail': detail}
+
+
+def run_jobs(manifest, workers=1, summary_file=SUMMARY_FILE):
+    """在一个解释器中执行清单中的全部任务，workers > 1 时使用常驻的进程池
+
+    各工作进程在任务之间保留答案键等缓存；结果按清单顺序写入耗时汇总。
+    使用进程池时按 job_waves 分批：读写同一文件的任务按清单顺序先后执行，其余任务并发执行。
+    """
+    jobs = list(enumerate(load_manifest(manifest), 1))
+    if workers > 1:
+        waves = job_waves([job for _, job in jobs])
+        rows = [None] * len(jobs)
+        with Pool(workers) as pool:
+            for wave in range(max(waves, default=-1) + 1):
+                batch = [i for i, w in enumerate(waves) if w == wave]
+                for i, row in zip(batch, pool.imap(run_job, [jobs[i] for i in batch])):
+                    rows[i] = row
+    else:
+        rows = [run_job(job) for job in jobs]
+
+    with open(summary_file, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
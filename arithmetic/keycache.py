@@ -0,0 +1,288 @@
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+from collections import OrderedDict
+from fileio import open_binary
+from fraction import Fraction
+from generator import EVALUATOR_VERSION, ExerciseChecker, iter_items
+
+# 缓存文件头：魔数、格式版本、求值器版本、题目文件的 SHA-256、题目数量
+MAGIC = b'ARKY'
+VERSION = 1
+HEADER = struct.Struct('<4sHH32sQ')
+# 缓存文件名后缀（与题目文件放在一起）
+SUFFIX = '.key'
+# 计算摘要时每次读取的字节数
+READ_BLOCK = 1 << 20
+# 写缓存时每块的题目数量
+CHUNK_ITEMS = 4096
+_INT64_MIN = -(1 << 63)
+_INT64_MAX = (1 << 63) - 1
+# 内存中缓存的题目文件（答案键）数量
+KEY_CACHE_ENTRIES = 8
+
+
+def cache_path(exercise_file):
+    return exercise_file + SUFFIX
+
+
+def file_digest(path):
+    """题目文件内容（压缩文件为解压后的内容）的 SHA-256"""
+    digest = hashlib.sha256()
+    with open_binary(path) as f:
+        while block := f.read(READ_BLOCK):
+            digest.update(block)
+    return digest.digest()
+
+
+class KeyArray:
+    """mmap 映射的正确结果数组，每题一对 int64（分子、分母），分母为 0 表示无法计算
+
+    通过 memoryview 直接访问映射的内存，加载时不复制数据。
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self.header = HEADER.unpack_from(self.mmap)
+            _, _, _, _, count = self.header
+            if len(self.mmap) != HEADER.size + count * 16:
+                raise ValueError(f"缓存文件长度不正确: {path}")
+        except (struct.error, ValueError):
+            self.mmap.close()
+            raise ValueError(f"不是有效的答案缓存文件: {path}")
+        self.view = memoryview(self.mmap)
+        self.pairs = self.view[HEADER.size:].cast('q')
+
+    def matches(self, digest):
+        magic, version, evaluator_version, stored_digest, _ = self.header
+        return (magic == MAGIC and version == VERSION and evaluator_version == EVALUATOR_VERSION
+                and stored_digest == digest)
+
+    def __len__(self):
+        return len(self.pairs) // 2
+
+    def __getitem__(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        denominator = self.pairs[2 * index + 1]
+        if not denominator:
+            return None
+        return Fraction._from_reduced(self.pairs[2 * index], denominator)
+
+    def __iter__(self):
+        pairs = self.pairs
+        for i in range(0, len(pairs), 2):
+            denominator = pairs[i + 1]
+            yield Fraction._from_reduced(pairs[i], denominator) if denominator else None
+
+    def close(self):
+        self.pairs.release()
+        self.view.release()
+        self.mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+
+def file_identity(path):
+    """(绝对路径, 修改时间, 大小)：文件被改写后随之变化，用作内存缓存的键"""
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_mtime_ns, stat.st_size
+
+
+def load_key(exercise_file):
+    """读取题目文件并计算全部正确结果"""
+    return list(ExerciseChecker.iter_key(exercise_file, ExerciseChecker()))
+
+
+class AnswerKeyCache:
+    """内存中的答案键缓存：按 file_identity 识别题目文件，文件变化后重新加载，超出数量时淘汰最久未用的
+
+    load 为加载函数（默认 load_key）；批改服务传入返回 Future 的函数，缓存的就是加载任务。
+    """
+
+    def __init__(self, max_entries=KEY_CACHE_ENTRIES, load=None):
+        self.max_entries = max_entries
+        self.load = load_key if load is None else load
+        self.entries = OrderedDict()
+        self.stats = {'hits': 0, 'loads': 0}
+
+    def get(self, exercise_file):
+        return self.lookup(file_identity(exercise_file), exercise_file)
+
+    def lookup(self, key, exercise_file):
+        """取出 key 对应的值，没有时加载并缓存（加载出错时不缓存）"""
+        value = self.entries.get(key)
+        if value is None:
+            self.stats['loads'] += 1
+            value = self.load(exercise_file)
+            self.entries[key] = value
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        else:
+            self.stats['hits'] += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def discard(self, key):
+        self.entries.pop(key, None)
+
+
+def open_cache(exercise_file, digest=None):
+    """打开与题目文件内容、求值器版本都一致的缓存，没有或已失效时返回 None
+
+    调用方已算出题目文件的摘要时可传入 digest，避免再读一遍文件。
+    """
+    path = cache_path(exercise_file)
+    if not os.path.exists(path):
+        return None
+    try:
+        key_array = KeyArray(path)
+    except (OSError, ValueError):
+        return None
+    if not key_array.matches(file_digest(exercise_file) if digest is None else digest):
+        key_array.close()
+        return None
+    return key_array
+
+
+def iter_cached_key(exercise_file, checker=None, digest=None):
+    """依次产出各题的正确结果：缓存有效时直接读取，否则计算并同时写出新的缓存
+
+    新缓存先写到临时文件，完整读完题目文件后才替换旧缓存；
+    摘要在计算的同一遍读取中得到，因此缓存总是对应实际解析的内容。
+    digest 为调用方已算出的题目文件摘要，只用于检查已有缓存是否有效。
+    """
+    key_array = open_cache(exercise_file, digest)
+    if key_array is not None:
+        with key_array:
+            yield from key_array
+        return
+
+    evaluate = ExerciseChecker.parse_exercise if checker is None else checker.evaluate
+    digest = hashlib.sha256()
+    writer = _CacheWriter(cache_path(exercise_file))
+    try:
+        with open_binary(exercise_file) as f:
+            lines = (digest.update(raw) or raw.decode('utf-8') for raw in f)
+            for expr in iter_items(lines):
+                value = evaluate(expr.replace(' =', ''))
+                writer.add(value)
+                yield value
+        writer.commit(digest.digest())
+    finally:
+        writer.abandon()
+
+
+def pack_key(values):
+    """把一段正确结果打包为缓存中的 int64 对（供多进程批改的工作进程使用），数值超出 64 位时返回 None"""
+    pairs = array('q')
+    for value in values:
+        if value is None:
+            pairs.extend((0, 0))
+        elif _INT64_MIN <= value.numerator <= _INT64_MAX and value.denominator <= _INT64_MAX:
+            pairs.extend((value.numerator, value.denominator))
+        else:
+            return None
+    return pairs.tobytes()
+
+
+def write_cache(exercise_file, digest, packed_chunks):
+    """按顺序写出各段打包好的正确结果作为新缓存；有一段为 None 时不写"""
+    writer = _CacheWriter(cache_path(exercise_file))
+    try:
+        for packed in packed_chunks:
+            if packed is None:
+                return
+            writer.add_packed(packed)
+        writer.commit(digest)
+    finally:
+        writer.abandon()
+
+
+class _CacheWriter:
+    """写缓存的临时文件；任何写入错误或数值超出 64 位时放弃缓存，不影响批改"""
+
+    def __init__(self, path):
+        self.path = path
+        self.temp_path = f"{path}.{os.getpid()}.tmp"
+        self.count = 0
+        self.pairs = array('q')
+        self.file = None
+        try:
+            self.file = open(self.temp_path, 'wb')
+            self.file.write(HEADER.pack(MAGIC, VERSION, EVALUATOR_VERSION, bytes(32), 0))
+        except OSError:
+            self.abandon()  # 无法写缓存时只计算
+
+    def add(self, value):
+        if self.file is None:
+            return
+        self.count += 1
+        if value is None:
+            self.pairs.extend((0, 0))
+        elif _INT64_MIN <= value.numerator <= _INT64_MAX and value.denominator <= _INT64_MAX:
+            self.pairs.extend((value.numerator, value.denominator))
+        else:
+            self.abandon()
+            return
+        if len(self.pairs) >= 2 * CHUNK_ITEMS:
+            self._flush()
+
+    def add_packed(self, packed):
+        """追加 pack_key 打包好的一段结果"""
+        if self.file is None:
+            return
+        self._flush()
+        if self.file is None:
+            return
+        try:
+            self.file.write(packed)
+        except OSError:
+            self.abandon()
+            return
+        self.count += len(packed) // 16
+
+    def _flush(self):
+        try:
+            self.file.write(self.pairs.tobytes())
+        except OSError:
+            self.abandon()
+        self.pairs = array('q')
+
+    def commit(self, digest):
+        """写入文件头并替换旧缓存"""
+        if self.file is None:
+            return
+        self._flush()
+        if self.file is None:
+            return
+        try:
+            self.file.seek(0)
+            self.file.write(HEADER.pack(MAGIC, VERSION, EVALUATOR_VERSION, digest, self.count))
+            self.file.close()
+            self.file = None
+            os.replace(self.temp_path, self.path)
+        except OSError:
+            self.abandon()
+
+    def abandon(self):
+        """丢弃未完成的缓存"""
+        if self.file is not None:
+            try:
+                self.file.close()
+            except OSError:
+                pass
+            self.file = None
+        try:
+            os.remove(self.temp_path)
+        except OSError:
+            pass
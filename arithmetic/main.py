@@ -1,38 +1,192 @@
 # 函数使用，变量使用小驼峰
-import argparse
-from generator import ExerciseGenerator, ExerciseChecker
+# 为了启动快，模块顶层只导入已随解释器加载的 os、sys；
+# argparse 与生成、批改模块在确定运行模式后才导入
+import os
+import sys
+
+# 延迟导入的名称及其所在模块，通过 _load 或 main.名称 访问
+_LAZY_NAMES = {
+    'ExerciseGenerator': 'generator',
+    'ExerciseChecker': 'generator',
+    'write_lines': 'fileio',
+    'count_items': 'fileio',
+}
+
+# 评分文件格式，与 generator.GRADE_FORMATS 相同；写在这里使解析参数时不必导入 generator
+GRADE_FORMATS = ('list', 'ranges')
+
+# 命令行参数的默认值（简单解析与 argparse 共用）
+_DEFAULTS = {
+    'n': None, 'r': None, 'e': None, 'a': None,
+    'workers': 1, 'seed': None, 'range_of_indices': None, 'binary': None,
+    'key_cache': False, 'incremental': False, 'grade_format': 'list',
+    'students': None, 'out_dir': 'grades', 'jobs': None, 'jobs_summary': 'jobs_summary.csv',
+    'serve': None, 'max_concurrency': 64, 'serve_root': None,
+    'vectorized': False, 'compress': None,
+}
+
+
+def __getattr__(name):
+    module = _LAZY_NAMES.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(__import__(module), name)
+    globals()[name] = value
+    return value
+
+
+def _load(name):
+    """取得延迟导入的名称（已被替换时使用替换后的对象）"""
+    return globals()[name] if name in globals() else __getattr__(name)
 
 
 def write_to_file(filename, content):
+    """写入文本文件：按块拼接后整块写入，扩展名为 .gz、.bz2、.xz 时压缩"""
     try:
-        with open(filename, 'w', encoding='utf-8') as f:
-            for line in content:
-                f.write(line + '\n')
+        _load('write_lines')(((line,) for line in content), (filename,))
         return True
     except Exception as e:
         print(f"写入文件 {filename} 失败: {e}")
         return False
 
 
-def main():
-    # 检查用户命令行输入
+def write_exercise_files(items, exercise_file, answer_file):
+    """边生成边写入题目和答案文件，写盘在后台线程中进行"""
+    try:
+        _load('write_lines')(items, (exercise_file, answer_file))
+        return True
+    except OSError as e:
+        print(f"写入文件 {exercise_file} / {answer_file} 失败: {e}")
+        return False
+
+
+def write_binary_files(items, binary_file, exercise_file='Exercises.txt', answer_file='Answers.txt'):
+    """在写入文本文件的同时写入二进制题目文件"""
+    from binfmt import BinaryExerciseWriter
+    try:
+        with BinaryExerciseWriter(binary_file) as writer:
+            if not write_exercise_files(writer.tee(items), exercise_file, answer_file):
+                writer.abort()
+                return False
+        print(f"二进制题目已写入{binary_file}")
+        return True
+    except OSError as e:
+        print(f"写入文件 {binary_file} 失败: {e}")
+        return False
+
+
+def parse_index_range(text, num):
+    """解析 --range-of-indices 参数（形如 200-300，题号从 1 开始且包含两端）"""
+    try:
+        start, stop = (int(part) for part in text.split('-'))
+    except ValueError:
+        raise Exception("参数错误：题号范围格式应为 起始-结束，例如 200-300")
+    if not 1 <= start <= stop <= num:
+        raise Exception(f"参数错误：题号范围必须落在 1-{num} 之内")
+    return start, stop
+
+
+def build_parser():
+    """完整的命令行解析器"""
+    import argparse
     parser = argparse.ArgumentParser(description="一个四则运算法生成程序")
     parser.add_argument('-n', type=int, help='题目数量')
     parser.add_argument('-r', type=int, help='题目范围')
     parser.add_argument('-e', type=str, help='题目路径')
     parser.add_argument('-a', type=str, help='答案路径')
+    parser.add_argument('--workers', type=int, default=1, help='生成或批改使用的进程数')
+    parser.add_argument('--seed', type=int, help='随机种子，指定后生成结果可复现')
+    parser.add_argument('--range-of-indices', type=str, help='只生成指定题号范围（如 200-300），需要 --seed')
+    parser.add_argument('--binary', type=str, help='同时写入二进制题目文件（含答案，可直接用 -e 批改）')
+    parser.add_argument('--key-cache', action='store_true', help='批改时使用并维护题目文件旁的答案缓存（.key）')
+    parser.add_argument('--incremental', action='store_true', help='增量批改：只重新批改与上次相比变化的答案行')
+    parser.add_argument('--grade-format', choices=GRADE_FORMATS, default='list',
+                        help='评分结果格式：list 逐个列出题号，ranges 把连续题号写成区间')
+    parser.add_argument('--students', type=str, help='批量批改：学生答案所在目录或通配符（与 -e 一起使用）')
+    parser.add_argument('--out-dir', type=str, default='grades', help='批量批改时评分文件与汇总的输出目录')
+    parser.add_argument('--jobs', type=str,
+                        help='按任务清单（JSON 行）在一个进程中批量执行生成与批改任务；'
+                             '与 --workers 同用时，读写同一文件的任务按清单顺序先后执行')
+    parser.add_argument('--jobs-summary', type=str, default='jobs_summary.csv', help='任务耗时汇总文件')
+    parser.add_argument('--serve', type=str, help='以常驻服务方式批改，监听 host:port 或 unix:/路径')
+    parser.add_argument('--max-concurrency', type=int, default=64, help='批改服务同时处理的请求数上限')
+    parser.add_argument('--serve-root', type=str, help='批改服务允许访问的根目录（默认当前目录），请求中的路径不能超出')
+    parser.add_argument('--vectorized', action='store_true', help='使用向量化批量生成（需要 numpy）')
+    parser.add_argument('--compress', choices=('gz', 'bz2', 'xz'),
+                        help='生成时压缩题目与答案文件（Exercises.txt.gz 等）；批改时按扩展名自动识别')
+    parser.set_defaults(**_DEFAULTS)
+    return parser
+
+
+def parse_simple_args(argv):
+    """直接解析最常见的 -n N -r R 与 -e 路径 -a 路径 两种形式，其他情况返回 None 交给 argparse"""
+    if len(argv) != 4:
+        return None
+    values = dict(zip(argv[0::2], argv[1::2]))
+    if values.keys() == {'-n', '-r'}:
+        try:
+            return Arguments(n=int(values['-n']), r=int(values['-r']))
+        except ValueError:
+            return None
+    if values.keys() == {'-e', '-a'} and not any(value.startswith('-') for value in values.values()):
+        return Arguments(e=values['-e'], a=values['-a'])
+    return None
 
-    args = parser.parse_args()
+
+class Arguments:
+    """与 argparse.Namespace 相同用法的参数对象，未给出的参数取默认值"""
+
+    def __init__(self, **values):
+        self.__dict__.update(_DEFAULTS)
+        self.__dict__.update(values)
+
+
+def main():
+    # 检查用户命令行输入：常见的简单形式直接解析，其余交给 argparse
+    args = parse_simple_args(sys.argv[1:])
+    if args is None:
+        args = build_parser().parse_args()
 
     # 检查输入参数
     try:
         # 检查是否同时提供了生成和批改参数（这是不允许的）
         has_generation_args = args.n is not None or args.r is not None
-        has_grading_args = args.e is not None or args.a is not None
+        has_grading_args = args.e is not None or args.a is not None or args.students is not None
 
         if has_generation_args and has_grading_args:
             raise Exception("输入参数错误！不能同时使用生成模式和批改模式参数。")
 
+        # 任务清单模式：在一个进程中执行多个生成、批改任务
+        if args.jobs is not None:
+            if has_generation_args or has_grading_args or args.serve is not None:
+                raise Exception("输入参数错误！任务清单模式不能与其他模式参数同时使用。")
+            if args.workers < 1:
+                raise Exception("参数错误：进程数 workers 必须是大于等于1的自然数")
+            from jobs import run_jobs
+            try:
+                rows = run_jobs(args.jobs, args.workers, args.jobs_summary)
+            except Exception as e:
+                print(f"任务执行错误: {e}")
+                return 1
+            failed = sum(1 for row in rows if row['status'] != 'ok')
+            print(f"已完成 {len(rows) - failed} 个任务，{failed} 个出错")
+            print(f"耗时汇总已写入{args.jobs_summary}")
+            return 0 if not failed else 1
+
+        # 服务模式：常驻进程，通过套接字接收批改请求
+        if args.serve is not None:
+            if has_generation_args or has_grading_args:
+                raise Exception("输入参数错误！服务模式不能与生成模式或批改模式参数同时使用。")
+            if args.max_concurrency < 1:
+                raise Exception("参数错误：并发上限 max-concurrency 必须是大于等于1的自然数")
+            import asyncio
+            from server import serve
+            try:
+                asyncio.run(serve(args.serve, args.max_concurrency, args.serve_root))
+            except KeyboardInterrupt:
+                pass
+            return 0
+
         # 检查生成模式参数是否完整
         if has_generation_args:
             if args.n is None or args.r is None:
@@ -41,33 +195,95 @@ def main():
                 raise Exception("参数错误：题目数量 n 必须是大于等于1的自然数")
             if args.r < 1:
                 raise Exception("参数错误：范围参数 r 必须是大于等于1的自然数")
+            if args.workers < 1:
+                raise Exception("参数错误：进程数 workers 必须是大于等于1的自然数")
+            if args.range_of_indices is not None:
+                if args.seed is None:
+                    raise Exception("输入参数错误！按题号范围生成需要同时提供 --seed 参数。")
+                if args.workers > 1:
+                    raise Exception("输入参数错误！按题号范围生成不支持多进程。")
+                index_range = parse_index_range(args.range_of_indices, args.n)
+            if args.vectorized and (args.workers > 1 or args.range_of_indices is not None):
+                raise Exception("输入参数错误！向量化生成不支持多进程和按题号范围生成。")
 
             # 生成模式 -> 调用生成题目函数
             print(f"正在生成题目……")
-            generator = ExerciseGenerator(args.r)
-            exercises, answers = generator.generate_exercise(args.n)
-
-            # 将题目和答案分别导出
-            if write_to_file('Exercises.txt', exercises):
-                print("题目已写入Exercises.txt")
+            if args.vectorized:
+                from batch_generator import BatchGenerator
+                items = BatchGenerator(args.r, seed=args.seed).iter_exercises(args.n)
+            elif args.workers > 1:
+                from parallel import iter_parallel
+                items = iter_parallel(args.r, args.n, args.workers, seed=args.seed)
+            elif args.seed is None:
+                generator = _load('ExerciseGenerator')(args.r)
+                items = generator.iter_exercises(args.n)
             else:
-                print("题目写入失败")
+                generator = _load('ExerciseGenerator')(args.r, seed=args.seed)
+                if args.range_of_indices is not None:
+                    items = generator.iter_range(*index_range, args.n)
+                else:
+                    items = generator.iter_exercises(args.n)
 
-            if write_to_file('Answers.txt', answers):
-                print("答案已写入Answers.txt")
+            # 将题目和答案边生成边分别导出（指定 --compress 时压缩写入）
+            suffix = '' if args.compress is None else '.' + args.compress
+            exercise_file, answer_file = 'Exercises.txt' + suffix, 'Answers.txt' + suffix
+            produced = [0]
+            if args.binary is not None:
+                written = write_binary_files(_load('count_items')(items, produced), args.binary, exercise_file, answer_file)
+            else:
+                written = write_exercise_files(_load('count_items')(items, produced), exercise_file, answer_file)
+            if written:
+                print(f"题目已写入{exercise_file}")
+                print(f"答案已写入{answer_file}")
             else:
+                print("题目写入失败")
                 print("答案写入失败")
+            expected = args.n if args.range_of_indices is None else index_range[1] - index_range[0] + 1
+            if produced[0] < expected:
+                print(f"注意：该范围内不重复的题目不足，只生成了 {produced[0]} 道题")
+
+        # 批量批改：一份题目，多名学生的答案
+        elif has_grading_args and args.students is not None:
+            if args.e is None or args.a is not None:
+                raise Exception("输入参数错误！批量批改需要 -e 和 --students 参数，不能同时使用 -a。")
+            if args.workers < 1:
+                raise Exception("参数错误：进程数 workers 必须是大于等于1的自然数")
+
+            print(f"正在批量批改……")
+            from batch_grade import grade_students, SUMMARY_FILE
+            try:
+                rows = grade_students(args.e, args.students, args.out_dir, args.workers)
+            except Exception as e:
+                print(f"批改错误: {e}")
+                return 1
+            failed = sum(1 for row in rows if row['error'])
+            print(f"已批改 {len(rows) - failed} 份答案，{failed} 份出错")
+            print(f"汇总已写入{os.path.join(args.out_dir, SUMMARY_FILE)}")
 
         # 检查批改模式参数是否完整
         elif has_grading_args:
             if args.e is None or args.a is None:
                 raise Exception("输入参数错误！批改模式需要同时提供 -e 和 -a 参数。")
 
+            if args.workers < 1:
+                raise Exception("参数错误：进程数 workers 必须是大于等于1的自然数")
+
             print(f"正在批改……")
             try:
-                correct, wrong = ExerciseChecker.check_answers(args.e, args.a)
-                print(f"Correct: {len(correct)} ({', '.join(sorted(correct, key=int))})")
-                print(f"Wrong: {len(wrong)} ({', '.join(sorted(wrong, key=int))})")
+                if args.incremental:
+                    from regrade import regrade
+                    result, regraded = regrade(args.e, args.a, grade_format=args.grade_format,
+                                               key_cache=args.key_cache)
+                    print(f"重新批改了 {regraded} 道题")
+                elif args.workers > 1:
+                    from parallel import grade_parallel
+                    result = grade_parallel(args.e, args.a, args.workers, grade_format=args.grade_format,
+                                            key_cache=args.key_cache)
+                else:
+                    result = _load('ExerciseChecker').grade(args.e, args.a, key_cache=args.key_cache,
+                                                            grade_format=args.grade_format)
+                # 与 Grade.txt 相同的内容分块输出，不拼接完整的题号列表
+                result.write_to(sys.stdout, args.grade_format)
             except Exception as e:
                 print(f"批改错误: {e}")
                 return 1
@@ -86,4 +302,18 @@ if __name__ == "__main__":
     main()
 
 # python main.py -e Exercises.txt -a Answers.txt
-# python main.py -n 10 -r 10
\ No newline at end of file
+# python main.py -n 10 -r 10
+# python main.py -n 100000 -r 10 --workers 8
+# python main.py -n 100000 -r 10 --seed 42 --range-of-indices 500-600
+# python main.py -n 1000000 -r 10 --vectorized
+# python main.py -n 1000000 -r 10 --compress gz
+# python main.py -e Exercises.txt.gz -a Answers.txt.gz
+# python main.py -n 10000 -r 10 --binary Exercises.bin
+# python main.py -e Exercises.bin -a Answers.txt
+# python main.py -e Exercises.txt -a Answers.txt --workers 8
+# python main.py -e Exercises.txt -a Answers.txt --key-cache
+# python main.py -e Exercises.txt -a Answers.txt --incremental
+# python main.py -e Exercises.txt -a Answers.txt --grade-format ranges
+# python main.py -e Exercises.txt --students submissions/ --out-dir grades --workers 8
+# python main.py --serve 127.0.0.1:8765 --serve-root data/
+# python main.py --jobs manifest.jsonl --workers 4
\ No newline at end of file
@@ -0,0 +1,231 @@
+import io
+import math
+import mmap
+import os
+import random
+from collections import deque
+from itertools import islice
+from multiprocessing import Pool
+from binfmt import is_binary, BinaryExerciseFile
+from fileio import is_compressed
+from fingerprint_store import create_store
+from generator import CHECKER_CACHE_SIZE, ExerciseGenerator, ExerciseChecker, GradeResult, iter_items, render
+from keycache import KeyArray, cache_path, file_digest, open_cache, pack_key, write_cache
+
+# 并行批改时每个进程分到的块数（块越多负载越均衡）
+CHUNKS_PER_WORKER = 4
+
+
+def _generate_batch(task):
+    """工作进程：用独立的随机种子生成一批候选题，批内先去重
+
+    按列返回 (指纹列表, 题目文本列表, 答案文本列表)，题目文本已带上 " = "，
+    主进程只需拼接题号。
+    """
+    range_val, size, seed = task
+    random.seed(seed)
+    generator = ExerciseGenerator(range_val, store='set')
+    fps, exercises, answers = [], [], []
+    for _ in range(size):
+        candidate = generator.draw_candidate()
+        if candidate is None:
+            continue
+        fp, node, value = candidate
+        if generator.store.add(fp):
+            fps.append(fp)
+            exercises.append(render(node)[1:-1] + ' = ')
+            answers.append(str(value))
+    return fps, exercises, answers
+
+
+def _ordered_results(pool, func, tasks, window):
+    """按提交顺序取回结果，同时最多保留 window 个未完成任务，提前结束时不做多余的工作"""
+    tasks = iter(tasks)
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.apply_async(func, (task,)))
+        if len(pending) >= window:
+            break
+    while pending:
+        result = pending.popleft().get()
+        task = next(tasks, None)
+        if task is not None:
+            pending.append(pool.apply_async(func, (task,)))
+        yield result
+
+
+def generate_parallel(range_val, num, workers, store='exact', batch_size=None, seed=None):
+    """多进程生成练习题及答案，返回值与 ExerciseGenerator.generate_exercise 相同"""
+    exercises = []
+    answers = []
+    for exercise, answer in iter_parallel(range_val, num, workers, store, batch_size, seed):
+        exercises.append(exercise)
+        answers.append(answer)
+    return exercises, answers
+
+
+def iter_parallel(range_val, num, workers, store='exact', batch_size=None, seed=None):
+    """多进程逐道产出 (题目行, 答案行)
+
+    各进程只负责生成候选题并返回其 64 位指纹，主进程按任务顺序合并：
+    全局唯一性只由主进程的指纹表判定，无需跨进程加锁，题号也与进程调度无关。
+    给定 seed 时各任务的种子由它派生，整份结果可以复现。
+    主进程的合并（跨批去重、拼接题号）是串行部分：'exact' 每道题约 1.5 µs（'set' 约 1.3 µs，但内存约为 9 倍），
+    约为工作进程生成耗时（约 16 µs）的 1/10，因此加速比的上限约为 10 倍，进程数再多也不会更快。
+    """
+    if batch_size is None:
+        batch_size = max(64, min(4096, num // (workers * 4) + 1))
+    # 与单进程模式相同，最多尝试10*num次生成
+    task_count = math.ceil(num * 10 / batch_size)
+    rng = random if seed is None else random.Random(seed)
+    tasks = [(range_val, batch_size, rng.getrandbits(64)) for _ in range(task_count)]
+
+    with Pool(workers) as pool:
+        yield from _merge_batches(_ordered_results(pool, _generate_batch, tasks, workers * 2), num, store)
+
+
+def _merge_batches(batches, num, store='exact'):
+    """主进程：按顺序合并各批候选题，跨批去重并编号，最多产出 num 道
+
+    'exact' 的指纹表按 num 预先分配（每道题 8 字节的紧凑表，合并过程中不再扩容），
+    'set' 整批只做一次交集与合并（C 实现，但每道题约占 70 字节）；现成的存储对象按其 add_many 加入。
+    """
+    if isinstance(store, str):
+        seen = create_store(store, capacity=num) if store == 'exact' else create_store(store)
+    else:
+        seen = store
+    count = 0
+    for fps, exercises, answers in batches:
+        keep = seen.add_many(fps)
+        if not all(keep):
+            exercises = [exercise for exercise, new in zip(exercises, keep) if new]
+            answers = [answer for answer, new in zip(answers, keep) if new]
+        for exercise, answer in zip(exercises[:num - count], answers):
+            count += 1
+            number = f"{count}. "
+            yield number + exercise, number + answer
+        if count == num:
+            break
+
+
+def split_lines(path, parts):
+    """用 mmap 把文件按行边界切成至多 parts 段，返回 [(起始字节, 结束字节), ...]"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return [(0, 0)]
+    bounds = [0]
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        for k in range(1, parts):
+            newline = m.find(b'\n', max(size * k // parts, bounds[-1]) - 1)
+            if newline == -1 or newline + 1 >= size:
+                break
+            if newline + 1 > bounds[-1]:
+                bounds.append(newline + 1)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _read_chunk(path, start, end):
+    """用 mmap 读取一段字节并按行拆分"""
+    if start == end:
+        return []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        return m[start:end].decode('utf-8').split('\n')
+
+
+def _count_items(task):
+    """工作进程：统计一段中的有效题目或答案数量"""
+    path, start, end = task
+    return sum(1 for _ in iter_items(_read_chunk(path, start, end)))
+
+
+def _grade_chunk(task):
+    """工作进程：批改一块题目，答案从对齐的位置开始读取相同数量
+
+    题目来源 source 为 'binary'、'cache'（key_range 为题号范围）或 'text'（key_range 为字节范围）；
+    pack 为 True 时同时返回打包好的正确结果，供主进程写出答案缓存。返回 (结果字节, 打包结果或 None)。
+    """
+    exercise_file, source, key_range, answer_file, answer_start, skip, cache_size, pack = task
+    start, end = key_range
+    if source == 'binary':
+        with BinaryExerciseFile(exercise_file) as key_file:
+            keys = list(key_file.answers(start, end))
+    elif source == 'cache':
+        with KeyArray(cache_path(exercise_file)) as key_array:
+            keys = [key_array[i] for i in range(start, end)]
+    else:
+        checker = ExerciseChecker(cache_size)
+        keys = [checker.evaluate(expr.replace(' =', ''))
+                for expr in iter_items(_read_chunk(exercise_file, start, end))]
+    with open(answer_file, 'rb') as f:
+        f.seek(answer_start)
+        answers = islice(iter_items(io.TextIOWrapper(f, encoding='utf-8')), skip, skip + len(keys))
+        verdicts = bytes(ExerciseChecker.grade_pairs(keys, answers))
+    return verdicts, pack_key(keys) if pack else None
+
+
+def grade_parallel(exercise_file, answer_file, workers, grade_file='Grade.txt', cache_size=CHECKER_CACHE_SIZE,
+                   grade_format='list', key_cache=False):
+    """多进程批改，结果与 ExerciseChecker.grade 相同
+
+    先把两个文件按行边界切块并行统计各块的题目数，据此确定每块题目对应的答案起点，
+    再把题目块分给各进程批改，按块的顺序拼接结果。数量不一致时在批改之前报错。
+    压缩文件无法按字节位置切块，此时退回单进程的流式批改。
+    key_cache 为 True 时各进程直接读取有效的答案缓存；缓存不存在或已失效时照常计算，
+    由主进程按块的顺序写出新缓存。
+    """
+    if is_compressed(exercise_file) or is_compressed(answer_file):
+        return ExerciseChecker.grade(exercise_file, answer_file, grade_file, cache_size, key_cache, grade_format)
+    parts = workers * CHUNKS_PER_WORKER
+    source, total, digest = 'text', None, None
+    if is_binary(exercise_file):
+        with BinaryExerciseFile(exercise_file) as key_file:
+            source, total = 'binary', len(key_file)
+    elif key_cache:
+        digest = file_digest(exercise_file)
+        key_array = open_cache(exercise_file, digest)
+        if key_array is not None:
+            with key_array:
+                source, total = 'cache', len(key_array)
+    pack = source == 'text' and key_cache
+    try:
+        with Pool(workers) as pool:
+            answer_ranges = split_lines(answer_file, parts)
+            answer_counts = pool.map(_count_items, [(answer_file, *r) for r in answer_ranges])
+            if total is not None:
+                step = max(1, math.ceil(total / parts))
+                key_ranges = [(i, min(i + step, total)) for i in range(0, total, step)]
+                key_counts = [end - start for start, end in key_ranges]
+            else:
+                key_ranges = split_lines(exercise_file, parts)
+                key_counts = pool.map(_count_items, [(exercise_file, *r) for r in key_ranges])
+            if sum(key_counts) != sum(answer_counts):
+                raise Exception("错误：题目与答案数量不匹配。")
+
+            # 第 k 块题目从第 first 道开始：找到包含它的答案段，并跳过该段中之前的答案
+            tasks = []
+            first = 0
+            segment = 0
+            segment_first = 0
+            for key_range, count in zip(key_ranges, key_counts):
+                if not count:
+                    continue
+                while segment_first + answer_counts[segment] <= first:
+                    segment_first += answer_counts[segment]
+                    segment += 1
+                tasks.append((exercise_file, source, key_range, answer_file, answer_ranges[segment][0],
+                              first - segment_first, cache_size, pack))
+                first += count
+            verdicts, packed = zip(*pool.map(_grade_chunk, tasks)) if tasks else ((), ())
+            result = GradeResult(bytearray().join(verdicts))
+        if pack:
+            write_cache(exercise_file, digest, packed)
+
+        # 生成评分文件
+        if grade_file is not None:
+            result.write(grade_file, grade_format)
+        return result
+
+    except Exception as e:
+        print(f"批改错误: {e}")
+        raise
@@ -1,6 +1,9 @@
 import cProfile
 import pstats
+import re
+import time
 from main import main
+from generator import ExerciseChecker
 import sys
 import os
 
@@ -74,6 +77,115 @@ def profile_checking():
     generate_stats_report(profile_path, '题目批改性能分析')
 
 
+def legacy_parse_exercise(exercise):
+    """原递归求值器（按括号和运算符切片递归），仅作为性能对照"""
+    try:
+        valid_ops = {'+', '-', '×', '÷', '(', ')'}
+        tokens = ExerciseChecker.tokenize(exercise)
+
+        # 检查非法符号
+        for token in tokens:
+            if token in valid_ops:
+                continue
+            if not re.fullmatch(r'^\d+$|^\d+\'\d+/\d+$|^\d+/\d+$', token):
+                return None
+
+        # 查找匹配的括号
+        def find_matching_parenthesis(tokens, start):
+            count = 1
+            for i in range(start + 1, len(tokens)):
+                if tokens[i] == '(':
+                    count += 1
+                elif tokens[i] == ')':
+                    count -= 1
+                    if count == 0:
+                        return i
+            return -1  # 缺少右括号
+
+        # 递归计算表达式
+        def evaluate(tokens):
+            if not tokens:
+                return None
+
+            # 处理括号
+            i = 0
+            while i < len(tokens):
+                if tokens[i] == '(':
+                    j = find_matching_parenthesis(tokens, i)
+                    if j == -1:
+                        return None
+                    inner_result = evaluate(tokens[i + 1:j])
+                    if inner_result is None:
+                        return None
+                    tokens = tokens[:i] + [str(inner_result)] + tokens[j + 1:]
+                else:
+                    i += 1
+
+            # 单数字直接返回
+            if len(tokens) == 1:
+                return ExerciseChecker.parse_fraction(tokens[0])
+
+            # 先处理乘除
+            for i in range(len(tokens) - 1, -1, -1):
+                if tokens[i] in ['×', '÷']:
+                    left = evaluate(tokens[:i])
+                    right = evaluate(tokens[i + 1:])
+                    if left is None or right is None:
+                        return None
+                    if tokens[i] == '×':
+                        return left * right
+                    elif tokens[i] == '÷':
+                        if right.is_zero():
+                            return None
+                        return left / right
+
+            # 再处理加减
+            for i in range(len(tokens) - 1, -1, -1):
+                if tokens[i] in ['+', '-']:
+                    left = evaluate(tokens[:i])
+                    right = evaluate(tokens[i + 1:])
+                    if left is None or right is None:
+                        return None
+                    if tokens[i] == '+':
+                        return left + right
+                    elif tokens[i] == '-':
+                        result = left - right
+                        if result is None or result.numerator < 0:
+                            return None
+                        return result
+
+            return None
+
+        return evaluate(tokens)
+    except:
+        return None
+
+
+def long_expression(op_count):
+    """构造含 op_count 个运算符的长表达式，括号嵌套与生成的题目相同"""
+    expression = "1/2"
+    operators = ['+', '×', '+', '÷']
+    for i in range(op_count):
+        expression = f"({expression} {operators[i % 4]} {i % 7 + 1}'1/3)"
+    return expression[1:-1]
+
+
+def benchmark_evaluator(op_counts=(3, 30, 100, 300), repeat=20):
+    """对比原递归求值器与单遍栈式求值器在长表达式上的耗时"""
+    print("=== 性能对比：表达式求值 ===")
+    for op_count in op_counts:
+        expression = long_expression(op_count)
+        assert legacy_parse_exercise(expression) == ExerciseChecker.parse_exercise(expression)
+        timings = []
+        for evaluate in (legacy_parse_exercise, ExerciseChecker.parse_exercise):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                evaluate(expression)
+            timings.append((time.perf_counter() - start) / repeat)
+        print(f"运算符 {op_count:4d} 个：原求值器 {timings[0] * 1000:.3f} ms，"
+              f"栈式求值器 {timings[1] * 1000:.3f} ms，加速 {timings[0] / timings[1]:.1f} 倍")
+
+
 def generate_stats_report(profile_path, title):
     """生成文本格式的性能统计报告"""
     stats = pstats.Stats(profile_path)
@@ -118,5 +230,8 @@ if __name__ == "__main__":
     # 运行批改的性能分析
     profile_checking()
 
+    # 对比表达式求值器
+    benchmark_evaluator()
+
     # 显示查看报告的指令
     generate_snakeviz_command()
\ No newline at end of file
@@ -0,0 +1,115 @@
+import hashlib
+import os
+import struct
+from array import array
+from binfmt import is_binary, BinaryExerciseFile
+from fileio import open_text
+from generator import CHECKER_CACHE_SIZE, EVALUATOR_VERSION, ExerciseChecker, GradeResult, iter_items
+from keycache import file_digest, iter_cached_key, open_cache
+
+# 状态文件头：魔数、格式版本、求值器版本、题目文件的 SHA-256、题目数量
+# 之后依次是每行答案的 64 位哈希、每题一个字节的结果
+MAGIC = b'ARRG'
+VERSION = 1
+HEADER = struct.Struct('<4sHH32sQ')
+# 状态文件名后缀（与答案文件放在一起）
+SUFFIX = '.state'
+
+
+def line_hash(text):
+    """答案文本的 64 位哈希（跨进程稳定）"""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def load_state(state_file, digest):
+    """读取状态文件，返回 (各行哈希, 结果)；不存在、已损坏或题目已变化时返回 None"""
+    try:
+        with open(state_file, 'rb') as f:
+            data = f.read()
+        magic, version, evaluator_version, stored_digest, count = HEADER.unpack_from(data)
+    except (OSError, struct.error):
+        return None
+    if (magic != MAGIC or version != VERSION or evaluator_version != EVALUATOR_VERSION
+            or stored_digest != digest or len(data) != HEADER.size + count * 9):
+        return None
+    hashes = array('Q')
+    hashes.frombytes(data[HEADER.size:HEADER.size + count * 8])
+    return hashes, bytearray(data[HEADER.size + count * 8:])
+
+
+def save_state(state_file, digest, hashes, verdicts):
+    """先写临时文件再替换，避免留下写了一半的状态"""
+    temp_path = f"{state_file}.{os.getpid()}.tmp"
+    with open(temp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, EVALUATOR_VERSION, digest, len(hashes)))
+        f.write(hashes.tobytes())
+        f.write(verdicts)
+    os.replace(temp_path, state_file)
+
+
+def _keys_at(exercise_file, indices, cache_size, digest=None, key_cache=False):
+    """只取出指定题号（从 0 开始）的正确结果，返回 ({题号: 结果}, 题目数量)；digest 为题目文件的摘要
+
+    key_cache 为 True 且没有有效的答案缓存时，计算全部结果并写出缓存，之后的批改直接读取。
+    """
+    if is_binary(exercise_file):
+        with BinaryExerciseFile(exercise_file) as key_file:
+            return {i: key_file.answer(i) for i in indices if i < len(key_file)}, len(key_file)
+    key_array = open_cache(exercise_file, digest)
+    if key_array is not None:
+        with key_array:
+            return {i: key_array[i] for i in indices if i < len(key_array)}, len(key_array)
+    checker = ExerciseChecker(cache_size)
+    keys = {}
+    count = 0
+    if key_cache:
+        for count, value in enumerate(iter_cached_key(exercise_file, checker, digest), 1):
+            if count - 1 in indices:
+                keys[count - 1] = value
+        return keys, count
+    with open_text(exercise_file) as f:
+        for count, expr in enumerate(iter_items(f), 1):
+            if count - 1 in indices:
+                keys[count - 1] = checker.evaluate(expr.replace(' =', ''))
+    return keys, count
+
+
+def regrade(exercise_file, answer_file, grade_file='Grade.txt', state_file=None, cache_size=CHECKER_CACHE_SIZE,
+            grade_format='list', key_cache=False):
+    """增量批改：与上次的状态比较各行答案的哈希，只重新批改变化的行
+
+    题目文件或求值器版本变化时全部重新批改。key_cache 为 True 时使用（必要时建立）题目文件旁的答案缓存。
+    返回 (批改结果, 重新批改的行数)。
+    """
+    state_file = answer_file + SUFFIX if state_file is None else state_file
+    digest = file_digest(exercise_file)
+    state = load_state(state_file, digest)
+    old_hashes, verdicts = state if state is not None else (array('Q'), bytearray())
+
+    # 计算每行答案的哈希，只保留变化行的文本
+    hashes = array('Q')
+    changed = {}
+    with open_text(answer_file) as f:
+        for i, answer in enumerate(iter_items(f)):
+            value = line_hash(answer)
+            hashes.append(value)
+            if i >= len(old_hashes) or old_hashes[i] != value:
+                changed[i] = answer
+
+    if changed or state is None:
+        keys, count = _keys_at(exercise_file, changed, cache_size, digest, key_cache)
+    else:
+        keys, count = {}, len(old_hashes)
+    if count != len(hashes):
+        raise Exception("错误：题目与答案数量不匹配。")
+
+    del verdicts[count:]
+    verdicts.extend(bytes(count - len(verdicts)))
+    for i, answer in changed.items():
+        verdicts[i] = ExerciseChecker.grade_pairs([keys[i]], [answer])[0]
+
+    save_state(state_file, digest, hashes, verdicts)
+    result = GradeResult(verdicts)
+    if grade_file is not None:
+        result.write(grade_file, grade_format)
+    return result, len(changed)
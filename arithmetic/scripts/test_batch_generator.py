@@ -0,0 +1,53 @@
+import pytest
+from fraction import Fraction
+from generator import ExerciseGenerator, ExerciseChecker
+
+np = pytest.importorskip("numpy")
+from batch_generator import BatchGenerator, shape_distribution
+
+
+class TestBatchGenerator:
+    """测试向量化批量生成（树形分布、掩码过滤、去重、答案正确性）"""
+
+    def test_shape_distribution(self):
+        """测试树形分布：概率之和为 1，一个运算符的树形占三分之一"""
+        distribution = shape_distribution(3)
+        assert sum(distribution.values()) == pytest.approx(1.0)
+        assert len(distribution) == 8
+        assert distribution[(None, None)] == pytest.approx(1 / 3)
+
+    def test_answers_match_exercises(self):
+        """测试生成的答案与重新计算题目的结果一致，且不含负数"""
+        generator = BatchGenerator(10, seed=1, batch_size=512)
+        exercises, answers = generator.generate_exercise(1000)
+        assert len(exercises) == len(answers) == 1000
+        for i, (exercise, answer) in enumerate(zip(exercises, answers), 1):
+            assert exercise.startswith(f"{i}. ") and exercise.endswith(" = ")
+            value = ExerciseChecker.parse_exercise(exercise.split('. ', 1)[1][:-3])
+            assert value == Fraction.from_string(answer.split('. ', 1)[1])
+            assert value >= 0
+            assert len(ExerciseChecker.tokenize(exercise)) > 0
+
+    def test_unique_and_reproducible(self):
+        """测试规范形式去重，以及相同种子结果相同"""
+        first = BatchGenerator(10, seed=7, batch_size=256)
+        exercises, _ = first.generate_exercise(500)
+        assert len(set(exercises)) == len(exercises)
+        assert first.stats['accepted'] == len(first.store) >= 500
+        assert BatchGenerator(10, seed=7, batch_size=256).generate_exercise(500)[0] == exercises
+
+    def test_small_range(self):
+        """测试 r=2 时只生成自然数，r=1 时没有可用的数字"""
+        exercises, _ = BatchGenerator(2, seed=3).generate_exercise(5)
+        assert exercises and all('/' not in e.split('. ', 1)[1].replace('÷', '') for e in exercises)
+        assert BatchGenerator(1, seed=3).generate_exercise(5) == ([], [])
+
+    def test_fingerprint_matches_canonical_form(self):
+        """测试整列计算的指纹与规范形式等价：r=2 时恰好生成全部不重复的题目"""
+        size, exact = ExerciseGenerator(2).space_size()
+        generator = BatchGenerator(2, seed=1)
+        exercises, _ = generator.generate_exercise(size * 10)
+        assert exact and len(exercises) == size
+        # 只有被接受的行才渲染，重复行在渲染之前被去掉
+        assert generator.stats['duplicate'] + generator.stats['accepted'] + generator.stats['invalid'] \
+            == generator.stats['attempts']
@@ -0,0 +1,89 @@
+import csv
+import gzip
+import os
+import pytest
+from generator import ExerciseGenerator, ExerciseChecker
+from batch_grade import find_submissions, grade_against_key, grade_students, SUMMARY_FILE
+
+
+class TestBatchGrade:
+    """测试多名学生的批量批改"""
+
+    def setup_method(self):
+        self.exercises, self.answers = ExerciseGenerator(10, seed=9).generate_exercise(40)
+
+    def write_submissions(self, tmp_path):
+        exercise_file = tmp_path / "Exercises.txt"
+        exercise_file.write_text("\n".join(self.exercises) + "\n", encoding="utf-8")
+        submissions = tmp_path / "submissions"
+        submissions.mkdir()
+        (submissions / "alice.txt").write_text("\n".join(self.answers) + "\n", encoding="utf-8")
+        wrong = [f"{i}. 999999" if i % 4 == 0 else line for i, line in enumerate(self.answers, 1)]
+        (submissions / "bob.txt").write_text("\n".join(wrong) + "\n", encoding="utf-8")
+        (submissions / "carol.txt").write_text("\n".join(self.answers[:5]) + "\n", encoding="utf-8")
+        (submissions / "notes.md").write_text("ignored", encoding="utf-8")
+        return str(exercise_file), str(submissions)
+
+    def test_grade_against_key(self):
+        """测试文本相同的快速判定与解析后比较"""
+        key = ["3", "1/2", None, "1'1/2"]
+        assert grade_against_key(key, ["3", "2/4", "1", "3/2"]) == bytearray([1, 1, 0, 1])
+        assert grade_against_key(key, ["4", "abc", "0", "1'1/3"]) == bytearray([0, 0, 0, 0])
+        with pytest.raises(Exception, match="数量不匹配"):
+            grade_against_key(key, ["3", "1/2"])
+
+        # 逐行读取：答案多于题目时在读到多出的那一行时就报错，不再继续读取
+        def answers():
+            yield from ["3", "1/2", "0", "3/2", "1"]
+            raise AssertionError("不应继续读取")
+        with pytest.raises(Exception, match="数量不匹配"):
+            grade_against_key(key, answers())
+
+    def test_grade_students(self, tmp_path):
+        """测试每名学生的评分文件、汇总 CSV 与单进程批改结果一致"""
+        exercise_file, submissions = self.write_submissions(tmp_path)
+        out_dir = str(tmp_path / "grades")
+        assert [os.path.basename(p) for p in find_submissions(submissions)] == ["alice.txt", "bob.txt", "carol.txt"]
+
+        for workers in (1, 2):
+            rows = grade_students(exercise_file, submissions, out_dir, workers=workers)
+            assert [row['student'] for row in rows] == ["alice", "bob", "carol"]
+            assert rows[0]['correct'] == 40 and rows[1]['wrong'] == 10
+            assert "数量不匹配" in rows[2]['error']
+
+        expected = ExerciseChecker.grade(exercise_file, os.path.join(submissions, "bob.txt"), grade_file=None)
+        with open(os.path.join(out_dir, "bob.grade.txt"), encoding="utf-8") as f:
+            assert f.read() == "\n".join(expected.lines()) + "\n"
+        assert not os.path.exists(os.path.join(out_dir, "carol.grade.txt"))
+        with open(os.path.join(out_dir, SUMMARY_FILE), encoding="utf-8", newline='') as f:
+            summary = list(csv.DictReader(f))
+        assert [(row['student'], row['correct'], row['total']) for row in summary[:2]] == \
+               [("alice", "40", "40"), ("bob", "30", "40")]
+
+    def test_compressed_submissions(self, tmp_path):
+        """测试目录中压缩的答案文件也被批改，学生名去掉压缩扩展名"""
+        exercise_file, submissions = self.write_submissions(tmp_path)
+        with gzip.open(os.path.join(submissions, "dave.txt.gz"), "wt", encoding="utf-8") as f:
+            f.write("\n".join(self.answers) + "\n")
+        rows = grade_students(exercise_file, submissions, str(tmp_path / "grades"))
+        assert [row['student'] for row in rows] == ["alice", "bob", "carol", "dave"]
+        assert rows[3]['correct'] == 40 and os.path.exists(tmp_path / "grades" / "dave.grade.txt")
+
+    def test_exercise_file_and_outputs_excluded(self, tmp_path):
+        """测试题目文件与输出目录都在答案目录中时不被当作学生答案，重复运行结果不变"""
+        _, submissions = self.write_submissions(tmp_path)
+        exercise_file = os.path.join(submissions, "Exercises.txt")
+        with open(exercise_file, "w", encoding="utf-8") as f:
+            f.write("\n".join(self.exercises) + "\n")
+        for _ in range(2):
+            rows = grade_students(exercise_file, submissions, submissions)
+            assert [row['student'] for row in rows] == ["alice", "bob", "carol"]
+        assert os.path.exists(os.path.join(submissions, "alice.grade.txt"))
+
+    def test_duplicate_student_names(self, tmp_path):
+        """测试两个答案文件对应同一名学生时报错，而不是互相覆盖评分文件"""
+        exercise_file, submissions = self.write_submissions(tmp_path)
+        with gzip.open(os.path.join(submissions, "alice.txt.gz"), "wt", encoding="utf-8") as f:
+            f.write("\n".join(self.answers) + "\n")
+        with pytest.raises(Exception, match="同一名学生 alice"):
+            grade_students(exercise_file, submissions, str(tmp_path / "grades"))
@@ -0,0 +1,89 @@
+import os
+import tempfile
+import pytest
+from fraction import Fraction
+from generator import ExerciseGenerator, ExerciseChecker
+from binfmt import (BinaryExerciseWriter, BinaryExerciseFile, is_binary, to_postfix, evaluate_postfix,
+                    render_postfix)
+
+
+class TestBinaryFormat:
+    """测试二进制题目文件（后缀式转换、写入、mmap 读取、批改）"""
+
+    def setup_method(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'Exercises.bin')
+
+    def teardown_method(self):
+        self.dir.cleanup()
+
+    def test_postfix(self):
+        """测试后缀式转换、计算与还原"""
+        tokens = to_postfix("(1/2 + 3) × 2'1/3")
+        assert tokens == [(0, 1, 2), (0, 3, 1), (1, 0, 0), (0, 7, 3), (3, 0, 0)]
+        assert evaluate_postfix(tokens) == Fraction(49, 6)
+        assert render_postfix(tokens) == "(1/2 + 3) × 2'1/3"
+        assert to_postfix("1 + 2 × 3")[-1] == (1, 0, 0)  # 乘法优先
+        assert evaluate_postfix(to_postfix("1 - 2")) is None
+        assert evaluate_postfix(to_postfix("1 ÷ (2 - 2)")) is None
+        with pytest.raises(ValueError):
+            to_postfix("(1 + 2")
+        # 与批改共用同一个记号扫描，非法符号直接报错
+        with pytest.raises(ValueError, match="非法符号"):
+            to_postfix("1 + a")
+
+    def test_write_and_read(self):
+        """测试写入后随机读取题目与答案"""
+        exercises, answers = ExerciseGenerator(10, seed=3).generate_exercise(200)
+        with BinaryExerciseWriter(self.path) as writer:
+            assert list(writer.tee(zip(exercises, answers))) == list(zip(exercises, answers))
+        assert is_binary(self.path)
+        with BinaryExerciseFile(self.path) as key_file:
+            assert len(key_file) == 200
+            for index in (0, 57, 199):
+                expected = exercises[index].split('. ', 1)[1][:-3]
+                assert key_file.exercise(index) == expected
+                assert str(key_file.answer(index)) == answers[index].split('. ', 1)[1]
+                assert key_file.answer(index) == evaluate_postfix(key_file.tokens(index))
+            assert [str(v) for v in key_file.answers(10, 12)] == [a.split('. ', 1)[1] for a in answers[10:12]]
+
+    def test_empty_and_invalid_file(self):
+        """测试空文件与非二进制文件"""
+        with BinaryExerciseWriter(self.path):
+            pass
+        with BinaryExerciseFile(self.path) as key_file:
+            assert len(key_file) == 0
+        text_path = os.path.join(self.dir.name, 'Exercises.txt')
+        with open(text_path, 'w', encoding='utf-8') as f:
+            f.write("1. 1 + 2 = \n")
+        assert not is_binary(text_path)
+        with pytest.raises(ValueError):
+            BinaryExerciseFile(text_path)
+
+    def test_aborted_write_removes_file(self):
+        """测试写入中途出错时删除文件，不留下文件头有效的半个文件"""
+        def items():
+            yield "1. 1 + 2 = ", "1. 3"
+            raise RuntimeError("生成中断")
+
+        with pytest.raises(RuntimeError, match="生成中断"):
+            with BinaryExerciseWriter(self.path) as writer:
+                for _ in writer.tee(items()):
+                    pass
+        assert not os.path.exists(self.path) and not is_binary(self.path)
+
+    def test_check_answers_with_binary(self):
+        """测试用二进制题目文件批改文本答案"""
+        with BinaryExerciseWriter(self.path) as writer:
+            writer.add("1 + 2", "3")
+            writer.add("1/2 × 4", "2")
+        answer_path = os.path.join(self.dir.name, 'Answers.txt')
+        with open(answer_path, 'w', encoding='utf-8') as f:
+            f.write("1. 3\n2. 3\n")
+        cwd = os.getcwd()
+        os.chdir(self.dir.name)
+        try:
+            correct, wrong = ExerciseChecker.check_answers(self.path, answer_path)
+        finally:
+            os.chdir(cwd)
+        assert correct == ['1'] and wrong == ['2']
@@ -0,0 +1,56 @@
+from counter_random import CounterRandom
+from generator import ExerciseGenerator
+
+
+class TestCounterRandom:
+    """测试基于计数器的随机数生成器"""
+
+    def test_reproducible_streams(self):
+        """测试相同 (种子, 流编号) 得到相同序列，与访问顺序无关"""
+        a = CounterRandom(42)
+        b = CounterRandom(42)
+        a.seek(7)
+        first = [a.randint(1, 100) for _ in range(20)]
+        # 先访问其他流再跳回，结果不变
+        b.seek(3)
+        [b.random() for _ in range(50)]
+        b.seek(7)
+        assert [b.randint(1, 100) for _ in range(20)] == first
+        # 不同种子、不同流的序列不同
+        c = CounterRandom(43)
+        c.seek(7)
+        assert [c.randint(1, 100) for _ in range(20)] != first
+        a.seek(8)
+        assert [a.randint(1, 100) for _ in range(20)] != first
+
+    def test_distribution(self):
+        """测试输出范围与大致均匀性"""
+        rng = CounterRandom(2024)
+        counts = [0] * 10
+        for _ in range(10000):
+            value = rng.randint(0, 9)
+            counts[value] += 1
+            assert 0 <= rng.random() < 1
+        assert min(counts) > 800 and max(counts) < 1200
+        assert rng.getrandbits(0) == 0
+        assert rng.getrandbits(130) < 1 << 130
+        assert rng.choice("abc") in "abc"
+
+    def test_state(self):
+        """测试状态保存与恢复，以及大整数种子"""
+        rng = CounterRandom(1 << 100)
+        state = rng.getstate()
+        values = [rng.random() for _ in range(5)]
+        rng.setstate(state)
+        assert [rng.random() for _ in range(5)] == values
+        assert CounterRandom(1 << 100).random() != CounterRandom(1).random()
+
+    def test_negative_seed(self):
+        """测试负数种子：可以正常折叠（不会死循环），且与对应的正数种子不同"""
+        for seed in (-1, -3, -(1 << 100)):
+            rng = CounterRandom(seed)
+            values = [rng.random() for _ in range(5)]
+            assert [CounterRandom(seed).random() for _ in range(1)] == values[:1]
+            assert CounterRandom(-seed).random() != values[0]
+        generator = ExerciseGenerator(10, seed=-3)
+        assert list(generator.iter_range(1, 3)) == list(ExerciseGenerator(10, seed=-3).iter_range(1, 3))
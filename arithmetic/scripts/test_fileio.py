@@ -0,0 +1,112 @@
+import os
+import tempfile
+import pytest
+import gzip
+from fileio import BackgroundWriter, compression_of, open_text, write_lines
+from generator import ExerciseGenerator, ExerciseChecker
+
+
+class TestFileIO:
+    """测试后台写盘与流式写入"""
+
+    def test_write_lines_chunks(self):
+        """测试按块写入多个文件，顺序与内容保持不变"""
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [os.path.join(directory, name) for name in ('a.txt', 'b.txt')]
+            items = ((f"a{i}", f"b{i}") for i in range(25))
+            write_lines(items, paths, chunk_lines=10)
+            for prefix, path in zip('ab', paths):
+                with open(path, encoding='utf-8') as f:
+                    assert f.read() == ''.join(f"{prefix}{i}\n" for i in range(25))
+
+    def test_empty_items(self):
+        """测试没有任何内容时生成空文件"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'empty.txt')
+            write_lines(iter([]), [path])
+            assert os.path.getsize(path) == 0
+
+    def test_generation_error_propagates(self):
+        """测试生成过程中的异常原样抛出，且已写入的块落盘"""
+        def items():
+            yield ("1",)
+            raise RuntimeError("生成失败")
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'partial.txt')
+            with pytest.raises(RuntimeError, match="生成失败"):
+                write_lines(items(), [path], chunk_lines=1)
+            with open(path, encoding='utf-8') as f:
+                assert f.read() == "1\n"
+
+    def test_writer_error(self):
+        """测试后台线程写盘出错时在主线程抛出"""
+        class FullDisk:
+            def write(self, chunk):
+                raise OSError("磁盘已满")
+
+            def close(self):
+                pass
+
+        with tempfile.TemporaryDirectory() as directory:
+            writer = BackgroundWriter([os.path.join(directory, 'x.txt')])
+            writer.files[0].close()
+            writer.files[0] = FullDisk()
+            writer.write("data\n")
+            with pytest.raises(OSError, match="磁盘已满"):
+                writer.close()
+            with pytest.raises(OSError):
+                BackgroundWriter([os.path.join(directory, 'missing', 'y.txt')])
+
+    def test_writer_non_os_error(self):
+        """测试写盘抛出非 OSError 异常时线程不退出，后续提交与关闭都抛出该异常而不会阻塞"""
+        class BadFile:
+            def write(self, chunk):
+                raise ValueError("无法编码")
+
+            def close(self):
+                pass
+
+        with tempfile.TemporaryDirectory() as directory:
+            writer = BackgroundWriter([os.path.join(directory, 'x.txt')], queue_size=2)
+            writer.files[0].close()
+            writer.files[0] = BadFile()
+            writer.write("data\n")
+            writer.thread.join(0.1)
+            with pytest.raises(ValueError, match="无法编码"):
+                for _ in range(10):
+                    writer.write("more\n")
+            with pytest.raises(ValueError, match="无法编码"):
+                writer.close()
+            assert not writer.thread.is_alive()
+
+
+class TestCompressedFiles:
+    """测试按扩展名透明读写 gzip、bz2、xz 压缩文件"""
+
+    def test_round_trip(self, tmp_path):
+        """测试各压缩格式写入后读回内容不变，未压缩文件保持原样"""
+        lines = [f"{i}. {i} + 1 = " for i in range(1, 10001)]
+        for name in ('x.txt.gz', 'x.txt.bz2', 'x.txt.xz', 'x.txt.lzma', 'x.txt'):
+            path = str(tmp_path / name)
+            write_lines(((line,) for line in lines), [path], chunk_lines=1000)
+            with open_text(path) as f:
+                assert f.read().splitlines() == lines
+        assert compression_of('a/Exercises.TXT.GZ') == 'gzip' and compression_of('Exercises.txt') is None
+        with gzip.open(tmp_path / 'x.txt.gz', 'rt', encoding='utf-8') as f:
+            assert f.readline() == "1. 1 + 1 = \n"
+        assert os.path.getsize(tmp_path / 'x.txt.gz') < os.path.getsize(tmp_path / 'x.txt')
+
+    def test_grade_compressed(self, tmp_path):
+        """测试批改直接读取压缩的题目与答案文件，并可写出压缩的评分文件"""
+        exercises, answers = ExerciseGenerator(10, seed=3).generate_exercise(200)
+        answers[5] = "6. 999999"
+        exercise_file, answer_file = str(tmp_path / 'Exercises.txt.xz'), str(tmp_path / 'Answers.txt.gz')
+        write_lines(zip(exercises, answers), (exercise_file, answer_file))
+        grade_file = str(tmp_path / 'Grade.txt.bz2')
+        result = ExerciseChecker.grade(exercise_file, answer_file, grade_file, key_cache=True)
+        assert list(result.iter_numbers(0)) == [6] and result.correct_count == 199
+        # 第二次使用答案缓存
+        assert ExerciseChecker.grade(exercise_file, answer_file, None, key_cache=True).verdicts == result.verdicts
+        with open_text(grade_file) as f:
+            assert f.read().splitlines()[1] == "Wrong: 1 (6)"
@@ -0,0 +1,77 @@
+import random
+import pytest
+from fingerprint_store import ExactStore, BloomStore, SetStore, create_store
+
+
+class TestFingerprintStore:
+    """测试指纹存储后端（精确表、布隆过滤器、集合）"""
+
+    def setup_class(self):
+        rng = random.Random(2024)
+        self.fingerprints = [rng.getrandbits(64) for _ in range(5000)]
+
+    def test_exact_store(self):
+        """测试开放寻址表的去重、扩容与内存统计"""
+        store = ExactStore(capacity=16)
+        initial_memory = store.memory_usage()
+        for fp in self.fingerprints:
+            assert store.add(fp) is True
+        for fp in self.fingerprints:
+            assert store.add(fp) is False
+            assert fp in store
+        assert len(store) == len(self.fingerprints)
+        assert 12345 not in store
+        # 扩容后每个槽位仍只占 8 字节
+        assert store.memory_usage() > initial_memory
+        assert store.memory_usage() == 8 * len(store.table)
+        assert store.memory_usage() < SetStore().memory_usage() + 40 * len(self.fingerprints)
+
+    def test_exact_store_zero_fingerprint(self):
+        """测试指纹 0（空槽标记）也能正常存取"""
+        store = ExactStore()
+        assert store.add(0) is True
+        assert 0 in store
+        assert store.add(0) is False
+
+    def test_bloom_store(self):
+        """测试布隆过滤器不漏判重复，且误判率接近配置值"""
+        store = BloomStore(capacity=len(self.fingerprints), error_rate=0.01)
+        for fp in self.fingerprints:
+            store.add(fp)
+        assert all(fp in store for fp in self.fingerprints)
+        assert all(store.add(fp) is False for fp in self.fingerprints)
+        rng = random.Random(7)
+        probes = [rng.getrandbits(64) for _ in range(5000)]
+        false_positives = sum(fp in store for fp in probes)
+        assert false_positives < 5000 * 0.03
+        assert store.memory_usage() == len(store.bits)
+        with pytest.raises(ValueError):
+            BloomStore(error_rate=1.5)
+
+    def test_set_store_and_factory(self):
+        """测试兼容集合后端与工厂函数"""
+        store = create_store('set')
+        assert isinstance(store, SetStore)
+        assert store.add(1) is True and store.add(1) is False
+        assert len(store) == 1 and store.memory_usage() > 0
+        assert isinstance(create_store('bloom', capacity=10, error_rate=0.1), BloomStore)
+        assert isinstance(create_store(), ExactStore)
+        with pytest.raises(ValueError, match="不支持的指纹存储类型"):
+            create_store('md5')
+
+    def test_add_many(self):
+        """测试批量加入：与逐个加入结果相同，批内重复只有第一次算新加入"""
+        for kind in ('exact', 'bloom', 'set'):
+            store = create_store(kind)
+            assert store.add_many([1, 2, 3]) == [True, True, True]
+            assert store.add_many([4, 5]) == [True, True]
+            assert store.add_many([3, 6, 7]) == [False, True, True]
+            assert store.add_many([8, 8, 2, 9]) == [True, False, False, True]
+            assert store.add_many([]) == []
+            assert len(store) == 9
+
+        # 精确模式整批扩容后结果仍与逐个加入相同（0 与 1 视为同一个值）
+        store, expected = ExactStore(capacity=4), ExactStore(capacity=4)
+        fps = [i * 0x9E3779B97F4A7C15 for i in range(3000)] + [0, 1, 5 * 0x9E3779B97F4A7C15]
+        assert store.add_many(fps) == [expected.add(fp) for fp in fps]
+        assert len(store) == len(expected) == 3000 and all(fp in store for fp in fps)
@@ -144,8 +144,11 @@ class TestFraction:
         class InvalidType:
             pass
 
-        with pytest.raises(TypeError):
-            Fraction(1, 2) == InvalidType()
+        # 相等比较不抛出异常，交给对方类型处理后得到 False
+        assert not Fraction(1, 2) == InvalidType()
+        assert Fraction(1, 2) != InvalidType()
+        assert Fraction(1, 2) != None and not Fraction(1, 2) == None
+        assert Fraction(1, 2) != "1/2"
 
     def test_string_representation(self):
         """测试字符串格式化（纯分数、带分数、整数、负数）"""
@@ -167,4 +170,96 @@ class TestFraction:
         assert not Fraction(-1, 2).is_zero()
         # 补充：其他零的形式
         assert Fraction(0, 5).is_zero()  # 0/5
-        assert Fraction(0, 3, 0).is_zero()  # 0'0/3
\ No newline at end of file
+        assert Fraction(0, 3, 0).is_zero()  # 0'0/3
+
+    def test_compact_storage(self):
+        """测试紧凑存储（__slots__、约分、分母恒为正）"""
+        f = Fraction(6, -8)
+        assert not hasattr(f, '__dict__')
+        assert (f.numerator, f.denominator) == (-3, 4)
+        # 运算结果直接为最简分数，且与标准库结果一致
+        from fractions import Fraction as PyFraction
+        values = [Fraction(n, d) for n in range(0, 7) for d in range(1, 7)]
+        for a in values:
+            for b in values:
+                expected = PyFraction(a.numerator, a.denominator) + PyFraction(b.numerator, b.denominator)
+                result = a + b
+                assert (result.numerator, result.denominator) == (expected.numerator, expected.denominator)
+                expected = PyFraction(a.numerator, a.denominator) * PyFraction(b.numerator, b.denominator)
+                result = a * b
+                assert (result.numerator, result.denominator) == (expected.numerator, expected.denominator)
+                if not b.is_zero():
+                    expected = PyFraction(a.numerator, a.denominator) / PyFraction(b.numerator, b.denominator)
+                    result = a / b
+                    assert (result.numerator, result.denominator) == (expected.numerator, expected.denominator)
+                if a >= b:
+                    expected = PyFraction(a.numerator, a.denominator) - PyFraction(b.numerator, b.denominator)
+                    result = a - b
+                    assert (result.numerator, result.denominator) == (expected.numerator, expected.denominator)
+
+    def test_intern_cache(self):
+        """测试享元缓存（规范实例复用、字符串缓存、表满后不再新增）"""
+        import fraction
+        fraction.clear_intern_cache()
+        a = Fraction.intern(2, 4)
+        b = Fraction.intern(1, 2)
+        assert a is b and (a.numerator, a.denominator) == (1, 2)
+        assert Fraction.intern(2, 4) is a and Fraction.intern(-3, -6) is a
+        assert set(fraction._internTable) == {(1, 2)}
+        # 解析结果复用规范实例，渲染结果缓存在实例上
+        assert Fraction.from_string("1/2") is b
+        assert Fraction.from_string("1/2") is Fraction.from_string("1/2")
+        assert str(b) is str(b)
+
+        original_limit = fraction.INTERN_LIMIT
+        try:
+            fraction.INTERN_LIMIT = 0
+            fraction.clear_intern_cache()
+            assert Fraction.intern(3, 4) is not Fraction.intern(3, 4)
+            assert Fraction.from_string("3/4") == Fraction(3, 4)
+            assert not fraction._internTable and not fraction._parseTable
+        finally:
+            fraction.INTERN_LIMIT = original_limit
+            fraction.clear_intern_cache()
+
+    def test_hash_and_canonical_key(self):
+        """测试哈希与规范键（与 int、标准库分数一致，可作字典键）"""
+        from fractions import Fraction as PyFraction
+        for n in range(-12, 13):
+            for d in range(1, 13):
+                f = Fraction(n, d)
+                assert hash(f) == hash(PyFraction(n, d))
+                assert f.canonical_key() == (PyFraction(n, d).numerator, PyFraction(n, d).denominator)
+        assert hash(Fraction(0, 1, 5)) == hash(5)
+        assert hash(Fraction(-1, 1)) == hash(-1) == -2
+        # 数值相等的不同写法落在同一个键上
+        table = {Fraction(1, 2): "half", 3: "three"}
+        assert table[Fraction(2, 4)] == "half"
+        assert table[Fraction(6, 2)] == "three"
+        assert len({Fraction(1, 2), Fraction(2, 4), Fraction.from_string("1/2")}) == 1
+        assert Fraction(1, 3, 2).canonical_key() == (7, 3)
+
+    def test_mixed_container_keys(self):
+        """测试与 int、标准库分数、浮点数混用作字典和集合的键"""
+        from fractions import Fraction as PyFraction
+        assert {Fraction(1, 2): 1}.get(PyFraction(1, 2)) == 1
+        assert {PyFraction(3, 1): "x"}[Fraction(6, 2)] == "x"
+        assert {Fraction(1, 2)} == {0.5} and Fraction(3) == 3.0
+        assert Fraction(1, 3) != 1 / 3 and Fraction(1, 2) != float('nan')
+        assert {Fraction(1, 2): 1}.get(None) is None and {Fraction(1, 2): 1}.get("1/2") is None
+        assert Fraction(1, 2) == PyFraction(2, 4) and PyFraction(2, 4) == Fraction(1, 2)
+
+    def test_standard_library_rationals(self):
+        """测试与标准库分数混用：构造、四则运算与大小比较"""
+        from fractions import Fraction as PyFraction
+        assert Fraction(PyFraction(1, 2)) == Fraction(1, 2)
+        assert Fraction(PyFraction(1, 2), PyFraction(3, 4)) == Fraction(2, 3)
+        assert Fraction(1, PyFraction(-1, 2)).canonical_key() == (-2, 1)
+        assert Fraction(1, 2) + PyFraction(1, 3) == Fraction(5, 6)
+        assert Fraction(1, 2) - PyFraction(1, 3) == Fraction(1, 6)
+        assert Fraction(1, 2) * PyFraction(2, 3) == Fraction(1, 3)
+        assert Fraction(1, 2) / PyFraction(1, 4) == Fraction(2)
+        assert not Fraction(1, 2) < PyFraction(1, 3) and Fraction(1, 2) > PyFraction(1, 3)
+        assert Fraction(1, 2) <= PyFraction(1, 2) <= Fraction(1, 2)
+        with pytest.raises(TypeError):
+            Fraction(0.5)
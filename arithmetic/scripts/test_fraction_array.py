@@ -0,0 +1,90 @@
+import pytest
+from fraction import Fraction
+
+np = pytest.importorskip("numpy")
+from fraction_array import FractionArray
+
+
+class TestFractionArray:
+    """测试批量分数数组（向量化运算、约分、溢出回退、字符串转换）"""
+
+    def setup_class(self):
+        self.values = [Fraction(n, d) for n in range(0, 9) for d in range(1, 9)]
+        self.left = self.values * len(self.values)
+        self.right = [v for v in self.values for _ in self.values]
+
+    def test_construct_and_reduce(self):
+        """测试构造时约分、符号规范化与分母为零的校验"""
+        arr = FractionArray([2, 3, -4, 0], [4, -9, 6, 5])
+        assert arr.numerators.tolist() == [1, -1, -2, 0]
+        assert arr.denominators.tolist() == [2, 3, 3, 1]
+        assert arr.numerators.dtype == np.int64
+        with pytest.raises(ValueError):
+            FractionArray([1, 2], [1, 0])
+        with pytest.raises(ValueError):
+            FractionArray([1, 2], [1])
+
+    def test_arithmetic_matches_fraction(self):
+        """测试四则运算结果与逐个 Fraction 运算一致"""
+        a = FractionArray.from_fractions(self.left)
+        b = FractionArray.from_fractions(self.right)
+        assert (a + b).to_fractions() == [x + y for x, y in zip(self.left, self.right)]
+        assert (a * b).to_fractions() == [x * y for x, y in zip(self.left, self.right)]
+        quotients = (a / b).to_fractions()
+        for x, y, q in zip(self.left, self.right, quotients):
+            assert q == (x / y if not y.is_zero() else None)
+        # 数组减法允许负数，非负部分与 Fraction 一致
+        differences = (a - b).to_fractions()
+        for x, y, d in zip(self.left, self.right, differences):
+            if x >= y:
+                assert d == x - y
+            else:
+                assert d < 0
+
+    def test_invalid_and_scalar(self):
+        """测试除以零的无效标记及与标量运算"""
+        arr = FractionArray([1, 3], [2, 4])
+        result = arr / FractionArray([0, 1])
+        assert result.valid().tolist() == [False, True]
+        assert result[0] is None and result[1] == Fraction(3, 4)
+        assert (result + 1).valid().tolist() == [False, True]
+        assert (arr * Fraction(2, 3)).to_strings() == ["1/3", "1/2"]
+        assert (arr + 2).to_strings() == ["2'1/2", "2'3/4"]
+        assert (arr - arr).is_zero().tolist() == [True, True]
+
+    def test_overflow_fallback(self):
+        """测试可能溢出 int64 的元素回退为 Python 整数计算"""
+        big = 2 ** 40 + 1
+        arr = FractionArray([1, big], [2, big + 2])
+        result = arr * arr
+        assert result[0] == Fraction(1, 4)
+        assert result[1] == Fraction(big * big, (big + 2) * (big + 2))
+        assert result.numerators.dtype == object
+        # 回退后结果落回 int64 范围时恢复为 int64 数组
+        assert (result - result).numerators.dtype == np.int64
+        huge = FractionArray([2 ** 70], [3])
+        assert (huge + huge)[0] == Fraction(2 ** 71, 3)
+
+    def test_strings(self):
+        """测试题目格式的批量解析与渲染"""
+        strings = ["2'3/8", "3/4", "5", "0", "1'1/2"]
+        arr = FractionArray.from_strings(strings)
+        assert arr.numerators.tolist() == [19, 3, 5, 0, 3]
+        assert arr.denominators.tolist() == [8, 4, 1, 1, 2]
+        assert arr.to_strings() == strings
+        assert arr[1:3].to_strings() == ["3/4", "5"]
+        with pytest.raises(ValueError):
+            FractionArray.from_strings(["1/'2"])
+
+    def test_compare_and_where(self):
+        """测试逐元素比较（含溢出回退）与按掩码选取"""
+        a = FractionArray.from_fractions(self.left)
+        b = FractionArray.from_fractions(self.right)
+        assert (a < b).tolist() == [x < y for x, y in zip(self.left, self.right)]
+        assert (a >= b).tolist() == [x >= y for x, y in zip(self.left, self.right)]
+        assert (a > 1).tolist() == [x > 1 for x in self.left]
+        assert (a <= Fraction(1, 2)).tolist() == [x <= Fraction(1, 2) for x in self.left]
+        big = FractionArray([2 ** 62, 1], [3, 2 ** 62])
+        assert (big > FractionArray([2 ** 61, 1], [1, 2 ** 61])).tolist() == [False, False]
+        picked = FractionArray.where(a < b, a, b)
+        assert picked.to_fractions() == [min(x, y) for x, y in zip(self.left, self.right)]
@@ -3,7 +3,8 @@ import os
 import hashlib
 from tempfile import NamedTemporaryFile
 import pytest
-from generator import ExerciseGenerator, ExerciseChecker
+from generator import (ExerciseGenerator, ExerciseChecker, GradeResult, canonical_leaf, canonical_node, fingerprint,
+                       leaf_count, leaf_values, render, DENSE_RATIO)
 from fraction import Fraction
 
 
@@ -80,6 +81,186 @@ class TestExerciseGenerator:
         assert self.generator.is_Unique("1 + + 2") is True
         assert self.generator.is_Unique("1 + + 2") is False
 
+    def test_canonical_form(self):
+        """测试表达式树规范形式（交换律、结合律、不可交换运算）"""
+        one, two, three = (canonical_leaf(Fraction(v)) for v in (1, 2, 3))
+        half = canonical_leaf(Fraction(1, 2))
+
+        def plus(a, b):
+            return canonical_node('+', a, b)
+
+        # 交换律与结合律下等价的分组得到相同的规范形式和指纹
+        assert plus(plus(one, two), three) == plus(one, plus(two, three)) == plus(three, plus(two, one))
+        assert fingerprint(plus(plus(one, two), three)) == fingerprint(plus(plus(three, one), two))
+        assert canonical_node('×', half, two) == canonical_node('×', two, half)
+        # 不同运算符、不可交换的运算不视为重复
+        assert canonical_node('×', one, two) != plus(one, two)
+        assert canonical_node('-', three, two) != canonical_node('-', two, three)
+        assert canonical_node('÷', one, two) != canonical_node('÷', two, one)
+        # 混合运算只展平同一运算符
+        assert plus(canonical_node('×', one, two), three) != canonical_node('×', one, plus(two, three))
+        # 数值相同的叶子写法不同也视为同一个数
+        assert canonical_leaf(Fraction(2, 4)) == half
+
+    def test_candidate_dedup_on_tree(self):
+        """测试重复候选题在渲染前被拒绝"""
+        generator = ExerciseGenerator(3)
+        keys = set()
+        for _ in range(300):
+            candidate = generator.generate_candidate()
+            if candidate is None:
+                continue
+            exercise, answer = candidate
+            assert ExerciseChecker.parse_exercise(exercise) == Fraction.from_string(answer)
+            keys.add(exercise)
+        assert len(keys) == len(generator.store)
+
+    def test_store_backends(self):
+        """测试可插拔的指纹存储后端"""
+        for kind in ('exact', 'bloom', 'set'):
+            generator = ExerciseGenerator(self.range_val, store=kind)
+            exercises, answers = generator.generate_exercise(50)
+            assert len(exercises) == 50, f"{kind} 后端生成数量不足"
+            exprs = [ex.split('. ')[1] for ex in exercises]
+            assert len(set(exprs)) == 50, f"{kind} 后端存在重复题目"
+            assert generator.store.memory_usage() > 0
+
+    def test_seeded_index_addressable(self):
+        """测试种子模式：第 i 道题只由 (种子, i, 范围) 决定，任意一段可单独重新生成"""
+        # 范围较大时题号之间几乎不会重复，任意一段都与整份结果一致
+        full = list(ExerciseGenerator(100, seed=7).iter_exercises(200))
+        assert len(full) == 200
+        assert full == list(ExerciseGenerator(100, seed=7).iter_exercises(200))
+        assert full[0][0].startswith("1. ") and full[-1][1].startswith("200. ")
+        # 只生成第 120-150 道题，与整份生成的结果一致
+        assert list(ExerciseGenerator(100, seed=7).iter_range(120, 150)) == full[119:150]
+        single = ExerciseGenerator(100, seed=7).exercise_at(77)
+        assert f"77. {single[0]} = " == full[76][0] and f"77. {single[1]}" == full[76][1]
+        # 不同种子得到不同题目
+        assert list(ExerciseGenerator(100, seed=8).iter_exercises(200)) != full
+
+        # 范围很小时题号之间会重复：结果仍可复现且不重复
+        small = list(ExerciseGenerator(self.range_val, seed=7).iter_exercises(200))
+        assert small == list(ExerciseGenerator(self.range_val, seed=7).iter_exercises(200))
+        assert len({exercise.split('. ', 1)[1] for exercise, _ in small}) == len(small)
+        # 非种子模式不支持按题号生成
+        with pytest.raises(ValueError, match="随机种子"):
+            list(ExerciseGenerator(self.range_val).iter_range(1, 2))
+
+    def test_space_size(self):
+        """测试题目空间大小：叶子取值、上界与精确枚举"""
+        assert [str(v) for v in leaf_values(4)] == ["1/3", "1/2", "2/3", "1", "2", "3"]
+        assert leaf_values(1) == []
+        assert all(leaf_count(r) == len(leaf_values(r)) for r in range(12))
+        generator = ExerciseGenerator(2)
+        # r=2 时只有数字 1：1 个运算符 4 种、2 个运算符 2*16 种、3 个运算符 5*64 种
+        assert generator.space_upper_bound() == 4 + 32 + 320
+        size, exact = generator.space_size()
+        assert exact and size <= generator.space_upper_bound()
+        # 枚举结果互不等价且答案正确
+        exercises = generator.enumerate_exercises()
+        assert len(exercises) == size
+        for node, value in exercises.values():
+            expr = render(node)[1:-1]
+            assert ExerciseChecker.parse_exercise(expr) == value
+        # 范围较大时只给出上界估计
+        assert ExerciseGenerator(50).space_size() == (ExerciseGenerator(50).space_upper_bound(), False)
+
+    def test_dense_request_sampling(self):
+        """测试请求覆盖大部分题目空间时无放回抽样：不浪费尝试，空间耗尽时全部产出"""
+        generator = ExerciseGenerator(2)
+        size, _ = generator.space_size()
+        exercises, answers = generator.generate_exercise(size - 10)
+        assert len(exercises) == size - 10
+        # 再次请求只剩下未出过的题目
+        more, _ = generator.generate_exercise(100)
+        assert len(more) == 10
+        exprs = [e.split('. ', 1)[1] for e in exercises + more]
+        assert len(set(exprs)) == size
+        # 题目空间已耗尽
+        assert generator.generate_exercise(5) == ([], [])
+
+    def test_dense_threshold_uses_exact_size(self):
+        """测试稠密判断按不重复题目的精确数量而不是上界：r=3 时请求 6000 道题全部生成"""
+        generator = ExerciseGenerator(3)
+        size, exact = generator.space_size()
+        # 按上界判断时 6000 道不算稠密，按精确数量则是
+        assert exact and size * DENSE_RATIO <= 6000 < generator.space_upper_bound() * DENSE_RATIO
+        exercises, _ = generator.generate_exercise(6000)
+        assert len(exercises) == len({e.split('. ', 1)[1] for e in exercises}) == 6000
+        assert generator.stats['duplicate'] == 0
+        # 远小于题目空间的请求不枚举
+        small = ExerciseGenerator(4)
+        assert not small.is_dense(10) and small._space is None
+        # 枚举结果在生成器上复用
+        assert generator.enumerated_space() is generator.enumerated_space()
+
+    def test_seeded_dense_request(self):
+        """测试种子模式的稠密请求：按种子决定的排列取题，不浪费尝试，任意一段与整份结果一致"""
+        generator = ExerciseGenerator(3, seed=11)
+        full = list(generator.iter_exercises(6000))
+        assert len({exercise.split('. ', 1)[1] for exercise, _ in full}) == len(full) == 6000
+        assert generator.stats['attempts'] == 6000 and generator.stats['duplicate'] == 0
+        assert full == list(ExerciseGenerator(3, seed=11).iter_exercises(6000))
+        assert list(ExerciseGenerator(3, seed=11).iter_range(2000, 2100, 6000)) == full[1999:2100]
+        assert list(ExerciseGenerator(3, seed=12).iter_exercises(6000)) != full
+        # 请求超过题目空间时全部产出后结束
+        size, _ = generator.space_size()
+        assert len(list(ExerciseGenerator(3, seed=11).iter_exercises(size + 5))) == size
+
+    def test_dense_strata(self):
+        """测试按运算符数量分层：小的层先饱和，这些层无放回抽样，较大的层照常随机生成"""
+        generator = ExerciseGenerator(4)
+        # 6000 道题约 2000 次落在每一层：一、两个运算符的层稠密，三个运算符的层远未饱和且不枚举
+        assert sorted(generator.dense_strata(6000)) == [1, 2] and 3 not in generator._strata
+        exercises, answers = generator.generate_exercise(6000)
+        exprs = [e.split('. ', 1)[1][:-3] for e in exercises]
+        assert len(set(exprs)) == len(exprs) == 6000
+        assert all(ExerciseChecker.parse_exercise(e) == Fraction.from_string(a.split('. ', 1)[1])
+                   for e, a in zip(exprs[:500], answers))
+        # 只有一个运算符的题目全部抽完，抽样的层没有浪费尝试
+        operator_counts = [sum(expr.count(f" {op} ") for op in "+-×÷") for expr in exprs]
+        assert operator_counts.count(1) == len(generator.stratum(1))
+        assert generator.stats['attempts'] < 6000 * 1.5
+        # 指定运算符数量时整棵树恰好含该数量的运算符
+        for op_count in (1, 2, 3):
+            _, node, _ = generator.draw_candidate(op_count)
+            assert sum(render(node).count(f" {op} ") for op in "+-×÷") == op_count
+        # 上界超过枚举限制的层按上界估计，其余的层精确计数
+        size, exact = ExerciseGenerator(5).space_size()
+        assert not exact and size < ExerciseGenerator(5).space_upper_bound()
+
+    def test_constrained_construction(self):
+        """测试约束构造：无效尝试与子树重新生成为零，并与旧方式的统计对比"""
+        constrained = ExerciseGenerator(2)
+        legacy = ExerciseGenerator(2, constrained=False)
+        for _ in range(500):
+            constrained.generate_candidate()
+            legacy.generate_candidate()
+        assert constrained.stats['invalid'] == 0 and constrained.stats['regenerated'] == 0
+        assert legacy.stats['invalid'] > 0
+        for generator in (constrained, legacy):
+            stats = generator.stats
+            assert stats['attempts'] == stats['accepted'] + stats['invalid'] + stats['duplicate'] == 500
+
+        # 范围较大时每道题几乎只需一次尝试
+        generator = ExerciseGenerator(100)
+        exercises, _ = generator.generate_exercise(500)
+        assert len(exercises) == 500
+        assert generator.attempts_per_exercise() < 1.1
+        assert ExerciseGenerator(10).attempts_per_exercise() == 0.0
+
+    def test_constrained_nonzero_subtree(self):
+        """测试要求非零的子树与除法的除数永远非零"""
+        generator = ExerciseGenerator(3)
+        for _ in range(500):
+            node, value, _ = generator.build_expression(3, nonzero=True)
+            assert not value.is_zero(), f"要求非零的子树结果为零: {render(node)}"
+        for _ in range(500):
+            expr, value = generator.generate_expression(3)
+            assert value is not None and value >= 0
+        assert generator.stats['regenerated'] == 0
+
     def test_generate_expression_invalid_operator(self):
         """测试非法运算符异常"""
         original_ops = self.generator.operators
@@ -285,4 +466,90 @@ class TestExerciseChecker:
         ]
         for expr, expected in test_cases:
             result = ExerciseChecker.parse_exercise(expr)
-            assert result == expected, f"复杂表达式计算错误: {expr} 预期 {expected} 实际 {result}"
\ No newline at end of file
+            assert result == expected, f"复杂表达式计算错误: {expr} 预期 {expected} 实际 {result}"
+
+    def test_precedence_and_rejection(self):
+        """测试运算符优先级、左结合，以及负数中间结果、语法错误的处理"""
+        test_cases = [
+            ("1 + 2 × 3", Fraction(7)),
+            ("8 ÷ 2 ÷ 2", Fraction(2)),
+            ("6 - 2 - 1", Fraction(3)),
+            ("2 × 3 ÷ 6", Fraction(1)),
+            ("((1/2))", Fraction(1, 2)),
+            ("1 - 2 + 3", None),  # 中间结果为负数
+            ("(1 - 2) × 0", None),
+            ("1 ÷ (2 - 2)", None),
+            ("1 2", None),
+            ("1 +", None),
+            ("1 + 2)", None),
+            ("()", None),
+            ("", None),
+        ]
+        for expr, expected in test_cases:
+            result = ExerciseChecker.parse_exercise(expr)
+            assert result == expected, f"表达式计算错误: {expr} 预期 {expected} 实际 {result}"
+
+    def test_generated_exercises(self):
+        """测试对生成的题目计算结果与答案一致"""
+        exercises, answers = ExerciseGenerator(20, seed=11).generate_exercise(300)
+        for exercise, answer in zip(exercises, answers):
+            result = ExerciseChecker.parse_exercise(exercise.split('. ', 1)[1][:-3])
+            assert str(result) == answer.split('. ', 1)[1]
+
+    def test_subexpression_cache(self):
+        """测试子表达式缓存：结果与不缓存时一致，重复子表达式命中，容量受限"""
+        checker = ExerciseChecker(cache_size=64)
+        assert checker.evaluate("(3 × 1/2) + (5/7 ÷ 3)") == Fraction(3, 2) + Fraction(5, 21)
+        assert checker.stats == {'hits': 0, 'misses': 3}
+        assert checker.evaluate("(3 × 1/2) - 1") == Fraction(1, 2)
+        assert checker.stats['hits'] == 1
+        assert checker.evaluate("(3 × 1/2) + (5/7 ÷ 3)") == Fraction(3, 2) + Fraction(5, 21)
+        assert checker.cache_info()['hits'] == 2
+        for expr in ["(1 - 2) × 3", "(1 + 2", "1 + 2)", "1 ÷ (2 - 2)", "(1 2)"]:
+            assert checker.evaluate(expr) is None
+
+        exercises, _ = ExerciseGenerator(5, seed=2).generate_exercise(300)
+        small = ExerciseChecker(cache_size=8)
+        for exercise in exercises:
+            expr = exercise.split('. ', 1)[1][:-3]
+            assert small.evaluate(expr) == ExerciseChecker.parse_exercise(expr)
+            assert len(small.cache) <= 8
+        assert small.stats['hits'] > 0
+        assert ExerciseChecker(cache_size=0).evaluate("(1 + 2) × 3") == Fraction(9)
+
+    def test_streaming_grade(self, tmp_path):
+        """测试流式批改：结果字节数组、分块写出评分文件、文件末尾才发现数量不一致"""
+        exercise_file = tmp_path / "Exercises.txt"
+        answer_file = tmp_path / "Answers.txt"
+        grade_file = tmp_path / "Grade.txt"
+        exercise_file.write_text("".join(f"{i}. {i} + 1 = \n" for i in range(1, 11)), encoding="utf-8")
+        answer_file.write_text("".join(f"{i}. {i + i % 2}\n" for i in range(1, 11)), encoding="utf-8")
+
+        result = ExerciseChecker.grade(str(exercise_file), str(answer_file), grade_file=str(grade_file))
+        assert result.verdicts == bytearray([1, 0] * 5)
+        assert result.correct_count == 5 and result.wrong_count == 5
+        assert result.lines() == ["Correct: 5 (1, 3, 5, 7, 9)", "Wrong: 5 (2, 4, 6, 8, 10)"]
+        result.write(str(tmp_path / "chunked.txt"), chunk_size=2)
+        expected = "Correct: 5 (1, 3, 5, 7, 9)\nWrong: 5 (2, 4, 6, 8, 10)\n"
+        assert grade_file.read_text(encoding="utf-8") == expected
+        assert (tmp_path / "chunked.txt").read_text(encoding="utf-8") == expected
+        assert GradeResult().lines() == ["Correct: 0 ()", "Wrong: 0 ()"]
+
+        with answer_file.open("a", encoding="utf-8") as f:
+            f.write("11. 12\n")
+        with pytest.raises(Exception, match="错误：题目与答案数量不匹配。"):
+            ExerciseChecker.grade(str(exercise_file), str(answer_file), grade_file=None)
+
+    def test_grade_ranges(self, tmp_path):
+        """测试区间格式：连续题号合并为区间，单个题号原样输出"""
+        result = GradeResult(bytearray([1, 1, 1, 0, 1, 0, 0, 1, 1]))
+        assert list(result.iter_ranges(1)) == [(1, 3), (5, 5), (8, 9)]
+        assert list(result.iter_ranges(0)) == [(4, 4), (6, 7)]
+        assert result.lines('ranges') == ["Correct: 6 (1-3, 5, 8-9)", "Wrong: 3 (4, 6-7)"]
+        assert GradeResult(bytearray([0] * 5)).lines('ranges') == ["Correct: 0 ()", "Wrong: 5 (1-5)"]
+
+        grade_file = tmp_path / "Grade.txt"
+        result.write(str(grade_file), 'ranges', chunk_size=1)
+        assert grade_file.read_text(encoding="utf-8") == "Correct: 6 (1-3, 5, 8-9)\nWrong: 3 (4, 6-7)\n"
+        with pytest.raises(ValueError):
+            result.write(str(grade_file), 'csv')
@@ -0,0 +1,90 @@
+import csv
+import json
+import pytest
+from unittest.mock import patch
+from generator import ExerciseChecker
+import jobs
+from jobs import load_manifest, run_jobs, answer_key, job_waves
+
+
+class TestJobs:
+    """测试任务清单：在一个进程中执行多个生成与批改任务"""
+
+    def write_manifest(self, tmp_path, entries):
+        manifest = tmp_path / "manifest.jsonl"
+        manifest.write_text("\n".join(json.dumps(entry) for entry in entries) + "\n\n", encoding="utf-8")
+        return str(manifest)
+
+    def test_load_manifest(self, tmp_path):
+        """测试清单格式校验"""
+        manifest = self.write_manifest(tmp_path, [{'type': 'generate', 'n': 1, 'r': 5}])
+        assert load_manifest(manifest) == [{'type': 'generate', 'n': 1, 'r': 5}]
+        bad = tmp_path / "bad.jsonl"
+        bad.write_text('{"type": "generate"}\n{"type": "delete"}\n', encoding="utf-8")
+        with pytest.raises(Exception, match="第 2 行"):
+            load_manifest(str(bad))
+
+    def test_run_jobs(self, tmp_path):
+        """测试依次生成、批改，错误任务只记录在汇总中，答案键在任务之间复用"""
+        ex, ans, grade = (str(tmp_path / name) for name in ("E.txt", "A.txt", "G.txt"))
+        summary = str(tmp_path / "summary.csv")
+        manifest = self.write_manifest(tmp_path, [
+            {'type': 'generate', 'n': 30, 'r': 10, 'seed': 1, 'exercises': ex, 'answers': ans},
+            {'type': 'check', 'exercises': ex, 'answers': ans, 'grade': grade},
+            {'type': 'check', 'exercises': ex, 'answers': ans, 'grade': grade, 'grade_format': 'ranges'},
+            {'type': 'check', 'exercises': ex},
+            {'type': 'generate', 'n': 0, 'r': 10},
+        ])
+        jobs._keyCache.entries.clear()
+        with patch.object(ExerciseChecker, 'iter_key', wraps=ExerciseChecker.iter_key) as mock_iter_key:
+            rows = run_jobs(manifest, workers=1, summary_file=summary)
+        assert mock_iter_key.call_count == 1
+        assert [row['status'] for row in rows] == ['ok', 'ok', 'ok', 'error', 'error']
+        assert rows[0]['detail'] == "生成 30 道题" and rows[1]['detail'] == "正确 30，错误 0"
+        assert "answers" in rows[3]['detail']
+        with open(grade, encoding="utf-8") as f:
+            assert f.read() == "Correct: 30 (1-30)\nWrong: 0 ()\n"
+        with open(summary, encoding="utf-8", newline='') as f:
+            summary_rows = list(csv.DictReader(f))
+        assert [row['job'] for row in summary_rows] == ['1', '2', '3', '4', '5']
+        assert all(float(row['seconds']) >= 0 for row in summary_rows)
+
+    def test_run_jobs_pool(self, tmp_path):
+        """测试使用进程池执行相互独立的任务"""
+        entries = [{'type': 'generate', 'n': 10, 'r': 10, 'seed': i,
+                    'exercises': str(tmp_path / f"E{i}.txt"), 'answers': str(tmp_path / f"A{i}.txt")}
+                   for i in range(4)]
+        rows = run_jobs(self.write_manifest(tmp_path, entries), workers=2, summary_file=str(tmp_path / "s.csv"))
+        assert [row['status'] for row in rows] == ['ok'] * 4
+        first = (tmp_path / "E0.txt").read_text(encoding="utf-8")
+        assert first != (tmp_path / "E1.txt").read_text(encoding="utf-8")
+
+    def test_job_waves(self):
+        """测试按文件依赖分批：批改排在生成之后，写同一文件的任务按顺序，互不相关的任务同批"""
+        entries = [
+            {'type': 'generate', 'exercises': 'E1.txt', 'answers': 'A1.txt'},
+            {'type': 'generate', 'exercises': 'E2.txt', 'answers': 'A2.txt'},
+            {'type': 'check', 'exercises': 'E1.txt', 'answers': 'A1.txt', 'grade': 'G1.txt'},
+            {'type': 'check', 'exercises': 'E2.txt', 'answers': 'A2.txt', 'grade': 'G2.txt'},
+            {'type': 'generate', 'exercises': 'E1.txt', 'answers': 'A3.txt'},
+            {'type': 'check', 'exercises': 'E2.txt', 'answers': 'A2.txt', 'grade': 'G2.txt'},
+        ]
+        assert job_waves(entries) == [0, 0, 1, 1, 2, 2]
+
+    def test_run_jobs_pool_dependent(self, tmp_path):
+        """测试使用进程池时，批改任务在生成同一文件的任务完成之后才执行"""
+        ex, ans = str(tmp_path / "E.txt"), str(tmp_path / "A.txt")
+        entries = [{'type': 'generate', 'n': 2000, 'r': 10, 'seed': 1, 'exercises': ex, 'answers': ans}]
+        entries += [{'type': 'check', 'exercises': ex, 'answers': ans, 'grade': str(tmp_path / f"G{i}.txt")}
+                    for i in range(3)]
+        rows = run_jobs(self.write_manifest(tmp_path, entries), workers=2, summary_file=str(tmp_path / "s.csv"))
+        assert [row['status'] for row in rows] == ['ok'] * 4
+        assert [row['detail'] for row in rows[1:]] == ["正确 2000，错误 0"] * 3
+
+    def test_answer_key_invalidation(self, tmp_path):
+        """测试题目文件变化后重新计算答案键"""
+        exercise_file = tmp_path / "E.txt"
+        exercise_file.write_text("1. 1 + 2 = \n", encoding="utf-8")
+        assert [str(v) for v in answer_key(str(exercise_file))] == ["3"]
+        exercise_file.write_text("1. 1 + 2 = \n2. 2 × 3 = \n", encoding="utf-8")
+        assert [str(v) for v in answer_key(str(exercise_file))] == ["3", "6"]
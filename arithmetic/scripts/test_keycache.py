@@ -0,0 +1,81 @@
+import os
+from unittest.mock import patch
+from fraction import Fraction
+from generator import ExerciseGenerator, ExerciseChecker
+from keycache import AnswerKeyCache, KeyArray, cache_path, iter_cached_key, open_cache
+
+
+class TestKeyCache:
+    """测试题目文件旁的答案缓存（写出、零复制读取、内容或版本变化后失效）"""
+
+    def write_exercises(self, tmp_path, lines):
+        exercise_file = tmp_path / "Exercises.txt"
+        exercise_file.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return str(exercise_file)
+
+    def test_build_and_reuse(self, tmp_path):
+        """测试首次计算时写出缓存，再次读取时不再解析表达式"""
+        exercises, answers = ExerciseGenerator(10, seed=4).generate_exercise(100)
+        exercise_file = self.write_exercises(tmp_path, exercises + ["101. 1 ÷ 0 = "])
+        expected = list(ExerciseChecker.iter_key(exercise_file))
+        assert list(iter_cached_key(exercise_file)) == expected
+        assert os.path.exists(cache_path(exercise_file))
+
+        with patch.object(ExerciseChecker, 'parse_exercise', side_effect=AssertionError("不应解析")):
+            assert list(iter_cached_key(exercise_file)) == expected
+        with KeyArray(cache_path(exercise_file)) as key_array:
+            assert len(key_array) == 101
+            assert key_array[100] is None
+            assert str(key_array[0]) == answers[0].split('. ', 1)[1]
+
+    def test_invalidation(self, tmp_path):
+        """测试题目文件内容或求值器版本变化后缓存失效并重建"""
+        exercise_file = self.write_exercises(tmp_path, ["1. 1 + 2 = ", "2. 3 × 1/2 = "])
+        assert list(iter_cached_key(exercise_file)) == [Fraction(3), Fraction(3, 2)]
+        assert open_cache(exercise_file) is not None
+        open_cache(exercise_file).close()
+
+        self.write_exercises(tmp_path, ["1. 1 + 3 = ", "2. 3 × 1/2 = "])
+        assert open_cache(exercise_file) is None
+        assert list(iter_cached_key(exercise_file)) == [Fraction(4), Fraction(3, 2)]
+
+        with patch('keycache.EVALUATOR_VERSION', 999):
+            assert open_cache(exercise_file) is None
+
+        with open(cache_path(exercise_file), 'wb') as f:
+            f.write(b"garbage")
+        assert open_cache(exercise_file) is None
+        assert list(iter_cached_key(exercise_file)) == [Fraction(4), Fraction(3, 2)]
+
+    def test_unfinished_read_leaves_no_cache(self, tmp_path):
+        """测试未读完题目文件时不写出缓存"""
+        exercise_file = self.write_exercises(tmp_path, ["1. 1 + 2 = ", "2. 2 + 2 = "])
+        keys = iter_cached_key(exercise_file)
+        assert next(keys) == Fraction(3)
+        keys.close()
+        assert os.listdir(tmp_path) == ["Exercises.txt"]
+
+    def test_grade_with_key_cache(self, tmp_path):
+        """测试批改时使用答案缓存"""
+        exercise_file = self.write_exercises(tmp_path, ["1. 1 + 2 = ", "2. 2 + 2 = "])
+        answer_file = tmp_path / "Answers.txt"
+        answer_file.write_text("1. 3\n2. 5\n", encoding="utf-8")
+        for _ in range(2):
+            result = ExerciseChecker.grade(exercise_file, str(answer_file), grade_file=None, key_cache=True)
+            assert result.verdicts == bytearray([1, 0])
+        assert os.path.exists(cache_path(exercise_file))
+
+    def test_answer_key_cache(self, tmp_path):
+        """测试内存答案键缓存：文件未变时复用，变化后重新加载，超出数量时淘汰最久未用的"""
+        exercise_file = self.write_exercises(tmp_path, ["1. 1 + 2 = "])
+        other_file = str(tmp_path / "Other.txt")
+        with open(other_file, "w", encoding="utf-8") as f:
+            f.write("1. 2 × 3 = \n")
+        cache = AnswerKeyCache(max_entries=1)
+        assert cache.get(exercise_file) == [Fraction(3)]
+        assert cache.get(exercise_file) == [Fraction(3)]
+        assert cache.stats == {'hits': 1, 'loads': 1}
+        assert cache.get(other_file) == [Fraction(6)] and len(cache.entries) == 1
+        self.write_exercises(tmp_path, ["1. 1 + 2 = ", "2. 2 + 2 = "])
+        assert cache.get(exercise_file) == [Fraction(3), Fraction(4)]
+        assert cache.stats['loads'] == 3
@@ -1,8 +1,11 @@
 import pytest
 import tempfile
 import os
+import subprocess
+import sys
 from unittest.mock import patch, MagicMock
-from main import write_to_file, main
+from main import write_to_file, write_exercise_files, main, build_parser, parse_simple_args
+from generator import GradeResult
 
 
 class TestMain:
@@ -34,18 +37,37 @@ class TestMain:
         result = write_to_file("/root/test_write.txt", content)
         assert result is False
 
+    def test_write_exercise_files(self):
+        """测试流式写入题目和答案文件"""
+        with tempfile.TemporaryDirectory() as directory:
+            exercise_file = os.path.join(directory, 'Exercises.txt')
+            answer_file = os.path.join(directory, 'Answers.txt')
+            items = ((f"{i}. {i} + 1 = ", f"{i}. {i + 1}") for i in range(1, 10001))
+            assert write_exercise_files(items, exercise_file, answer_file) is True
+            with open(exercise_file, encoding='utf-8') as f:
+                exercise_lines = f.read().splitlines()
+            with open(answer_file, encoding='utf-8') as f:
+                answer_lines = f.read().splitlines()
+            assert len(exercise_lines) == len(answer_lines) == 10000
+            assert exercise_lines[0] == "1. 1 + 1 = " and answer_lines[-1] == "10000. 10001"
+
+            # 目标目录不存在时写入失败
+            missing = os.path.join(directory, 'missing', 'Exercises.txt')
+            with patch('builtins.print'):
+                assert write_exercise_files(iter([("1. 1 + 1 = ", "1. 2")]), missing, answer_file) is False
+
     def test_main_generation_mode_success(self):
         """测试生成模式成功"""
         with patch('main.ExerciseGenerator') as mock_generator:
             mock_instance = MagicMock()
             mock_generator.return_value = mock_instance
-            mock_instance.generate_exercise.return_value = (
-                ["1. 1 + 1 =", "2. 2 + 2 ="],
-                ["1. 2", "2. 4"]
-            )
+            mock_instance.iter_exercises.return_value = iter([
+                ("1. 1 + 1 =", "1. 2"),
+                ("2. 2 + 2 =", "2. 4"),
+            ])
 
             # 模拟文件写入成功
-            with patch('main.write_to_file') as mock_write:
+            with patch('main.write_exercise_files') as mock_write:
                 mock_write.return_value = True
 
                 with patch('sys.argv', ['main.py', '-n', '10', '-r', '10']):
@@ -54,21 +76,76 @@ class TestMain:
 
                         assert result == 0
                         mock_generator.assert_called_once_with(10)
-                        mock_instance.generate_exercise.assert_called_once_with(10)
-                        assert mock_write.call_count == 2
+                        mock_instance.iter_exercises.assert_called_once_with(10)
+                        assert mock_write.call_count == 1
+
+    def test_main_seed_and_index_range(self):
+        """测试 --seed 与 --range-of-indices 参数"""
+        with patch('main.ExerciseGenerator') as mock_generator, patch('main.write_exercise_files') as mock_write:
+            mock_write.return_value = True
+            mock_instance = mock_generator.return_value
+            with patch('sys.argv', ['main.py', '-n', '100', '-r', '10', '--seed', '5', '--range-of-indices', '20-30']):
+                with patch('builtins.print'):
+                    assert main() == 0
+            mock_generator.assert_called_once_with(10, seed=5)
+            mock_instance.iter_range.assert_called_once_with(20, 30, 100)
+
+        invalid_cases = [
+            (['main.py', '-n', '100', '-r', '10', '--range-of-indices', '20-30'], "--seed"),
+            (['main.py', '-n', '100', '-r', '10', '--seed', '5', '--range-of-indices', '20-300'], "1-100"),
+            (['main.py', '-n', '100', '-r', '10', '--seed', '5', '--range-of-indices', 'abc'], "格式"),
+            (['main.py', '-n', '100', '-r', '10', '--seed', '5', '--range-of-indices', '1-2', '--workers', '2'], "多进程"),
+        ]
+        for argv, expected_error in invalid_cases:
+            with patch('sys.argv', argv):
+                with patch('builtins.print') as mock_print:
+                    assert main() == 1
+                    assert expected_error in str(mock_print.call_args_list[-1][0][0])
+
+    def test_main_vectorized(self):
+        """测试 --vectorized 参数及其与多进程、题号范围的互斥"""
+        pytest.importorskip("numpy")
+        with patch('batch_generator.BatchGenerator') as mock_generator, patch('main.write_exercise_files') as mock_write:
+            mock_write.return_value = True
+            with patch('sys.argv', ['main.py', '-n', '100', '-r', '10', '--vectorized', '--seed', '3']):
+                with patch('builtins.print'):
+                    assert main() == 0
+            mock_generator.assert_called_once_with(10, seed=3)
+            mock_generator.return_value.iter_exercises.assert_called_once_with(100)
+
+        with patch('sys.argv', ['main.py', '-n', '100', '-r', '10', '--vectorized', '--workers', '2']):
+            with patch('builtins.print') as mock_print:
+                assert main() == 1
+                assert "向量化" in str(mock_print.call_args_list[-1][0][0])
+
+    def test_main_binary(self):
+        """测试 --binary 参数同时写入二进制题目文件"""
+        with patch('main.ExerciseGenerator') as mock_generator, patch('main.write_binary_files') as mock_write:
+            mock_write.return_value = True
+            with patch('sys.argv', ['main.py', '-n', '10', '-r', '10', '--binary', 'Exercises.bin']):
+                with patch('builtins.print'):
+                    assert main() == 0
+            assert mock_write.call_args[0][1] == 'Exercises.bin'
+
+    def test_main_compress(self):
+        """测试 --compress 参数把题目与答案写入压缩文件"""
+        with patch('main.ExerciseGenerator') as mock_generator, patch('main.write_exercise_files') as mock_write:
+            mock_write.return_value = True
+            with patch('sys.argv', ['main.py', '-n', '10', '-r', '10', '--compress', 'gz']):
+                with patch('builtins.print') as mock_print:
+                    assert main() == 0
+            assert mock_write.call_args[0][1:] == ('Exercises.txt.gz', 'Answers.txt.gz')
+            mock_print.assert_any_call("题目已写入Exercises.txt.gz")
 
     def test_main_generation_mode_file_write_failure(self):
         """测试生成模式文件写入失败"""
         with patch('main.ExerciseGenerator') as mock_generator:
             mock_instance = MagicMock()
             mock_generator.return_value = mock_instance
-            mock_instance.generate_exercise.return_value = (
-                ["1. 1 + 1 ="],
-                ["1. 2"]
-            )
+            mock_instance.iter_exercises.return_value = iter([("1. 1 + 1 =", "1. 2")])
 
             # 模拟文件写入失败
-            with patch('main.write_to_file') as mock_write:
+            with patch('main.write_exercise_files') as mock_write:
                 mock_write.return_value = False
 
                 with patch('sys.argv', ['main.py', '-n', '5', '-r', '5']):
@@ -78,17 +155,102 @@ class TestMain:
                         assert result == 0  # 主程序应该继续执行
                         mock_write.assert_called()
 
-    def test_main_grading_mode_success(self):
+    def test_main_grading_mode_success(self, capsys):
         """测试批改模式成功"""
         with patch('main.ExerciseChecker') as mock_checker:
-            mock_checker.check_answers.return_value = (['1', '3'], ['2', '4'])
+            mock_checker.grade.return_value = GradeResult(bytearray([1, 0, 1, 0]))
 
             with patch('sys.argv', ['main.py', '-e', 'exercises.txt', '-a', 'answers.txt']):
+                result = main()
+
+                assert result == 0
+                mock_checker.grade.assert_called_once_with('exercises.txt', 'answers.txt', key_cache=False,
+                                                           grade_format='list')
+                assert capsys.readouterr().out.endswith("Correct: 2 (1, 3)\nWrong: 2 (2, 4)\n")
+
+        with patch('main.ExerciseChecker') as mock_checker:
+            mock_checker.grade.return_value = GradeResult(bytearray([1, 1, 1, 0, 1]))
+            with patch('sys.argv', ['main.py', '-e', 'exercises.txt', '-a', 'answers.txt', '--grade-format', 'ranges']):
+                assert main() == 0
+                assert mock_checker.grade.call_args[1]['grade_format'] == 'ranges'
+                assert capsys.readouterr().out.endswith("Correct: 4 (1-3, 5)\nWrong: 1 (4)\n")
+
+    def test_main_grading_workers(self, capsys):
+        """测试批改模式的 --workers 参数"""
+        with patch('parallel.grade_parallel') as mock_grade:
+            mock_grade.return_value = GradeResult(bytearray([1, 1]))
+            with patch('sys.argv', ['main.py', '-e', 'exercises.txt', '-a', 'answers.txt', '--workers', '4']):
+                assert main() == 0
+                assert "Correct: 2 (1, 2)\n" in capsys.readouterr().out
+            mock_grade.assert_called_once_with('exercises.txt', 'answers.txt', 4, grade_format='list',
+                                               key_cache=False)
+
+        # --key-cache 传给多进程批改与增量批改
+        with patch('parallel.grade_parallel') as mock_grade:
+            mock_grade.return_value = GradeResult(bytearray([1]))
+            with patch('sys.argv', ['main.py', '-e', 'e.txt', '-a', 'a.txt', '--workers', '2', '--key-cache']):
+                assert main() == 0
+            assert mock_grade.call_args[1]['key_cache'] is True
+        with patch('regrade.regrade') as mock_regrade:
+            mock_regrade.return_value = GradeResult(bytearray([1])), 1
+            with patch('sys.argv', ['main.py', '-e', 'e.txt', '-a', 'a.txt', '--incremental', '--key-cache']):
+                assert main() == 0
+            assert mock_regrade.call_args[1]['key_cache'] is True
+
+    def test_main_serve(self):
+        """测试 --serve 参数启动批改服务，以及与其他模式的互斥"""
+        with patch('server.serve', new_callable=MagicMock) as mock_serve, patch('asyncio.run') as mock_run:
+            with patch('sys.argv', ['main.py', '--serve', '127.0.0.1:8765', '--max-concurrency', '8',
+                                    '--serve-root', 'data']):
+                assert main() == 0
+            mock_serve.assert_called_once_with('127.0.0.1:8765', 8, 'data')
+            mock_run.assert_called_once_with(mock_serve.return_value)
+
+        with patch('sys.argv', ['main.py', '--serve', '127.0.0.1:8765', '-n', '10', '-r', '10']):
+            with patch('builtins.print') as mock_print:
+                assert main() == 1
+                assert "服务模式" in str(mock_print.call_args_list[-1][0][0])
+
+    def test_main_students(self):
+        """测试 --students 批量批改参数"""
+        with patch('batch_grade.grade_students') as mock_grade:
+            mock_grade.return_value = [{'error': ''}, {'error': '错误'}]
+            with patch('sys.argv', ['main.py', '-e', 'exercises.txt', '--students', 'subs/', '--out-dir', 'out']):
                 with patch('builtins.print') as mock_print:
-                    result = main()
+                    assert main() == 0
+                    assert "1 份出错" in str(mock_print.call_args_list[-2][0][0])
+            mock_grade.assert_called_once_with('exercises.txt', 'subs/', 'out', 1)
 
-                    assert result == 0
-                    mock_checker.check_answers.assert_called_once_with('exercises.txt', 'answers.txt')
+        with patch('sys.argv', ['main.py', '-e', 'exercises.txt', '-a', 'a.txt', '--students', 'subs/']):
+            with patch('builtins.print') as mock_print:
+                assert main() == 1
+                assert "--students" in str(mock_print.call_args_list[-1][0][0])
+
+    def test_main_incremental(self, capsys):
+        """测试 --incremental 增量批改参数"""
+        with patch('regrade.regrade') as mock_regrade:
+            mock_regrade.return_value = (GradeResult(bytearray([1, 0])), 1)
+            with patch('sys.argv', ['main.py', '-e', 'exercises.txt', '-a', 'answers.txt', '--incremental']):
+                assert main() == 0
+            mock_regrade.assert_called_once_with('exercises.txt', 'answers.txt', grade_format='list',
+                                                 key_cache=False)
+            output = capsys.readouterr().out
+            assert "重新批改了 1 道题" in output and output.endswith("Wrong: 1 (2)\n")
+
+    def test_main_jobs(self):
+        """测试 --jobs 任务清单模式"""
+        with patch('jobs.run_jobs') as mock_run:
+            mock_run.return_value = [{'status': 'ok'}, {'status': 'ok'}]
+            with patch('sys.argv', ['main.py', '--jobs', 'manifest.jsonl', '--workers', '2']):
+                with patch('builtins.print') as mock_print:
+                    assert main() == 0
+                    assert "已完成 2 个任务" in str(mock_print.call_args_list[-2][0][0])
+            mock_run.assert_called_once_with('manifest.jsonl', 2, 'jobs_summary.csv')
+
+        with patch('sys.argv', ['main.py', '--jobs', 'manifest.jsonl', '-n', '10', '-r', '10']):
+            with patch('builtins.print') as mock_print:
+                assert main() == 1
+                assert "任务清单" in str(mock_print.call_args_list[-1][0][0])
 
     def test_main_invalid_arguments_both_modes(self):
         """测试同时提供生成和批改参数"""
@@ -177,7 +339,7 @@ class TestMain:
 
     def test_main_checker_exception(self):
         """测试批改器抛出异常的情况"""
-        with patch('main.ExerciseChecker.check_answers') as mock_checker:
+        with patch('main.ExerciseChecker.grade') as mock_checker:
             mock_checker.side_effect = Exception("批改器内部错误")
 
             with patch('sys.argv', ['main.py', '-e', 'exercises.txt', '-a', 'answers.txt']):
@@ -209,4 +371,64 @@ class TestMain:
 
                 assert result == 1
                 last_call_args = mock_print.call_args_list[-1][0][0]
-                assert "必须是大于等于1的自然数" in str(last_call_args)
\ No newline at end of file
+                assert "必须是大于等于1的自然数" in str(last_call_args)
+
+
+class TestStartup:
+    """测试快速启动：简单命令行不经过 argparse，启动时不导入生成、批改模块"""
+
+    # 运行 main.py -n 1 -r 10 比空解释器多用的时间上限（毫秒），远大于正常值，只用于发现明显的回退
+    STARTUP_BUDGET_MS = 60
+    HEAVY_MODULES = ('argparse', 'generator', 'fraction', 'fileio', 'shutil', 'bz2', 'lzma', 'hashlib', 'random')
+    # 生成少量题目时不应加载的模块（只在批改或旧的字符串查重中用到）
+    GENERATION_UNUSED_MODULES = ('argparse', 're', 'hashlib', 'bz2', 'lzma', 'numpy')
+
+    def test_simple_args_match_argparse(self):
+        """测试简单解析与 argparse 的结果一致，其他形式交给 argparse"""
+        for argv in (['-n', '10', '-r', '5'], ['-r', '5', '-n', '-3'], ['-e', 'ex.txt', '-a', 'ans.txt']):
+            with patch('sys.argv', ['main.py'] + argv):
+                expected = vars(build_parser().parse_args())
+            assert vars(parse_simple_args(argv)) == expected
+        for argv in (['-n', '10'], ['-n', 'x', '-r', '5'], ['-n', '1', '-n', '2'], ['-e', '-a', '-a', 'x'],
+                     ['-n', '10', '-r', '5', '--seed', '1'], ['-n', '10', '-e', 'x']):
+            assert parse_simple_args(argv) is None
+
+    def test_import_without_heavy_modules(self):
+        """测试导入 main、解析命令行（包括 argparse 解析器）时不加载生成、批改模块"""
+        directory = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = ("import sys; import main; main.parse_simple_args(['-n', '10', '-r', '10']); "
+                f"print(','.join(m for m in {self.HEAVY_MODULES!r} if m in sys.modules)); "
+                "main.build_parser().parse_args(['-n', '10', '-r', '10', '--seed', '1']); "
+                "print('generator' in sys.modules)")
+        completed = subprocess.run([sys.executable, '-c', code], cwd=directory,
+                                   capture_output=True, text=True, check=True)
+        assert completed.stdout.split() == ["False"]
+
+    def test_startup_budget(self, tmp_path):
+        """测试完整运行 main.py -n 1 -r 10 的耗时在预算之内，且不加载只有批改才用到的模块"""
+        import time
+        script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'main.py')
+
+        def best_of(args, runs=3):
+            timings = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                subprocess.run([sys.executable, *args], cwd=tmp_path, capture_output=True, check=True)
+                timings.append(time.perf_counter() - start)
+            return min(timings)
+
+        overhead_ms = (best_of([script, '-n', '1', '-r', '10']) - best_of(['-c', 'pass'])) * 1000
+        assert overhead_ms < self.STARTUP_BUDGET_MS
+        assert (tmp_path / "Exercises.txt").read_text(encoding="utf-8").startswith("1. ")
+
+        completed = subprocess.run([sys.executable, '-X', 'importtime', script, '-n', '1', '-r', '10'], cwd=tmp_path,
+                                   capture_output=True, text=True, check=True)
+        imported = {line.split('|')[-1].strip() for line in completed.stderr.splitlines() if '|' in line}
+        assert 'generator' in imported
+        assert not imported & set(self.GENERATION_UNUSED_MODULES)
+
+    def test_grade_formats_match_generator(self):
+        """测试 main 中的评分格式与 generator 一致"""
+        import main
+        import generator
+        assert main.GRADE_FORMATS == generator.GRADE_FORMATS
@@ -0,0 +1,145 @@
+import gzip
+import random
+import pytest
+from unittest.mock import patch
+from generator import ExerciseGenerator, ExerciseChecker
+from binfmt import BinaryExerciseWriter
+from fingerprint_store import ExactStore, create_store
+from fraction import Fraction
+from keycache import open_cache
+from parallel import generate_parallel, grade_parallel, split_lines, _generate_batch, _merge_batches
+
+
+class TestParallel:
+    """测试多进程生成"""
+
+    def test_generate_batch(self):
+        """测试单个任务批内去重，且相同种子结果相同"""
+        fps, exercises, answers = _generate_batch((10, 200, 42))
+        assert (fps, exercises, answers) == _generate_batch((10, 200, 42))
+        assert len(fps) == len(set(fps)) == len(exercises) == len(answers)
+        for exercise, answer in zip(exercises, answers):
+            assert exercise.endswith(' = ')
+            assert ExerciseChecker.parse_exercise(exercise[:-3]) == Fraction.from_string(answer)
+
+    def test_merge_batches(self):
+        """测试主进程跨批去重、编号与数量上限，各种指纹存储结果一致"""
+        batches = [([1, 2, 3], ["a = ", "b = ", "c = "], ["1", "2", "3"]),
+                   ([3, 4], ["c2 = ", "d = "], ["3", "4"]),
+                   ([5, 6], ["e = ", "f = "], ["5", "6"])]
+        for store in ('exact', 'set', 'bloom'):
+            assert list(_merge_batches(iter(batches), 5, store)) == [
+                ("1. a = ", "1. 1"), ("2. b = ", "2. 2"), ("3. c = ", "3. 3"), ("4. d = ", "4. 4"), ("5. e = ", "5. 5")]
+        # 'exact' 在主进程中也使用紧凑的指纹表，按题目数量预先分配
+        with patch('parallel.create_store', wraps=create_store) as mock_create:
+            list(_merge_batches(iter(batches), 5, 'exact'))
+        mock_create.assert_called_once_with('exact', capacity=5)
+        store = ExactStore(capacity=2)
+        assert len(list(_merge_batches(iter(batches), 10, store))) == 6 and len(store) == 6
+
+    def test_generate_parallel(self):
+        """测试多进程生成的数量、编号、唯一性与答案一致性"""
+        random.seed(1)
+        exercises, answers = generate_parallel(10, 300, workers=2, batch_size=50)
+        assert len(exercises) == len(answers) == 300
+        exprs = []
+        for i, (exercise, answer) in enumerate(zip(exercises, answers), start=1):
+            number, expr = exercise.split('. ', 1)
+            assert number == str(i) and answer.startswith(f"{i}. ")
+            expr = expr.replace(' =', '').strip()
+            assert ExerciseChecker.parse_exercise(expr) == Fraction.from_string(answer.split('. ', 1)[1])
+            exprs.append(expr)
+        assert len(set(exprs)) == 300, "存在重复题目"
+
+        # 相同的主进程种子得到相同的题目与编号
+        random.seed(1)
+        assert generate_parallel(10, 300, workers=2, batch_size=50) == (exercises, answers)
+        # 显式种子不依赖全局随机状态
+        seeded = generate_parallel(10, 100, workers=2, batch_size=50, seed=9)
+        random.seed(2)
+        assert generate_parallel(10, 100, workers=2, batch_size=50, seed=9) == seeded
+
+    def test_main_workers(self):
+        """测试命令行 --workers 参数"""
+        from main import main
+        with patch('parallel.iter_parallel') as mock_parallel, patch('main.write_exercise_files') as mock_write:
+            mock_parallel.return_value = iter([("1. 1 + 1 = ", "1. 2")])
+            mock_write.return_value = True
+            with patch('sys.argv', ['main.py', '-n', '5', '-r', '10', '--workers', '2']):
+                with patch('builtins.print'):
+                    assert main() == 0
+            mock_parallel.assert_called_once_with(10, 5, 2, seed=None)
+        with patch('sys.argv', ['main.py', '-n', '5', '-r', '10', '--workers', '0']):
+            with patch('builtins.print') as mock_print:
+                assert main() == 1
+                assert "进程数" in str(mock_print.call_args_list[-1][0][0])
+
+    def test_split_lines(self, tmp_path):
+        """测试按行边界切块：各块首尾相接，且都从行首开始"""
+        path = tmp_path / "lines.txt"
+        content = "".join(f"{i}. {'x' * (i % 13)}\n" for i in range(1, 200))
+        path.write_bytes(content.encode('utf-8'))
+        ranges = split_lines(str(path), 7)
+        assert ranges[0][0] == 0 and ranges[-1][1] == len(content)
+        assert all(a[1] == b[0] for a, b in zip(ranges, ranges[1:]))
+        assert all(content[start - 1] == '\n' for start, _ in ranges[1:])
+        empty = tmp_path / "empty.txt"
+        empty.write_bytes(b"")
+        assert split_lines(str(empty), 4) == [(0, 0)]
+
+    def test_grade_parallel(self, tmp_path):
+        """测试多进程批改与单进程结果一致，空行、数量不一致的处理"""
+        exercises, answers = ExerciseGenerator(10, seed=5).generate_exercise(500)
+        answers = [a if i % 7 else f"{a.split('. ')[0]}. 0" for i, a in enumerate(answers)]
+        exercise_file = tmp_path / "Exercises.txt"
+        answer_file = tmp_path / "Answers.txt"
+        exercise_file.write_text("\n".join(exercises) + "\n", encoding="utf-8")
+        # 答案文件中夹杂空行，块边界与题目文件不同
+        answer_file.write_text("\n\n".join(answers) + "\n", encoding="utf-8")
+
+        expected = ExerciseChecker.grade(str(exercise_file), str(answer_file), grade_file=None)
+        grade_file = tmp_path / "Grade.txt"
+        result = grade_parallel(str(exercise_file), str(answer_file), 2, grade_file=str(grade_file))
+        assert result.verdicts == expected.verdicts
+        assert 0 < result.wrong_count < len(result)
+        assert grade_file.read_text(encoding="utf-8") == "\n".join(expected.lines()) + "\n"
+
+        # 压缩的答案文件退回单进程批改
+        compressed_file = tmp_path / "Answers.txt.gz"
+        compressed_file.write_bytes(gzip.compress(answer_file.read_bytes()))
+        assert grade_parallel(str(exercise_file), str(compressed_file), 2, grade_file=None).verdicts == expected.verdicts
+
+        with answer_file.open("a", encoding="utf-8") as f:
+            f.write("501. 1\n")
+        with pytest.raises(Exception, match="数量不匹配"):
+            grade_parallel(str(exercise_file), str(answer_file), 2, grade_file=None)
+
+    def test_grade_parallel_key_cache(self, tmp_path):
+        """测试多进程批改时写出答案缓存，之后各进程直接读取缓存"""
+        exercises, answers = ExerciseGenerator(10, seed=8).generate_exercise(300)
+        answers[5] = "6. 0"
+        exercise_file = tmp_path / "Exercises.txt"
+        answer_file = tmp_path / "Answers.txt"
+        exercise_file.write_text("\n".join(exercises) + "\n", encoding="utf-8")
+        answer_file.write_text("\n".join(answers) + "\n", encoding="utf-8")
+        expected = ExerciseChecker.grade(str(exercise_file), str(answer_file), grade_file=None)
+
+        result = grade_parallel(str(exercise_file), str(answer_file), 2, grade_file=None, key_cache=True)
+        assert result.verdicts == expected.verdicts
+        with open_cache(str(exercise_file)) as key_array:
+            assert list(key_array) == list(ExerciseChecker.iter_key(str(exercise_file)))
+        with patch.object(ExerciseChecker, 'evaluate') as mock_evaluate:
+            result = grade_parallel(str(exercise_file), str(answer_file), 2, grade_file=None, key_cache=True)
+        assert result.verdicts == expected.verdicts and not mock_evaluate.called
+
+    def test_grade_parallel_binary(self, tmp_path):
+        """测试用二进制题目文件多进程批改"""
+        exercises, answers = ExerciseGenerator(10, seed=6).generate_exercise(100)
+        binary_file = tmp_path / "Exercises.bin"
+        with BinaryExerciseWriter(str(binary_file)) as writer:
+            for _ in writer.tee(zip(exercises, answers)):
+                pass
+        answer_file = tmp_path / "Answers.txt"
+        answer_file.write_text("\n".join(answers) + "\n", encoding="utf-8")
+        result = grade_parallel(str(binary_file), str(answer_file), 3, grade_file=None)
+        assert result.correct_count == len(result) == 100
@@ -0,0 +1,84 @@
+import os
+import pytest
+from unittest.mock import patch
+from generator import ExerciseGenerator, ExerciseChecker
+from regrade import regrade, SUFFIX
+
+
+class TestRegrade:
+    """测试增量批改（只重新批改变化的行，题目变化后全部重新批改）"""
+
+    def setup_method(self):
+        self.exercises, self.answers = ExerciseGenerator(10, seed=12).generate_exercise(200)
+
+    def write(self, path, lines):
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        return str(path)
+
+    def test_regrade_changed_lines(self, tmp_path):
+        """测试首次全部批改，重新提交后只批改变化的行，结果与完整批改一致"""
+        exercise_file = self.write(tmp_path / "Exercises.txt", self.exercises)
+        answer_file = self.write(tmp_path / "Answers.txt", self.answers)
+        grade_file = str(tmp_path / "Grade.txt")
+
+        result, regraded = regrade(exercise_file, answer_file, grade_file)
+        assert regraded == 200 and result.correct_count == 200
+        assert os.path.exists(answer_file + SUFFIX)
+
+        edited = list(self.answers)
+        edited[3] = "4. 999999"
+        edited[150] = "151. 999999"
+        self.write(tmp_path / "Answers.txt", edited)
+        with patch.object(ExerciseChecker, 'evaluate', wraps=ExerciseChecker().evaluate) as mock_evaluate:
+            result, regraded = regrade(exercise_file, answer_file, grade_file)
+        assert regraded == 2 and mock_evaluate.call_count == 2
+        assert result.wrong() == ["4", "151"]
+        expected = ExerciseChecker.grade(exercise_file, answer_file, grade_file=None)
+        assert result.verdicts == expected.verdicts
+        with open(grade_file, encoding="utf-8") as f:
+            assert f.read() == "\n".join(expected.lines()) + "\n"
+
+        # 没有变化时不读取题目
+        with patch('regrade._keys_at') as mock_keys:
+            result, regraded = regrade(exercise_file, answer_file, grade_file)
+        assert regraded == 0 and not mock_keys.called and result.wrong_count == 2
+
+    def test_exercise_change_invalidates_state(self, tmp_path):
+        """测试题目文件变化后全部重新批改，数量不一致时报错"""
+        exercise_file = self.write(tmp_path / "Exercises.txt", self.exercises)
+        answer_file = self.write(tmp_path / "Answers.txt", self.answers)
+        regrade(exercise_file, answer_file, grade_file=None)
+
+        self.write(tmp_path / "Exercises.txt", ["1. 1 + 1 = "] + self.exercises[1:])
+        result, regraded = regrade(exercise_file, answer_file, grade_file=None)
+        assert regraded == 200
+        assert result.verdicts[0] == (self.answers[0].split('. ', 1)[1] == "2")
+        assert result.verdicts[1:] == bytearray([1] * 199)
+
+        self.write(tmp_path / "Answers.txt", self.answers[:-1])
+        with pytest.raises(Exception, match="数量不匹配"):
+            regrade(exercise_file, answer_file, grade_file=None)
+
+    def test_digest_computed_once(self, tmp_path):
+        """测试使用答案缓存时题目文件只计算一次摘要"""
+        from keycache import iter_cached_key
+        exercise_file = self.write(tmp_path / "Exercises.txt", self.exercises)
+        answer_file = self.write(tmp_path / "Answers.txt", self.answers)
+        list(iter_cached_key(exercise_file))
+        with patch('keycache.file_digest') as mock_digest, \
+                patch.object(ExerciseChecker, 'evaluate') as mock_evaluate:
+            result, regraded = regrade(exercise_file, answer_file, grade_file=None)
+        assert regraded == 200 and result.correct_count == 200
+        assert not mock_digest.called and not mock_evaluate.called
+
+    def test_key_cache(self, tmp_path):
+        """测试 key_cache 为 True 时建立答案缓存，之后重新批改不再计算题目"""
+        from keycache import cache_path
+        exercise_file = self.write(tmp_path / "Exercises.txt", self.exercises)
+        answer_file = self.write(tmp_path / "Answers.txt", self.answers)
+        regrade(exercise_file, answer_file, grade_file=None, key_cache=True)
+        assert os.path.exists(cache_path(exercise_file))
+        self.write(tmp_path / "Answers.txt", ["1. 999999"] + self.answers[1:])
+        with patch.object(ExerciseChecker, 'evaluate') as mock_evaluate:
+            result, regraded = regrade(exercise_file, answer_file, grade_file=None, key_cache=True)
+        assert regraded == 1 and result.wrong() == ["1"] and not mock_evaluate.called
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import os
+import threading
+from unittest.mock import patch
+from generator import ExerciseGenerator
+from server import AnswerKeyCache, GradingServer
+
+
+class TestGradingServer:
+    """测试常驻批改服务（JSON 行协议、答案键缓存、错误响应）"""
+
+    def setup_method(self):
+        self.exercises, self.answers = ExerciseGenerator(10, seed=8).generate_exercise(50)
+
+    def write_files(self, tmp_path):
+        exercise_file = tmp_path / "Exercises.txt"
+        answer_file = tmp_path / "Answers.txt"
+        exercise_file.write_text("\n".join(self.exercises) + "\n", encoding="utf-8")
+        answer_file.write_text("\n".join(self.answers) + "\n", encoding="utf-8")
+        return str(exercise_file), str(answer_file)
+
+    def test_key_cache(self, tmp_path):
+        """测试答案键缓存：重复请求命中，文件变化后重新加载"""
+        exercise_file, _ = self.write_files(tmp_path)
+
+        async def run():
+            cache = AnswerKeyCache()
+            first, second = await asyncio.gather(cache.get(exercise_file), cache.get(exercise_file))
+            assert first is second and len(first) == 50
+            assert cache.stats == {'hits': 1, 'loads': 1}
+            with open(exercise_file, 'a', encoding='utf-8') as f:
+                f.write("51. 1 + 1 = \n")
+            os.utime(exercise_file, ns=(0, 0))
+            assert len(await cache.get(exercise_file)) == 51
+            assert cache.stats['loads'] == 2
+
+        asyncio.run(run())
+
+    def test_protocol(self, tmp_path):
+        """测试通过 TCP 连接按行发送请求并取回批改结果"""
+        exercise_file, answer_file = self.write_files(tmp_path)
+        wrong_lines = [f"{i}. 0" if i == 2 else line for i, line in enumerate(self.answers, 1)]
+        grade_file = str(tmp_path / "Grade.txt")
+        requests = [
+            {'id': 1, 'exercises': exercise_file, 'answers': answer_file, 'grade_file': grade_file},
+            {'id': 2, 'exercises': exercise_file, 'answer_lines': wrong_lines},
+            {'id': 3, 'exercises': exercise_file, 'answer_lines': wrong_lines[:10]},
+            {'id': 4, 'answers': answer_file},
+            {'id': 5, 'exercises': str(tmp_path / "missing.txt"), 'answers': answer_file},
+        ]
+
+        async def run():
+            server = await GradingServer(max_concurrency=2, root=str(tmp_path)).start('127.0.0.1:0')
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                for request in requests:
+                    writer.write(json.dumps(request).encode('utf-8') + b'\n')
+                writer.write(b'not json\n')
+                await writer.drain()
+                responses = [json.loads(await reader.readline()) for _ in range(len(requests) + 1)]
+                writer.close()
+                await writer.wait_closed()
+            return responses
+
+        responses = asyncio.run(run())
+        assert responses[0] == {'id': 1, 'ok': True, 'correct': list(range(1, 51)), 'wrong': []}
+        assert responses[1]['ok'] and responses[1]['wrong'] == [2] and len(responses[1]['correct']) == 49
+        assert not responses[2]['ok'] and "数量不匹配" in responses[2]['error']
+        assert not responses[3]['ok'] and "exercises" in responses[3]['error']
+        assert not responses[4]['ok'] and responses[4]['id'] == 5
+        assert not responses[5]['ok'] and "请求格式错误" in responses[5]['error']
+        with open(grade_file, encoding='utf-8') as f:
+            assert f.readline().startswith("Correct: 50 (1, 2, 3")
+
+    def test_paths_confined_to_root(self, tmp_path):
+        """测试请求中的路径只能位于服务根目录之下，相对路径按根目录解析"""
+        root = tmp_path / "root"
+        root.mkdir()
+        exercise_file, answer_file = self.write_files(root)
+        outside = tmp_path / "evil.txt"
+        server = GradingServer(root=str(root))
+        requests = [
+            {'exercises': "Exercises.txt", 'answers': "Answers.txt", 'grade_file': "Grade.txt"},
+            {'exercises': exercise_file, 'answers': answer_file, 'grade_file': str(outside)},
+            {'exercises': exercise_file, 'answers': answer_file, 'grade_file': "../evil.txt"},
+            {'exercises': "/etc/passwd", 'answer_lines': []},
+        ]
+
+        async def run():
+            return [await server.handle_request(request) for request in requests]
+
+        responses = asyncio.run(run())
+        assert responses[0]['ok'] and (root / "Grade.txt").exists()
+        for response in responses[1:]:
+            assert not response['ok'] and "根目录" in response['error']
+        assert not outside.exists()
+
+    def test_grading_does_not_block_event_loop(self, tmp_path):
+        """测试批改在线程池中进行：一个耗时的请求不会阻塞其他请求"""
+        exercise_file, answer_file = self.write_files(tmp_path)
+        server = GradingServer(max_concurrency=2, root=str(tmp_path))
+        release = threading.Event()
+        real_grade_request = __import__('server').grade_request
+
+        def slow_grade_request(key, answer_lines=None, answer_file=None, grade_file=None):
+            if answer_file is not None:
+                release.wait(5)
+            return real_grade_request(key, answer_lines, answer_file, grade_file)
+
+        async def run():
+            await server.cache.get(exercise_file)
+            slow = asyncio.ensure_future(server.handle_request({'exercises': exercise_file, 'answers': answer_file}))
+            fast = await asyncio.wait_for(
+                server.handle_request({'exercises': exercise_file, 'answer_lines': self.answers}), 2)
+            assert not slow.done()
+            release.set()
+            return fast, await slow
+
+        with patch('server.grade_request', slow_grade_request):
+            fast, slow = asyncio.run(run())
+        assert fast['ok'] and slow['ok'] and len(slow['correct']) == 50
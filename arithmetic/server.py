@@ -0,0 +1,137 @@
+import asyncio
+import json
+import os
+import keycache
+from fileio import open_text
+from generator import ExerciseChecker, GradeResult, iter_items
+from keycache import KEY_CACHE_ENTRIES, file_identity, load_key
+
+# 同时处理的请求数上限
+MAX_CONCURRENCY = 64
+# 单个请求（一行 JSON）的最大字节数
+MAX_REQUEST_BYTES = 64 << 20
+
+
+class AnswerKeyCache(keycache.AnswerKeyCache):
+    """异步的答案键缓存：加载在线程池中进行，缓存的是加载任务
+
+    同一文件的并发加载只进行一次，后来的请求等待同一个加载任务；加载失败的任务不缓存。
+    """
+
+    def __init__(self, max_entries=KEY_CACHE_ENTRIES):
+        super().__init__(max_entries, self._start_load)
+
+    @staticmethod
+    def _start_load(exercise_file):
+        return asyncio.get_running_loop().run_in_executor(None, load_key, exercise_file)
+
+    async def get(self, exercise_file):
+        key = file_identity(exercise_file)
+        task = self.lookup(key, exercise_file)
+        try:
+            return await task
+        except Exception:
+            self.discard(key)
+            raise
+
+
+def grade_with_key(key, answers):
+    """用已缓存的正确结果批改答案文本列表"""
+    return GradeResult(ExerciseChecker.grade_pairs(key, answers))
+
+
+def grade_request(key, answer_lines=None, answer_file=None, grade_file=None):
+    """同步完成一个请求的读取、批改与写出，返回 (正确题号列表, 错误题号列表)"""
+    if answer_lines is not None:
+        result = grade_with_key(key, iter_items(answer_lines))
+    else:
+        with open_text(answer_file) as f:
+            result = grade_with_key(key, iter_items(f))
+    if grade_file:
+        result.write(grade_file)
+    return list(result.iter_numbers(1)), list(result.iter_numbers(0))
+
+
+class GradingServer:
+    """常驻的批改服务：每行一个 JSON 请求，每行一个 JSON 响应
+
+    请求字段：exercises（题目文件路径），answers（答案文件路径）或 answer_lines（答案行列表），
+    可选 grade_file（写出评分文件）与 id（原样返回）。
+    响应字段：ok、correct、wrong（题号列表）；出错时 ok 为 false，error 为错误信息。
+    请求中的路径都相对于服务根目录 root 解析，不能指向根目录之外；
+    读取、批改与写出在线程池中进行，不阻塞事件循环。
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, cache=None, root=None):
+        self.semaphore = asyncio.Semaphore(max_concurrency)
+        self.cache = AnswerKeyCache() if cache is None else cache
+        self.root = os.path.realpath(os.getcwd() if root is None else root)
+
+    def resolve(self, path):
+        """把请求中的路径解析为服务根目录下的真实路径，超出根目录时报错"""
+        if not isinstance(path, str) or not path:
+            raise ValueError("路径必须是非空字符串")
+        resolved = os.path.realpath(os.path.join(self.root, path))
+        if os.path.commonpath([self.root, resolved]) != self.root:
+            raise PermissionError(f"路径超出服务根目录: {path}")
+        return resolved
+
+    async def handle_request(self, request):
+        """处理一个已解析的请求，返回响应字典"""
+        response = {'id': request.get('id')} if 'id' in request else {}
+        async with self.semaphore:
+            try:
+                key = await self.cache.get(self.resolve(request['exercises']))
+                if 'answer_lines' in request:
+                    task = (request['answer_lines'], None)
+                else:
+                    task = (None, self.resolve(request['answers']))
+                grade_file = self.resolve(request['grade_file']) if request.get('grade_file') else None
+                loop = asyncio.get_running_loop()
+                correct, wrong = await loop.run_in_executor(None, grade_request, key, *task, grade_file)
+            except KeyError as e:
+                response.update(ok=False, error=f"请求缺少字段 {e}")
+                return response
+            except Exception as e:
+                response.update(ok=False, error=str(e))
+                return response
+        response.update(ok=True, correct=correct, wrong=wrong)
+        return response
+
+    async def handle_connection(self, reader, writer):
+        """逐行读取请求并按顺序写回响应"""
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                    if not isinstance(request, dict):
+                        raise ValueError("请求必须是 JSON 对象")
+                except ValueError as e:
+                    response = {'ok': False, 'error': f"请求格式错误: {e}"}
+                else:
+                    response = await self.handle_request(request)
+                writer.write(json.dumps(response, ensure_ascii=False).encode('utf-8') + b'\n')
+                await writer.drain()
+        except (ConnectionError, ValueError, asyncio.IncompleteReadError):
+            pass  # 连接断开或请求超出长度上限
+        finally:
+            writer.close()
+
+    async def start(self, address):
+        """在 host:port 或 unix:/路径 上开始监听，返回 asyncio 的 Server 对象"""
+        if address.startswith('unix:'):
+            return await asyncio.start_unix_server(self.handle_connection, address[5:], limit=MAX_REQUEST_BYTES)
+        host, _, port = address.rpartition(':')
+        return await asyncio.start_server(self.handle_connection, host or '127.0.0.1', int(port),
+                                          limit=MAX_REQUEST_BYTES)
+
+
+async def serve(address, max_concurrency=MAX_CONCURRENCY, root=None):
+    """启动批改服务并一直运行，请求只能访问 root（默认当前目录）下的文件"""
+    grading_server = GradingServer(max_concurrency, root=root)
+    server = await grading_server.start(address)
+    print(f"批改服务已启动: {address}，根目录: {grading_server.root}")
+    async with server:
+        await server.serve_forever()